@@ -0,0 +1,126 @@
+# benchmarks/client_pool.py
+"""Débit du client sur la boucle locale : connexion par requête, pool, pipeline.
+
+Usage (from the repository root):
+    python benchmarks/client_pool.py [--threads 4] [--ops 200] [--pool-size 4]
+
+A server (main.py --serve) is started on a free port in a temporary directory
+with a copy of config/, so the benchmark never touches the real database.
+"""
+import argparse
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from sgbd.client import ClientError, ConnectionPool, connect
+
+USER, PASSWORD, DB_NAME = "root", "root", "bench"
+QUERY = "select * from items where id = 42;"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workdir: str, port: int) -> subprocess.Popen:
+    shutil.copytree(ROOT / "config", Path(workdir) / "config")
+    proc = subprocess.Popen([sys.executable, str(ROOT / "main.py"), "--serve", "--port", str(port)],
+                            cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            connect("127.0.0.1", port, USER, PASSWORD).close()
+            return proc
+        except ClientError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+
+def setup(port: int, rows: int) -> None:
+    with connect("127.0.0.1", port, USER, PASSWORD) as conn:
+        conn.execute(f"create_db {DB_NAME}")
+        conn.use(DB_NAME)
+        conn.execute("create_table items(id:number[primary_key], name:string, price:float)")
+        values = ", ".join(f"(id={i}, name=item{i}, price={i * 1.5})" for i in range(rows))
+        conn.execute(f"add_into_table items {values}")
+
+
+def run_threads(threads: int, ops: int, work) -> float:
+    def loop():
+        for _ in range(ops):
+            work()
+    workers = [threading.Thread(target=loop) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return threads * ops / (time.perf_counter() - start)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Pooled vs unpooled client throughput")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--ops", type=int, default=200, help="queries per thread")
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=1000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="sgbd_client_")
+    port = free_port()
+    proc = start_server(workdir, port)
+    try:
+        setup(port, args.rows)
+
+        def unpooled():
+            with connect("127.0.0.1", port, USER, PASSWORD, database=DB_NAME) as conn:
+                assert len(conn.execute(QUERY).rows) == 1
+
+        with ConnectionPool("127.0.0.1", port, USER, PASSWORD, database=DB_NAME,
+                            size=args.pool_size) as pool:
+            def pooled():
+                assert len(pool.execute(QUERY).rows) == 1
+
+            def pipelined():
+                with pool.connection() as conn:
+                    assert all(r.ok for r in conn.pipeline([QUERY] * args.ops))
+
+            rate_unpooled = run_threads(args.threads, args.ops, unpooled)
+            rate_pooled = run_threads(args.threads, args.ops, pooled)
+            start = time.perf_counter()
+            run_threads(args.threads, 1, pipelined)
+            rate_pipelined = args.threads * args.ops / (time.perf_counter() - start)
+            stats = pool.stats
+
+        print(f"{args.threads} threads x {args.ops} queries, pool size {args.pool_size}")
+        print(f"  connection per query : {rate_unpooled:>10,.0f} queries/s")
+        print(f"  pooled               : {rate_pooled:>10,.0f} queries/s "
+              f"({rate_pooled / rate_unpooled:.1f}x)")
+        print(f"  pooled + pipelined   : {rate_pipelined:>10,.0f} queries/s "
+              f"({rate_pipelined / rate_unpooled:.1f}x)")
+        print(f"  pool: {stats['created']} created, {stats['reused']} reused, "
+              f"{stats['waits']} waits, {stats['evicted']} evicted")
+        return 0
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
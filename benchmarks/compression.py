@@ -0,0 +1,107 @@
+# benchmarks/compression.py
+"""Taille sur disque et temps de chargement d'une table selon la compression des pages.
+
+Usage (from the repository root):
+    python benchmarks/compression.py [--rows 20000] [--repeat 5]
+
+The same text-heavy table (log-like messages with repeated words) is written
+once per codec in a temporary database directory. For each codec it reports
+the table file size, the time to write it and the time for a full load from
+disk (table cache cleared before each run).
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)  # config/config.json est lu relativement au répertoire courant
+
+from db.db_main import Db
+from utils.compression import CODECS
+from utils.crypto import CryptoManager
+
+DB_NAME = "bench"
+MASTER_PASSWORD = "mit_misa_password_123!!!"
+WORDS = ("request", "served", "user", "session", "timeout", "cache", "miss", "hit", "error",
+         "warning", "payload", "upstream", "connection", "reset", "retry", "latency", "ms")
+
+
+def make_rows(count: int):
+    rng = random.Random(42)
+    return [{
+        "id": i,
+        "level": rng.choice(("INFO", "WARN", "ERROR", "DEBUG")),
+        "host": f"web-{rng.randrange(12):02d}.example.internal",
+        "message": " ".join(rng.choice(WORDS) for _ in range(rng.randrange(8, 40))),
+    } for i in range(count)]
+
+
+def write_table(db: Db, name: str, codec: str, rows) -> float:
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        created = db.create_Table(DB_NAME, name, {
+            "caracteristique": {"id": "Number", "level": "String", "host": "String", "message": "Text"},
+            "constraint": {"id": ["no constraint"], "level": ["no constraint"],
+                           "host": ["no constraint"], "message": ["no constraint"]},
+            "compression": codec,
+            "data": [dict(row, __rowid__=i) for i, row in enumerate(rows, 1)],
+            "next_rowid": len(rows) + 1,
+        })
+    assert created
+    return time.perf_counter() - start
+
+
+def best_of(repeat: int, action) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        action()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Page compression: bytes on disk and load time")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="sgbd_compression_")
+    try:
+        db = Db(workdir, CryptoManager(MASTER_PASSWORD))
+        with contextlib.redirect_stdout(io.StringIO()):
+            db.create_DB(DB_NAME)
+        rows = make_rows(args.rows)
+        print(f"{args.rows} rows, page size {db.page_size}")
+        print(f"{'codec':<6} {'bytes':>12} {'ratio':>6} {'pages':>6} {'write':>9} {'load':>9}")
+        baseline = None
+        for codec in CODECS:
+            name = f"logs_{codec}"
+            written = write_table(db, name, codec, rows)
+            size = db._get_table_path(DB_NAME, name).stat().st_size
+            baseline = baseline or size
+            store = db._store(DB_NAME, name)
+            pages = store.read_header()["pages"]
+
+            def load():
+                db.cache.invalidate((DB_NAME, name))
+                store._header = None
+                assert len(db.load_table(DB_NAME, name)["data"]) == args.rows
+
+            print(f"{codec:<6} {size:>12,} {baseline / size:>5.1f}x {len(pages):>6} "
+                  f"{written * 1000:>7.0f}ms {best_of(args.repeat, load) * 1000:>7.0f}ms")
+        return 0
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+# benchmarks/lock_stress.py
+"""Plusieurs processus sur la même table : aucune écriture perdue, temps d'attente des verrous.
+
+Usage (from the repository root):
+    python benchmarks/lock_stress.py [--workers 4] [--ops 200]
+
+Each worker opens its own Db on a temporary database directory, inserts
+unique rows into 'items' and increments a shared counter in 'counter' with a
+read-modify-write under the table's exclusive lock. At the end the row count
+and the counter must both equal workers * ops.
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)  # config/config.json est lu relativement au répertoire courant
+
+from db.db_main import Db
+from db.wal import ROWID
+from utils.crypto import CryptoManager
+from utils.sql_parser import parse_expression
+
+DB_NAME = "bench"
+MASTER_PASSWORD = "mit_misa_password_123!!!"
+
+
+def _open(db_path: str) -> Db:
+    return Db(db_path, CryptoManager(MASTER_PASSWORD))
+
+
+def setup(db_path: str) -> None:
+    db = _open(db_path)
+    db.create_DB(DB_NAME)
+    db.create_Table(DB_NAME, "items", {
+        "caracteristique": {"id": "String", "worker": "Number"},
+        "constraint": {"id": ["Unique"], "worker": ["no constraint"]},
+        "data": [],
+    })
+    db.create_Table(DB_NAME, "counter", {
+        "caracteristique": {"name": "String", "value": "Number"},
+        "constraint": {"name": ["Primary key"], "value": ["no constraint"]},
+        "data": [],
+    })
+    db.insert_rows(DB_NAME, "counter", [{"name": "hits", "value": "0"}])
+
+
+def worker(args):
+    db_path, number, ops = args
+    db = _open(db_path)
+    where = parse_expression("name = 'hits'")
+    start = time.perf_counter()
+    for i in range(ops):
+        db.insert_rows(DB_NAME, "items", [{"id": f"{number}-{i}", "worker": str(number)}])
+        with db.table_lock(DB_NAME, "counter"):
+            row = dict(db.find_rows(DB_NAME, "counter", where)[0])
+            row["value"] += 1
+            db.log_update(DB_NAME, "counter", [(row[ROWID], row)])
+    return time.perf_counter() - start, db.locks.stats()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Lock stress test: N processes on the same table")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--ops", type=int, default=200, help="inserts + increments per worker")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="sgbd_locks_")
+    db_path = os.path.join(tmp, ".database")
+    try:
+        setup(db_path)
+        start = time.perf_counter()
+        with multiprocessing.Pool(args.workers) as pool:
+            results = pool.map(worker, [(db_path, n, args.ops) for n in range(args.workers)])
+        elapsed = time.perf_counter() - start
+
+        db = _open(db_path)
+        expected = args.workers * args.ops
+        rows = db.count_rows(DB_NAME, "items")
+        counter = db.find_rows(DB_NAME, "counter", parse_expression("name = 'hits'"))[0]["value"]
+
+        total = {}
+        for _, stats in results:
+            for mode, values in stats.items():
+                agg = total.setdefault(mode, {"acquired": 0, "contended": 0, "wait": 0.0, "max_wait": 0.0})
+                agg["acquired"] += values["acquired"]
+                agg["contended"] += values["contended"]
+                agg["wait"] += values["wait"]
+                agg["max_wait"] = max(agg["max_wait"], values["max_wait"])
+
+        print(f"{args.workers} workers x {args.ops} ops in {elapsed:.2f}s "
+              f"({2 * expected / elapsed:,.0f} ops/s)")
+        print(f"items: {rows}/{expected} rows, counter: {counter}/{expected}")
+        for mode, values in total.items():
+            avg = values["wait"] / values["contended"] * 1000 if values["contended"] else 0.0
+            print(f"{mode:<9} acquired={values['acquired']:<7} contended={values['contended']:<6} "
+                  f"avg wait={avg:.2f}ms max wait={values['max_wait'] * 1000:.2f}ms")
+        ok = rows == expected and counter == expected
+        print("OK" if ok else "FAILED: lost writes")
+        return 0 if ok else 1
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,18 @@
 # commands/__init__.py
-from .db_commands import handle_db_commands
-from .table_commands import handle_table_commands
-from .query_commands import handle_query_commands
-from .user_perm_commands import handle_user_perm_commands
+"""Gestionnaires de commandes, importés à leur première utilisation (démarrage plus rapide)"""
+import importlib
+
+_HANDLERS = {
+    "handle_db_commands": "db_commands",
+    "handle_table_commands": "table_commands",
+    "handle_alter_table": "table_commands",
+    "handle_query_commands": "query_commands",
+    "handle_user_perm_commands": "user_perm_commands",
+}
+
+
+def __getattr__(name):
+    module = _HANDLERS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(f".{module}", __name__), name)
@@ -1,8 +1,9 @@
 # commands/db_commands.py
 from db.db_main import Db
 
-def handle_db_commands(cmd, cmd_line, db: Db, userUsingDb, DEFAULT_PROMPT, SEPARATOR):
-    global useDatabase, isDbUse, promptContainte
+def handle_db_commands(cmd, cmd_line, db: Db, userUsingDb, DEFAULT_PROMPT, SEPARATOR,
+                       useDatabase="", isDbUse=False):
+    """useDatabase / isDbUse : base sélectionnée par la session qui exécute la commande"""
 
     if cmd_line in ["create_database", "create_db"]:
         name = cmd.split(" ", 1)[1].strip() if " " in cmd else ""
@@ -44,9 +45,31 @@ def handle_db_commands(cmd, cmd_line, db: Db, userUsingDb, DEFAULT_PROMPT, SEPAR
     elif cmd_line in ["list_database", "list_db"]:
         db.show_databases()
 
+    elif cmd_line == "cache_stats":
+        db.show_cache_stats()
+
+    elif cmd_line == "lock_stats":
+        db.show_lock_stats()
+
     elif cmd_line in ["stats_db", "database_stats"]:
-        if isDbUse:
+        if not isDbUse:
+            print("No database selected")
+            print("Use: use_db <database_name>;")
+        elif not db.permManager.has_db_permission(useDatabase, db.current_user["username"], "USAGE"):
+            print(f"Permission denied to use database '{useDatabase}'")
+        else:
             stats = db.get_statistics(useDatabase)
-            print(f"Tables: {stats['tables']}, Rows: {stats['total_rows']}, Cols: {stats['total_columns']}")
+            tables = stats["per_table"]
+            width = max([len(name) for name in tables] + [5])
+            separator = "—" * (width + 36)
+            print(separator)
+            print(f"{'Table':<{width}} | {'Rows':>10} | {'Cols':>4} | {'Bytes':>10}")
+            print(separator)
+            for name in sorted(tables):
+                t = tables[name]
+                print(f"{name:<{width}} | {t['rows']:>10} | {len(t['caracteristique']):>4} | {t['bytes']:>10}")
+            print(separator)
+            print(f"Tables: {stats['tables']}, Rows: {stats['total_rows']}, Cols: {stats['total_columns']}, "
+                  f"Size: {stats['total_bytes']} bytes")
 
     return None, None
\ No newline at end of file
@@ -1,73 +1,99 @@
 # commands/query_commands.py
-import os
 import json
-from utils.helpers import parse_where_clause
-
-def handle_query_commands(cmd, cmd_line, db, useDatabase, isDbUse, SEPARATOR):
+import time
+
+from db.wal import ROWID
+from utils.data_files import FORMATS, guess_format, write_records
+from utils.sql_parser import parse_statement
+
+def _display(value):
+    return "" if value is None else str(value)
+
+def export_rows(db, useDatabase, table_name, columns, where, path, fmt=None):
+    """Écrit le résultat d'un parcours dans un fichier CSV / JSON Lines, sans affichage"""
+    fmt = (fmt or guess_format(path)).lower()
+    if fmt not in FORMATS:
+        print(f"Unknown format '{fmt}' (expected {' or '.join(FORMATS)})")
+        return False
+    start = time.perf_counter()
+    try:
+        count = write_records(path, fmt, columns, db.scan(useDatabase, table_name, where))
+    except FileExistsError:
+        print(f"File already exists: {path}")
+        return False
+    except OSError as e:
+        print(f"Cannot write {path}: {e}")
+        return False
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed > 0 else 0
+    print(f"{count} row{'s' if count > 1 else ''} exported to {path} in {elapsed:.3f}s ({rate:,.0f} rows/s)")
+    return True
+
+def print_json_rows(columns, types, rows):
+    """Sortie "json" d'un select : une ligne d'en-tête puis un tableau JSON par ligne"""
+    dumps = json.JSONEncoder(ensure_ascii=False, default=str).encode
+    print(dumps({"columns": columns, "types": {col: types.get(col) for col in columns}}))
+    for row in rows:
+        print(dumps([row.get(col) for col in columns]))
+
+def handle_query_commands(cmd, cmd_line, db, useDatabase, isDbUse, SEPARATOR, output="text"):
+    """Renvoie False quand la requête échoue (erreur de syntaxe, permission, table absente…).
+
+    output="json" prints select results as JSON lines (server clients) instead of a table.
+    """
     if not isDbUse:
         print("No database selected")
         print("Use: use_db <nom_base>;")
-        return
+        return False
 
     # === SELECT ===
     if cmd_line == "select":
-        getRequests = " ".join(cmd.split(" ")[1:]).strip()
-        if not getRequests:
-            print("Syntax error")
-            print("Usage: select <columns> from <table> [where <condition>];")
-            return
-
-        parts = getRequests.split()
-        if len(parts) < 3 or parts[1].lower() != "from":
-            print("Syntax error: missing FROM")
-            return
-
-        columns_part = parts[0]
-        table_name = parts[2]
-        where_clause = None
-        if "where" in [p.lower() for p in parts]:
-            where_index = [p.lower() for p in parts].index("where")
-            if len(parts) > where_index + 1:
-                where_clause = " ".join(parts[where_index + 1:])
+        try:
+            # AST mis en cache : une requête répétée n'est parsée qu'une fois
+            stmt = parse_statement(cmd)
+        except ValueError as e:
+            print(f"Syntax error: {e}")
+            print("Usage: select <columns> from <table> [where <condition>] [into outfile '<file>' [format=csv|jsonl]];")
+            return False
+        table_name = stmt.table
 
         # Vérification permission
         if not db.permManager.has_table_permission(useDatabase, table_name, db.current_user["username"], "SELECT"):
             print(f"Permission denied to read '{table_name}'")
-            return
+            return False
 
         # Lecture chiffrée
         path = db._get_table_path(useDatabase, table_name)
         if not path.exists():
             print(f"Table '{table_name}' does not exist")
-            return
+            return False
 
         try:
-            content = db.crypto.decrypt(path.read_bytes())
-            all_rows = content.get("data", [])
-            all_columns = list(content.get("caracteristique", {}).keys())
-
-            # Normalisation
-            normalized_rows = []
-            for row in all_rows:
-                clean_row = {k.strip(): str(v).strip().strip('"') for k, v in row.items()}
-                normalized_rows.append(clean_row)
-            all_rows = normalized_rows
+            types = db.load_schema(useDatabase, table_name).get("caracteristique", {})
+            all_columns = list(types.keys())
 
             # Colonnes
-            if columns_part == "*":
+            if stmt.columns is None:
                 selected_columns = all_columns
             else:
-                selected_columns = [c.strip() for c in columns_part.split(",")]
+                selected_columns = list(stmt.columns)
                 invalid_cols = [c for c in selected_columns if c not in all_columns]
                 if invalid_cols:
                     print(f"Unknown columns: {', '.join(invalid_cols)}")
                     print(f"Available: {', '.join(all_columns)}")
-                    return
+                    return False
+
+            # into outfile : les lignes vont directement du parcours au fichier
+            if stmt.outfile is not None:
+                return export_rows(db, useDatabase, table_name, selected_columns, stmt.where,
+                                   stmt.outfile, stmt.out_format)
 
-            # WHERE
-            filtered_rows = all_rows
-            if where_clause:
-                filtered_rows = parse_where_clause(where_clause, all_rows)
+            # WHERE (index si possible) ; les lignes restent typées
+            filtered_rows = db.find_rows(useDatabase, table_name, stmt.where)
+
+            if output == "json":
+                print_json_rows(selected_columns, types, filtered_rows)
+                return True
 
             if not filtered_rows:
                 print("No data found")
@@ -75,7 +101,7 @@ def handle_query_commands(cmd, cmd_line, db, useDatabase, isDbUse, SEPARATOR):
 
             # Affichage
             col_widths = {
-                col: max(len(col), max(len(str(row.get(col, ""))) for row in filtered_rows))
+                col: max(len(col), max(len(_display(row.get(col))) for row in filtered_rows))
                 for col in selected_columns
             }
             total_width = sum(col_widths.values()) + len(selected_columns) * 3 + 1
@@ -83,99 +109,76 @@ def handle_query_commands(cmd, cmd_line, db, useDatabase, isDbUse, SEPARATOR):
             print(" | ".join(col.ljust(col_widths[col]) for col in selected_columns))
             print(SEPARATOR * total_width)
             for row in filtered_rows:
-                print(" | ".join(str(row.get(col, "")).ljust(col_widths[col]) for col in selected_columns))
+                print(" | ".join(_display(row.get(col)).ljust(col_widths[col]) for col in selected_columns))
             print(SEPARATOR * total_width)
             print(f"({len(filtered_rows)} row{'s' if len(filtered_rows) > 1 else ''} returned)")
             print(SEPARATOR * total_width)
 
         except Exception as e:
             print(f"Error reading table: {e}")
+            return False
 
     # === UPDATE ===
     elif cmd_line == "update":
         try:
-            parts = cmd.split()
-            if len(parts) < 4 or parts[2].lower() != "set":
-                raise ValueError("Syntaxe invalide")
-            table_name = parts[1]
+            stmt = parse_statement(cmd)
+            table_name = stmt.table
 
             if not db.permManager.has_table_permission(useDatabase, table_name, db.current_user["username"], "UPDATE"):
                 print(f"Permission denied for updating '{table_name}'")
-                return
-
-            set_index = [p.lower() for p in parts].index("set")
-            where_index = [p.lower() for p in parts].index("where") if "where" in [p.lower() for p in parts] else None
-
-            if where_index:
-                set_part = " ".join(parts[set_index + 1:where_index])
-                where_clause = " ".join(parts[where_index + 1:])
-            else:
-                set_part = " ".join(parts[set_index + 1:])
-                where_clause = None
-
-            assignments = {}
-            for assign in set_part.split(","):
-                if "=" not in assign:
-                    raise ValueError(f"Invalid assignment: {assign}")
-                col, val = assign.split("=", 1)
-                assignments[col.strip()] = val.strip().strip("'\"")
+                return False
 
             path = db._get_table_path(useDatabase, table_name)
             if not path.exists():
                 print(f"Table '{table_name}' does not exist")
-                return
+                return False
 
-            content = db.crypto.decrypt(path.read_bytes())
-            all_rows = content.get("data", [])
-            normalized_rows = [{k.strip(): str(v).strip().strip('"') for k, v in row.items()} for row in all_rows]
+            content = db.load_table(useDatabase, table_name)
+            types = content.get("caracteristique", {})
 
-            if where_clause:
-                rows_to_update = parse_where_clause(where_clause, normalized_rows)
-            else:
+            # Valeurs converties une seule fois selon le type déclaré
+            assignments = {col: db._coerce_value(literal.text, types[col])
+                           for col, literal in stmt.assignments if col in types}
+
+            if stmt.where is None:
                 confirm = input(f"Update all rows in '{table_name}'? (yes/no): ").lower()
                 if confirm not in ["yes", "y", "oui"]:
                     print("Operation aborted")
                     return
-                rows_to_update = normalized_rows
-
-            updated_count = 0
-            for row in normalized_rows:
-                if row in rows_to_update:
-                    for col, val in assignments.items():
-                        if col in row:
-                            row[col] = val
-                    updated_count += 1
-
-            content["data"] = normalized_rows
-            path.write_bytes(db.crypto.encrypt(content))
+
+            # Lecture et écriture sous le même verrou : pas de mise à jour perdue entre processus
+            with db.table_lock(useDatabase, table_name):
+                changes = []
+                for old in db.find_rows(useDatabase, table_name, stmt.where):
+                    row = dict(old)
+                    row.update(assignments)
+                    changes.append((old[ROWID], row))
+                updated_count = len(changes)
+
+                # Seules les lignes modifiées sont écrites (journal)
+                if changes:
+                    db.log_update(useDatabase, table_name, changes)
             print(f"{updated_count} row{'s' if updated_count > 1 else ''} updated")
 
         except ValueError as e:
             print(f"Syntax error: {e}")
             print("Usage: update <table> set col=val [where ...];")
+            return False
         except Exception as e:
             print(f"Error: {e}")
+            return False
 
     # === DELETE ===
     elif cmd_line == "delete":
         try:
-            parts = cmd.split()
-            if len(parts) < 3 or parts[1].lower() != "from":
-                raise ValueError("Syntaxe invalide")
-            table_name = parts[2]
+            stmt = parse_statement(cmd)
+            table_name = stmt.table
 
             if not db.permManager.has_table_permission(useDatabase, table_name, db.current_user["username"], "DELETE"):
                 print(f"Permission denied for deleting from '{table_name}'")
-                return
+                return False
 
-            where_clause = None
-            if "where" in [p.lower() for p in parts]:
-                where_index = [p.lower() for p in parts].index("where")
-                if len(parts) > where_index + 1:
-                    where_clause = " ".join(parts[where_index + 1:])
-                else:
-                    raise ValueError("WHERE condition missing")
-            else:
+            if stmt.where is None:
                 confirm = input(f"Delete all rows from '{table_name}'? (yes/no): ").lower()
                 if confirm not in ["yes", "y", "oui"]:
                     print("Operation aborted")
@@ -184,25 +187,23 @@ def handle_query_commands(cmd, cmd_line, db, useDatabase, isDbUse, SEPARATOR):
             path = db._get_table_path(useDatabase, table_name)
             if not path.exists():
                 print(f"Table '{table_name}' does not exist")
-                return
-
-            content = db.crypto.decrypt(path.read_bytes())
-            all_rows = content.get("data", [])
-            normalized_rows = [{k.strip(): str(v).strip().strip('"') for k, v in row.items()} for row in all_rows]
-
-            if where_clause:
-                rows_to_delete = parse_where_clause(where_clause, normalized_rows)
-                remaining_rows = [row for row in normalized_rows if row not in rows_to_delete]
-            else:
-                rows_to_delete = normalized_rows
-                remaining_rows = []
-
-            content["data"] = remaining_rows
-            path.write_bytes(db.crypto.encrypt(content))
-            print(f"{len(rows_to_delete)} row{'s' if len(rows_to_delete) > 1 else ''} deleted")
+                return False
+
+            with db.table_lock(useDatabase, table_name):
+                if stmt.where is not None:
+                    rowids = [row[ROWID] for row in db.find_rows(useDatabase, table_name, stmt.where)]
+                    if rowids:
+                        db.log_delete(useDatabase, table_name, rowids)
+                    deleted_count = len(rowids)
+                else:
+                    deleted_count = db.count_rows(useDatabase, table_name)
+                    db.log_truncate(useDatabase, table_name)
+            print(f"{deleted_count} row{'s' if deleted_count > 1 else ''} deleted")
 
         except ValueError as e:
             print(f"Syntax error: {e}")
             print("Usage: delete from <table> [where ...];")
+            return False
         except Exception as e:
-            print(f"Error: {e}")
\ No newline at end of file
+            print(f"Error: {e}")
+            return False
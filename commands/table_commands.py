@@ -1,8 +1,13 @@
 import os
 import re
 import json
+import time
 from pathlib import Path
 from utils.helpers import validate_table_name, split_top_level_commas
+from utils.sql_parser import parse_statement
+from utils.data_files import FORMATS, guess_format, read_records
+from utils.compression import CODECS
+from commands.query_commands import export_rows
 from db.db_main import Db
 
 def check_permission(db: Db, operation, database_name, table_name=None):
@@ -133,29 +138,124 @@ def handle_table_commands(cmd, cmd_line, db, useDatabase, isDbUse, SEPARATOR, co
             traceback.print_exc()    
 
     elif cmd_line == "add_into_table":
-        if " " not in cmd:
+        try:
+            stmt = parse_statement(cmd)
+        except ValueError as e:
+            print(f"Syntax error: {e}")
             print("Usage: add_into_table <table>(col=value, ...);")
+            return False
+
+        rows = [{col: literal.text for col, literal in values} for values in stmt.rows]
+        start = time.perf_counter()
+        inserted = db.insert_rows(useDatabase, stmt.table, rows)
+        elapsed = time.perf_counter() - start
+        if inserted == 1:
+            print("Data added successfully")
+        elif inserted:
+            rate = inserted / elapsed if elapsed > 0 else float("inf")
+            print(f"{inserted} rows added in {elapsed:.3f}s ({rate:,.0f} rows/s)")
+        return inserted > 0
+
+    elif cmd_line == "load_data":
+        # load_data <table> from '<fichier>' [format=csv|jsonl] [batch=N]
+        m = re.match(r"""^load_data\s+(\w+)\s+from\s+(['"])(.+?)\2((?:\s+\w+\s*=\s*\w+)*)$""", cmd, re.IGNORECASE)
+        if not m:
+            print("Usage: load_data <table> from '<file>' [format=csv|jsonl] [batch=N];")
+            return False
+        table_name, _, file_path, rest = m.groups()
+        options = {k.lower(): v for k, v in re.findall(r'(\w+)\s*=\s*(\w+)', rest)}
+        fmt = options.get("format", guess_format(file_path)).lower()
+        if fmt not in FORMATS:
+            print(f"Unknown format '{fmt}' (expected {' or '.join(FORMATS)})")
+            return False
+        try:
+            batch_size = int(options.get("batch", config.get("load_batch_size", 1000)))
+        except ValueError:
+            print("batch must be a number")
+            return False
+        if batch_size <= 0:
+            print("batch must be a positive number")
+            return False
+        if not db._get_table_path(useDatabase, table_name).exists():
+            print(f"Table '{table_name}' does not exist")
+            return False
+        if not check_permission(db, "INSERT", useDatabase, table_name):
+            print(f"Permission denied to insert into '{table_name}'")
+            return False
+        if not os.path.isfile(file_path):
+            print(f"File not found: {file_path}")
+            return False
+
+        start = time.perf_counter()
+        try:
+            loaded, complete = db.load_rows(useDatabase, table_name, read_records(file_path, fmt), batch_size)
+        except (ValueError, OSError) as e:
+            # Les lots précédents sont déjà journalisés
+            print(f"Error reading {file_path}: {e}")
+            return False
+        elapsed = time.perf_counter() - start
+        rate = loaded / elapsed if elapsed > 0 else 0
+        print(f"{loaded} row{'s' if loaded > 1 else ''} loaded into '{table_name}' "
+              f"in {elapsed:.3f}s ({rate:,.0f} rows/s)")
+        return complete
+
+    elif cmd_line == "export_table":
+        # export_table <table> to '<fichier>' [format=csv|jsonl]
+        m = re.match(r"""^export_table\s+(\w+)\s+to\s+(['"])(.+?)\2(?:\s+format\s*=\s*(\w+))?$""", cmd, re.IGNORECASE)
+        if not m:
+            print("Usage: export_table <table> to '<file>' [format=csv|jsonl];")
+            return False
+        table_name, _, file_path, fmt = m.groups()
+        if not db._get_table_path(useDatabase, table_name).exists():
+            print(f"Table '{table_name}' does not exist")
+            return False
+        if not check_permission(db, "SELECT", useDatabase, table_name):
+            print(f"Permission denied to read '{table_name}'")
+            return False
+        columns = list(db.load_schema(useDatabase, table_name).get("caracteristique", {}).keys())
+        return export_rows(db, useDatabase, table_name, columns, None, file_path, fmt)
+
+    elif cmd_line == "create_index":
+        # create_index <nom> on <table>(col)
+        m = re.match(r'^create_index\s+(\w+)\s+on\s+(\w+)\s*\(\s*(\w+)\s*\)$', cmd, re.IGNORECASE)
+        if not m:
+            print("Usage: create_index <name> on <table>(col);")
             return
-        parts = cmd.split(" ", 1)[1].strip()
-        if "(" not in parts or ")" not in parts:
-            print("Invalid syntax. Use: add_into_table table(col=value, ...);")
+        index_name, table_name, column = m.groups()
+        if not check_permission(db, "ALL", useDatabase, table_name):
+            print(f"Permission denied to index '{table_name}'")
             return
-        table_part, values_part = parts.split("(", 1)
-        table_name = table_part.strip()
-        values_str = values_part.rstrip(")").strip()
-        if not values_str:
-            print("No values provided")
+        db.create_index(useDatabase, index_name, table_name, column)
+
+    elif cmd_line == "drop_index":
+        # drop_index <nom> [on <table>]
+        m = re.match(r'^drop_index\s+(\w+)(?:\s+on\s+(\w+))?$', cmd, re.IGNORECASE)
+        if not m:
+            print("Usage: drop_index <name> [on <table>];")
             return
-        values = [v.strip() for v in values_str.split(",") if v.strip()]
-        if not values:
-            print("No valid values")
+        index_name, table_name = m.groups()
+        table_name = table_name or db._find_index(useDatabase, index_name)
+        if table_name and not check_permission(db, "ALL", useDatabase, table_name):
+            print(f"Permission denied to drop index on '{table_name}'")
             return
+        db.drop_index(useDatabase, index_name, table_name)
 
-        # CORRIGÉ : passe db_name, table_name, values
-        success = db.analyse_data(useDatabase, table_name, values)
-        if success:
-            print("Data added successfully")
-
+    elif cmd_line == "repair_table":
+        # repair_table <table> | repair_table *
+        target = cmd[len("repair_table"):].strip()
+        if not target:
+            print("Usage: repair_table <table>|*;")
+            return
+        tables = db.list_table(useDatabase) if target == "*" else [target]
+        for table_name in tables:
+            if not db._get_table_path(useDatabase, table_name).exists():
+                print(f"Table '{table_name}' does not exist")
+                continue
+            if not check_permission(db, "ALL", useDatabase, table_name):
+                print(f"Permission denied to repair '{table_name}'")
+                continue
+            fixed = db.repair_table(useDatabase, table_name)
+            print(f"{table_name}: {fixed} value{'s' if fixed > 1 else ''} repaired")
 
     elif cmd_line == "drop_table":
         tableToRemove = cmd[10:].strip()
@@ -207,10 +307,9 @@ def handle_alter_table(cmd, db, useDatabase, config):
     - ALTER_TABLE nom RENAME COLUMN old_col TO new_col;
     - ALTER_TABLE nom MODIFY COLUMN col:new_type[contraintes];
     - ALTER_TABLE nom RENAME TO new_name;
+    - ALTER_TABLE nom COMPRESSION zlib|lzma|none|default;
     """
     
-    DB_PATH = Path(config.get("db_path", ".database"))
-    
     try:
         # Parser la commande : ALTER_TABLE nom ...
         parts = cmd.split()
@@ -222,7 +321,7 @@ def handle_alter_table(cmd, db, useDatabase, config):
         action = parts[2].upper()  # ADD, DROP, RENAME, MODIFY
         
         # Chemin vers le fichier de la table (CHIFFRÉ)
-        table_path = DB_PATH / useDatabase / f"{table_name}.enc"
+        table_path = db._get_table_path(useDatabase, table_name)
         
         if not table_path.exists():
             print(f"Table '{table_name}' does not exist")
@@ -241,299 +340,317 @@ def handle_alter_table(cmd, db, useDatabase, config):
                 print(f"🚫 Permission denied to alter table '{table_name}' (user: {current_username})")
                 return
         
-        # ========================================
-        # CHARGEMENT AVEC DÉCHIFFREMENT
-        # ========================================
-        encrypted_data = table_path.read_bytes()
-        # db.crypto.decrypt() retourne directement un dict, pas une string JSON
-        table_data = db.crypto.decrypt(encrypted_data)
-        
-        caracteristiques = table_data.get("caracteristique", {})
-        constraints = table_data.get("constraint", {})
-        data = table_data.get("data", [])
-        
         # ==========================================
-        # ADD COLUMN : Ajouter une colonne
+        # RENAME TO : Renommer la table (rename_table prend ses propres verrous)
         # ==========================================
-        if action == "ADD" and len(parts) > 3 and parts[3].upper() == "COLUMN":
-            # ALTER_TABLE users ADD COLUMN email:string[not_null];
-            column_def = " ".join(parts[4:])
-            
-            if ":" not in column_def:
-                print("Syntax error: expected format col:type[constraints]")
-                print("Example: ALTER_TABLE users ADD COLUMN email:string[not_null];")
+        if action == "RENAME" and len(parts) > 3 and parts[3].upper() == "TO":
+            # ALTER_TABLE users RENAME TO customers;
+            if len(parts) < 5:
+                print("New table name required")
+                print("Example: ALTER_TABLE users RENAME TO customers;")
                 return
             
-            # Parser la définition de colonne
-            col_parts = column_def.split(":", 1)
-            col_name = col_parts[0].strip()
-            type_and_constraints = col_parts[1].strip()
+            new_table_name = parts[4]
             
-            # Valider le nom de colonne
-            if not re.match(r'^[a-zA-Z_][a-zA-Z0-9_]*$', col_name):
-                print(f"Invalid column name: '{col_name}'")
+            # Valider le nouveau nom
+            if not re.match(r'^[a-zA-Z_][a-zA-Z0-9_]*$', new_table_name):
+                print(f"Invalid table name: '{new_table_name}'")
                 return
             
-            # Vérifier que la colonne n'existe pas déjà
-            if col_name in caracteristiques:
-                print(f"Column '{col_name}' already exists")
+            new_table_path = db._get_table_path(useDatabase, new_table_name)
+            if new_table_path.exists():
+                print(f"Table '{new_table_name}' already exists")
                 return
             
-            # Extraire type et contraintes
-            if "[" in type_and_constraints and "]" in type_and_constraints:
-                type_part = type_and_constraints.split("[", 1)[0].strip()
-                constraint_part = type_and_constraints[
-                    type_and_constraints.find("[") + 1:type_and_constraints.rfind("]")
-                ].strip()
-                raw_constraints = [c.strip() for c in constraint_part.split(",") if c.strip()]
-            else:
-                type_part = type_and_constraints.strip()
-                raw_constraints = []
-            
-            # Valider le type
-            all_types = ["date", "year", "time", "datetime", "bool", "number", "float", "string", "text", "bit"]
-            if type_part.lower() not in all_types:
-                print(f"Unknown type '{type_part}'")
-                print(f"Available types: {', '.join(all_types)}")
-                return
+            # Les pages chiffrées ne dépendent pas du nom : un simple renommage suffit
+            db.rename_table(useDatabase, table_name, new_table_name)
             
-            # Normaliser les contraintes
-            constraints_allowed = {
-                "not_null": "Not_null",
-                "unique": "Unique",
-                "primary_key": "Primary_key",
-                "foreign_key": "Foreign_key",
-                "check": "Check",
-                "default": "Default",
-                "auto_increment": "Auto_increment"
-            }
-            
-            normalized_constraints = []
-            for rc in raw_constraints:
-                key = rc.lower().replace(" ", "_").replace("-", "_")
-                if key in constraints_allowed:
-                    normalized_constraints.append(constraints_allowed[key])
-                else:
-                    print(f"⚠️ Unknown constraint: {rc}")
+            print(f"✓ Table '{table_name}' renamed to '{new_table_name}'")
+            return
+        
+        # Lecture et écriture sous le même verrou, sur une copie : un ALTER concurrent
+        # n'est pas perdu et un échec d'écriture ne laisse pas le cache modifié
+        with db.table_lock(useDatabase, table_name):
+            # ========================================
+            # CHARGEMENT AVEC DÉCHIFFREMENT
+            # ========================================
+            # db.load_table_copy() déchiffre toutes les pages et retourne une copie modifiable
+            table_data = db.load_table_copy(useDatabase, table_name)
+        
+            caracteristiques = table_data.get("caracteristique", {})
+            constraints = table_data.get("constraint", {})
+            data = table_data.get("data", [])
+        
+            # ==========================================
+            # ADD COLUMN : Ajouter une colonne
+            # ==========================================
+            if action == "ADD" and len(parts) > 3 and parts[3].upper() == "COLUMN":
+                # ALTER_TABLE users ADD COLUMN email:string[not_null];
+                column_def = " ".join(parts[4:])
+            
+                if ":" not in column_def:
+                    print("Syntax error: expected format col:type[constraints]")
+                    print("Example: ALTER_TABLE users ADD COLUMN email:string[not_null];")
                     return
             
-            # Ajouter la colonne
-            caracteristiques[col_name] = type_part.capitalize() if type_part.lower() != "number" else "Number"
-            constraints[col_name] = normalized_constraints if normalized_constraints else ["no constraint"]
+                # Parser la définition de colonne
+                col_parts = column_def.split(":", 1)
+                col_name = col_parts[0].strip()
+                type_and_constraints = col_parts[1].strip()
             
-            # Ajouter une valeur par défaut NULL pour toutes les lignes existantes
-            for row in data:
-                row[col_name] = None
+                # Valider le nom de colonne
+                if not re.match(r'^[a-zA-Z_][a-zA-Z0-9_]*$', col_name):
+                    print(f"Invalid column name: '{col_name}'")
+                    return
             
-            print(f"✓ Column '{col_name}' added to table '{table_name}'")
-        
-        # ==========================================
-        # DROP COLUMN : Supprimer une colonne
-        # ==========================================
-        elif action == "DROP" and len(parts) > 3 and parts[3].upper() == "COLUMN":
-            col_name = parts[4] if len(parts) > 4 else ""
+                # Vérifier que la colonne n'existe pas déjà
+                if col_name in caracteristiques:
+                    print(f"Column '{col_name}' already exists")
+                    return
             
-            if not col_name:
-                print("Column name required")
-                print("Example: ALTER_TABLE users DROP COLUMN email;")
-                return
+                # Extraire type et contraintes
+                if "[" in type_and_constraints and "]" in type_and_constraints:
+                    type_part = type_and_constraints.split("[", 1)[0].strip()
+                    constraint_part = type_and_constraints[
+                        type_and_constraints.find("[") + 1:type_and_constraints.rfind("]")
+                    ].strip()
+                    raw_constraints = [c.strip() for c in constraint_part.split(",") if c.strip()]
+                else:
+                    type_part = type_and_constraints.strip()
+                    raw_constraints = []
             
-            if col_name not in caracteristiques:
-                print(f"Column '{col_name}' does not exist")
-                return
+                # Valider le type
+                all_types = ["date", "year", "time", "datetime", "bool", "number", "float", "string", "text", "bit"]
+                if type_part.lower() not in all_types:
+                    print(f"Unknown type '{type_part}'")
+                    print(f"Available types: {', '.join(all_types)}")
+                    return
+            
+                # Normaliser les contraintes
+                constraints_allowed = {
+                    "not_null": "Not_null",
+                    "unique": "Unique",
+                    "primary_key": "Primary_key",
+                    "foreign_key": "Foreign_key",
+                    "check": "Check",
+                    "default": "Default",
+                    "auto_increment": "Auto_increment"
+                }
             
-            col_constraints = constraints.get(col_name, [])
-            if "Primary_key" in col_constraints or "primary_key" in [c.lower() for c in col_constraints]:
-                try:
-                    confirm = input(f"⚠️ '{col_name}' is a PRIMARY KEY. Continue? (yes/no): ").lower()
-                    if confirm not in ["yes", "y"]:
-                        print("Operation cancelled")
+                normalized_constraints = []
+                for rc in raw_constraints:
+                    key = rc.lower().replace(" ", "_").replace("-", "_")
+                    if key in constraints_allowed:
+                        normalized_constraints.append(constraints_allowed[key])
+                    else:
+                        print(f"⚠️ Unknown constraint: {rc}")
                         return
-                except (KeyboardInterrupt, EOFError):
-                    print("\nOperation cancelled")
-                    return
             
-            del caracteristiques[col_name]
-            if col_name in constraints:
-                del constraints[col_name]
+                # Ajouter la colonne
+                caracteristiques[col_name] = type_part.capitalize() if type_part.lower() != "number" else "Number"
+                constraints[col_name] = normalized_constraints if normalized_constraints else ["no constraint"]
             
-            for row in data:
-                if col_name in row:
-                    del row[col_name]
+                # Ajouter une valeur par défaut NULL pour toutes les lignes existantes
+                for row in data:
+                    row[col_name] = None
             
-            print(f"✓ Column '{col_name}' dropped from table '{table_name}'")
+                print(f"✓ Column '{col_name}' added to table '{table_name}'")
         
-        # ==========================================
-        # RENAME COLUMN : Renommer une colonne
-        # ==========================================
-        elif action == "RENAME" and len(parts) > 3 and parts[3].upper() == "COLUMN":
-            # ALTER_TABLE users RENAME COLUMN old_name TO new_name;
-            if len(parts) < 6 or parts[5].upper() != "TO":
-                print("Syntax error")
-                print("Example: ALTER_TABLE users RENAME COLUMN old_name TO new_name;")
-                return
+            # ==========================================
+            # DROP COLUMN : Supprimer une colonne
+            # ==========================================
+            elif action == "DROP" and len(parts) > 3 and parts[3].upper() == "COLUMN":
+                col_name = parts[4] if len(parts) > 4 else ""
+            
+                if not col_name:
+                    print("Column name required")
+                    print("Example: ALTER_TABLE users DROP COLUMN email;")
+                    return
             
-            old_name = parts[4]
-            new_name = parts[6]
+                if col_name not in caracteristiques:
+                    print(f"Column '{col_name}' does not exist")
+                    return
             
-            if old_name not in caracteristiques:
-                print(f"Column '{old_name}' does not exist")
-                return
+                col_constraints = constraints.get(col_name, [])
+                if "Primary_key" in col_constraints or "primary_key" in [c.lower() for c in col_constraints]:
+                    try:
+                        confirm = input(f"⚠️ '{col_name}' is a PRIMARY KEY. Continue? (yes/no): ").lower()
+                        if confirm not in ["yes", "y"]:
+                            print("Operation cancelled")
+                            return
+                    except (KeyboardInterrupt, EOFError):
+                        print("\nOperation cancelled")
+                        return
             
-            if new_name in caracteristiques:
-                print(f"Column '{new_name}' already exists")
-                return
+                del caracteristiques[col_name]
+                if col_name in constraints:
+                    del constraints[col_name]
             
-            # Valider le nouveau nom
-            if not re.match(r'^[a-zA-Z_][a-zA-Z0-9_]*$', new_name):
-                print(f"Invalid column name: '{new_name}'")
-                return
+                # Les index sur la colonne disparaissent avec elle
+                indexes = table_data.get("indexes", {})
+                for index_name in [n for n, c in indexes.items() if c == col_name]:
+                    del indexes[index_name]
             
-            # Renommer dans caracteristiques
-            caracteristiques[new_name] = caracteristiques.pop(old_name)
+                for row in data:
+                    if col_name in row:
+                        del row[col_name]
             
-            # Renommer dans constraints
-            if old_name in constraints:
-                constraints[new_name] = constraints.pop(old_name)
+                print(f"✓ Column '{col_name}' dropped from table '{table_name}'")
+        
+            # ==========================================
+            # RENAME COLUMN : Renommer une colonne
+            # ==========================================
+            elif action == "RENAME" and len(parts) > 3 and parts[3].upper() == "COLUMN":
+                # ALTER_TABLE users RENAME COLUMN old_name TO new_name;
+                if len(parts) < 6 or parts[5].upper() != "TO":
+                    print("Syntax error")
+                    print("Example: ALTER_TABLE users RENAME COLUMN old_name TO new_name;")
+                    return
             
-            # Renommer dans les données
-            for row in data:
-                if old_name in row:
-                    row[new_name] = row.pop(old_name)
+                old_name = parts[4]
+                new_name = parts[6]
             
-            print(f"✓ Column '{old_name}' renamed to '{new_name}'")
-        
-        # ==========================================
-        # MODIFY COLUMN : Modifier le type d'une colonne
-        # ==========================================
-        elif action == "MODIFY" and len(parts) > 3 and parts[3].upper() == "COLUMN":
-            column_def = " ".join(parts[4:])
+                if old_name not in caracteristiques:
+                    print(f"Column '{old_name}' does not exist")
+                    return
             
-            if ":" not in column_def:
-                print("Syntax error: expected format col:new_type[constraints]")
-                print("Example: ALTER_TABLE users MODIFY COLUMN age:number[not_null];")
-                return
+                if new_name in caracteristiques:
+                    print(f"Column '{new_name}' already exists")
+                    return
             
-            # Parser la définition
-            col_parts = column_def.split(":", 1)
-            col_name = col_parts[0].strip()
-            type_and_constraints = col_parts[1].strip()
+                # Valider le nouveau nom
+                if not re.match(r'^[a-zA-Z_][a-zA-Z0-9_]*$', new_name):
+                    print(f"Invalid column name: '{new_name}'")
+                    return
             
-            if col_name not in caracteristiques:
-                print(f"Column '{col_name}' does not exist")
-                return
+                # Renommer dans caracteristiques
+                caracteristiques[new_name] = caracteristiques.pop(old_name)
             
-            # Extraire type et contraintes
-            if "[" in type_and_constraints and "]" in type_and_constraints:
-                type_part = type_and_constraints.split("[", 1)[0].strip()
-                constraint_part = type_and_constraints[
-                    type_and_constraints.find("[") + 1:type_and_constraints.rfind("]")
-                ].strip()
-                raw_constraints = [c.strip() for c in constraint_part.split(",") if c.strip()]
-            else:
-                type_part = type_and_constraints.strip()
-                raw_constraints = []
+                # Renommer dans constraints
+                if old_name in constraints:
+                    constraints[new_name] = constraints.pop(old_name)
             
-            # Valider le type
-            all_types = ["date", "year", "time", "datetime", "bool", "number", "float", "string", "text", "bit"]
-            if type_part.lower() not in all_types:
-                print(f"Unknown type '{type_part}'")
-                return
+                # Renommer dans les définitions d'index
+                indexes = table_data.get("indexes", {})
+                for index_name, col in indexes.items():
+                    if col == old_name:
+                        indexes[index_name] = new_name
             
-            # Normaliser les contraintes
-            constraints_allowed = {
-                "not_null": "Not_null",
-                "unique": "Unique",
-                "primary_key": "Primary_key",
-                "foreign_key": "Foreign_key",
-                "check": "Check",
-                "default": "Default",
-                "auto_increment": "Auto_increment"
-            }
-            
-            normalized_constraints = []
-            for rc in raw_constraints:
-                key = rc.lower().replace(" ", "_").replace("-", "_")
-                if key in constraints_allowed:
-                    normalized_constraints.append(constraints_allowed[key])
-            
-            # Avertissement sur le changement de type
-            old_type = caracteristiques[col_name]
-            if old_type.lower() != type_part.lower():
-                print(f"⚠️ Warning: Changing type from {old_type} to {type_part}")
-                print("   Existing data may become incompatible")
-                try:
-                    confirm = input("Continue? (yes/no): ").lower()
-                    if confirm not in ["yes", "y"]:
-                        print("Operation cancelled")
-                        return
-                except (KeyboardInterrupt, EOFError):
-                    print("\nOperation cancelled")
+                # Renommer dans les données
+                for row in data:
+                    if old_name in row:
+                        row[new_name] = row.pop(old_name)
+            
+                print(f"✓ Column '{old_name}' renamed to '{new_name}'")
+        
+            # ==========================================
+            # MODIFY COLUMN : Modifier le type d'une colonne
+            # ==========================================
+            elif action == "MODIFY" and len(parts) > 3 and parts[3].upper() == "COLUMN":
+                column_def = " ".join(parts[4:])
+            
+                if ":" not in column_def:
+                    print("Syntax error: expected format col:new_type[constraints]")
+                    print("Example: ALTER_TABLE users MODIFY COLUMN age:number[not_null];")
                     return
             
-            # Modifier le type et les contraintes
-            caracteristiques[col_name] = type_part.capitalize() if type_part.lower() != "number" else "Number"
-            constraints[col_name] = normalized_constraints if normalized_constraints else ["no constraint"]
+                # Parser la définition
+                col_parts = column_def.split(":", 1)
+                col_name = col_parts[0].strip()
+                type_and_constraints = col_parts[1].strip()
             
-            print(f"✓ Column '{col_name}' modified")
-        
-        # ==========================================
-        # RENAME TO : Renommer la table
-        # ==========================================
-        elif action == "RENAME" and len(parts) > 3 and parts[3].upper() == "TO":
-            # ALTER_TABLE users RENAME TO customers;
-            if len(parts) < 5:
-                print("New table name required")
-                print("Example: ALTER_TABLE users RENAME TO customers;")
-                return
+                if col_name not in caracteristiques:
+                    print(f"Column '{col_name}' does not exist")
+                    return
             
-            new_table_name = parts[4]
+                # Extraire type et contraintes
+                if "[" in type_and_constraints and "]" in type_and_constraints:
+                    type_part = type_and_constraints.split("[", 1)[0].strip()
+                    constraint_part = type_and_constraints[
+                        type_and_constraints.find("[") + 1:type_and_constraints.rfind("]")
+                    ].strip()
+                    raw_constraints = [c.strip() for c in constraint_part.split(",") if c.strip()]
+                else:
+                    type_part = type_and_constraints.strip()
+                    raw_constraints = []
             
-            # Valider le nouveau nom
-            if not re.match(r'^[a-zA-Z_][a-zA-Z0-9_]*$', new_table_name):
-                print(f"Invalid table name: '{new_table_name}'")
-                return
+                # Valider le type
+                all_types = ["date", "year", "time", "datetime", "bool", "number", "float", "string", "text", "bit"]
+                if type_part.lower() not in all_types:
+                    print(f"Unknown type '{type_part}'")
+                    return
             
-            new_table_path = DB_PATH / useDatabase / f"{new_table_name}.enc"
-            if new_table_path.exists():
-                print(f"Table '{new_table_name}' already exists")
-                return
+                # Normaliser les contraintes
+                constraints_allowed = {
+                    "not_null": "Not_null",
+                    "unique": "Unique",
+                    "primary_key": "Primary_key",
+                    "foreign_key": "Foreign_key",
+                    "check": "Check",
+                    "default": "Default",
+                    "auto_increment": "Auto_increment"
+                }
             
-            # Préparer les données à sauvegarder
-            table_data["caracteristique"] = caracteristiques
-            table_data["constraint"] = constraints
-            table_data["data"] = data
+                normalized_constraints = []
+                for rc in raw_constraints:
+                    key = rc.lower().replace(" ", "_").replace("-", "_")
+                    if key in constraints_allowed:
+                        normalized_constraints.append(constraints_allowed[key])
             
-            # Chiffrer et sauvegarder avec le nouveau nom
-            encrypted_data = db.crypto.encrypt(table_data)
-            new_table_path.write_bytes(encrypted_data)
+                # Avertissement sur le changement de type
+                old_type = caracteristiques[col_name]
+                if old_type.lower() != type_part.lower():
+                    print(f"⚠️ Warning: Changing type from {old_type} to {type_part}")
+                    print("   Existing data may become incompatible")
+                    try:
+                        confirm = input("Continue? (yes/no): ").lower()
+                        if confirm not in ["yes", "y"]:
+                            print("Operation cancelled")
+                            return
+                    except (KeyboardInterrupt, EOFError):
+                        print("\nOperation cancelled")
+                        return
             
-            # Supprimer l'ancien fichier
-            table_path.unlink()
+                # Modifier le type et les contraintes
+                caracteristiques[col_name] = type_part.capitalize() if type_part.lower() != "number" else "Number"
+                constraints[col_name] = normalized_constraints if normalized_constraints else ["no constraint"]
             
-            print(f"✓ Table '{table_name}' renamed to '{new_table_name}'")
-            return  # Pas besoin de sauvegarder car on a déjà écrit le nouveau fichier
+                print(f"✓ Column '{col_name}' modified")
         
-        else:
-            print("Unknown ALTER_TABLE action")
-            print("Supported actions:")
-            print("  ALTER_TABLE <n> ADD COLUMN <col:type[constraints]>;")
-            print("  ALTER_TABLE <n> DROP COLUMN <col>;")
-            print("  ALTER_TABLE <n> RENAME COLUMN <old> TO <new>;")
-            print("  ALTER_TABLE <n> MODIFY COLUMN <col:type[constraints]>;")
-            print("  ALTER_TABLE <n> RENAME TO <new_name>;")
-            return
+            # ==========================================
+            # COMPRESSION : codec des pages de la table
+            # ==========================================
+            elif action == "COMPRESSION":
+                # ALTER_TABLE logs COMPRESSION zlib;  (default : réglage "compression" de config.json)
+                codec = parts[3].lower() if len(parts) == 4 else ""
+                if codec not in CODECS + ("default",):
+                    print(f"Expected one of: {', '.join(CODECS)}, default")
+                    return
+                if codec == "default":
+                    table_data.pop("compression", None)
+                else:
+                    table_data["compression"] = codec
+                print(f"✓ Compression of '{table_name}' set to {codec}")
+
+            else:
+                print("Unknown ALTER_TABLE action")
+                print("Supported actions:")
+                print("  ALTER_TABLE <n> ADD COLUMN <col:type[constraints]>;")
+                print("  ALTER_TABLE <n> DROP COLUMN <col>;")
+                print("  ALTER_TABLE <n> RENAME COLUMN <old> TO <new>;")
+                print("  ALTER_TABLE <n> MODIFY COLUMN <col:type[constraints]>;")
+                print("  ALTER_TABLE <n> RENAME TO <new_name>;")
+                print("  ALTER_TABLE <n> COMPRESSION zlib|lzma|none|default;")
+                return
         
-        # ========================================
-        # SAUVEGARDE AVEC CHIFFREMENT
-        # ========================================
-        # (sauf pour RENAME TO qui sauvegarde séparément)
-        table_data["caracteristique"] = caracteristiques
-        table_data["constraint"] = constraints
-        table_data["data"] = data
+            # ========================================
+            # SAUVEGARDE AVEC CHIFFREMENT
+            # ========================================
+            table_data["caracteristique"] = caracteristiques
+            table_data["constraint"] = constraints
+            table_data["data"] = data
         
-        encrypted_data = db.crypto.encrypt(table_data)
-        table_path.write_bytes(encrypted_data)
+            db.save_table(useDatabase, table_name, table_data)
         
     except ValueError as e:
         print(f"Syntax error: {e}")
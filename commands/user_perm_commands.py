@@ -1,6 +1,10 @@
 # commands/user_perm_commands.py
 import getpass
+import os
+import re
+from db.errors import PermissionDenied
 from utils.config_loader import load_config
+from utils.data_files import FORMATS, guess_format, read_records
 
 config = load_config()
 ALL_PERMISSION = config.get("permissions", [
@@ -57,8 +61,8 @@ def handle_user_perm_commands(cmd, cmd_line, db, useDatabase, isDbUse, DEFAULT_P
                 return None
 
             # Créer l'utilisateur (le hash est fait dans userManager)
-            db.userManager.create_user(username, password, role)
-            print(f"✓ User '{username}' created with role '{role}'")
+            if db.userManager.create_user(username, password, role):
+                print(f"✓ User '{username}' created with role '{role}'")
 
         except Exception as e:
             print("Usage: create_user <username> [role=user|admin];")
@@ -67,6 +71,35 @@ def handle_user_perm_commands(cmd, cmd_line, db, useDatabase, isDbUse, DEFAULT_P
 
         return None
 
+    # ========================================
+    # CREATE USERS - Création en masse depuis un fichier CSV / JSON Lines
+    # ========================================
+    elif cmd_line == "create_users":
+        # create_users from '<fichier>' [format=csv|jsonl]
+        m = re.match(r"""^create_users\s+from\s+(['"])(.+?)\1(?:\s+format\s*=\s*(\w+))?$""", cmd, re.IGNORECASE)
+        if not m:
+            print("Usage: create_users from '<file>' [format=csv|jsonl];")
+            print("       (columns: username, password, role)")
+            return None
+        _, file_path, fmt = m.groups()
+        fmt = (fmt or guess_format(file_path)).lower()
+        if fmt not in FORMATS:
+            print(f"Unknown format '{fmt}' (expected {' or '.join(FORMATS)})")
+            return None
+        if not os.path.isfile(file_path):
+            print(f"File not found: {file_path}")
+            return None
+        try:
+            created, skipped = db.userManager.create_users(read_records(file_path, fmt))
+        except (ValueError, OSError) as e:
+            print(f"Error: {e}")
+            print("No user created")
+            return None
+        if skipped:
+            print(f"Already existing, skipped: {', '.join(skipped)}")
+        print(f"✓ {len(created)} user{'s' if len(created) != 1 else ''} created")
+        return None
+
     # ========================================
     # LIST USER
     # ========================================
@@ -94,8 +127,8 @@ def handle_user_perm_commands(cmd, cmd_line, db, useDatabase, isDbUse, DEFAULT_P
             
             confirm = input(f"⚠️ Delete user '{username}'? (yes/no): ").lower()
             if confirm in ["yes", "y", "oui"]:
-                db.userManager.drop_user(username)
-                print(f"✓ User '{username}' deleted")
+                if db.userManager.drop_user(username):
+                    print(f"✓ User '{username}' deleted")
             else:
                 print("Operation cancelled")
                 
@@ -105,138 +138,66 @@ def handle_user_perm_commands(cmd, cmd_line, db, useDatabase, isDbUse, DEFAULT_P
         return None
 
     # ========================================
-    # GRANT - Accorder des permissions (MULTIPLE)
+    # GRANT / REVOKE - Permissions multiples, tables multiples ou '*', plusieurs utilisateurs
     # ========================================
-    elif cmd_line == "grant":
-        try:
-            parts = cmd.split()
-            
-            if len(parts) < 5:
-                raise ValueError("Incomplete command")
-            
-            # Trouver les indices des mots-clés
-            on_idx = parts.index("on")
-            to_idx = parts.index("to")
-            
-            # Extraire les permissions (tout entre grant et on)
-            perm_str = " ".join(parts[1:on_idx])
-            target = parts[on_idx + 1]
-            username = parts[to_idx + 1]
-            
-            # Parser les permissions multiples (séparées par des virgules)
-            raw_permissions = [p.strip().upper() for p in perm_str.split(",")]
-            
-            # Valider toutes les permissions
-            invalid_perms = [p for p in raw_permissions if p not in ALL_PERMISSION]
-            if invalid_perms:
-                print(f"Invalid permission(s): {', '.join(invalid_perms)}")
-                print(f"Available permissions: {', '.join(ALL_PERMISSION)}")
-                return None
-            
-            # Déterminer la base et la table
-            if "." in target:
-                db_name, table_name = target.split(".", 1)
-            else:
-                db_name = useDatabase
-                table_name = target
-            
-            if not db_name:
-                print("No database selected and no database qualified")
-                print("Use: grant <perm> on <db.table> to <user>;")
-                return None
-            
-            # Accorder chaque permission
-            granted_perms = []
-            failed_perms = []
-            
-            for perm in raw_permissions:
-                try:
-                    success = db.permManager.grant(
-                        db_name, table_name, username, perm,
-                        db.current_user["username"], 
-                        db.current_user["role"]
-                    )
-                    if success or success is None:  # None = pas de retour explicite
-                        granted_perms.append(perm)
-                    else:
-                        failed_perms.append(perm)
-                except Exception as e:
-                    print(f"⚠️ Failed to grant {perm}: {e}")
-                    failed_perms.append(perm)
-            
-            # Afficher le résumé
-            if granted_perms:
-                perm_list = ", ".join(granted_perms)
-                print(f"✓ Granted {perm_list} on {db_name}.{table_name} to {username}")
-            
-            if failed_perms:
-                perm_list = ", ".join(failed_perms)
-                print(f"Failed to grant: {perm_list}")
-            
-        except ValueError as e:
-            if "not in list" in str(e):
-                print("Syntax error: missing 'on' or 'to' keyword")
-            print("Usage: grant <permission[,permission,...]> on <table|db.table|*> to <user>;")
+    elif cmd_line in ("grant", "revoke"):
+        keyword = "to" if cmd_line == "grant" else "from"
+        usage = f"Usage: {cmd_line} <permission[,permission,...]> on <table|db.table|*|db.*>[, ...] {keyword} <user>[, ...];"
+        m = re.match(rf"^{cmd_line}\s+(.+?)\s+on\s+(.+?)\s+{keyword}\s+(.+)$", cmd.strip(), re.IGNORECASE)
+        if not m:
+            print(f"Syntax error: missing 'on' or '{keyword}' keyword")
+            print(usage)
             print("Examples:")
-            print("  grant SELECT on users to alice;")
-            print("  grant SELECT, INSERT, UPDATE on users to alice;")
-        except Exception as e:
-            print(f"Error: {e}")
-            print("Usage: grant <permission[,permission,...]> on <table|db.table|*> to <user>;")
-
-        return None
-
-    # ========================================
-    # REVOKE - Révoquer des permissions
-    # ========================================
-    elif cmd_line == "revoke":
-        try:
-            parts = cmd.split()
-            
-            if len(parts) < 5:
-                raise ValueError("Incomplete command")
-            
-            perm = parts[1].upper()
-            
-            # Vérifier que la permission existe
-            if perm not in ALL_PERMISSION:
-                print(f"Invalid permission '{perm}'")
-                print(f"Available permissions: {', '.join(ALL_PERMISSION)}")
-                return None
-            
-            # Parser la commande
-            on_idx = parts.index("on")
-            from_idx = parts.index("from")
-            target = parts[on_idx + 1]
-            username = parts[from_idx + 1]
-            
-            # Déterminer la base et la table
-            if "." in target:
-                db_name, table_name = target.split(".", 1)
-            else:
-                db_name = useDatabase
-                table_name = target
-            
+            print(f"  {cmd_line} SELECT on users {keyword} alice;")
+            print(f"  {cmd_line} SELECT, INSERT on users, orders {keyword} alice, bob;")
+            print(f"  {cmd_line} SELECT on * {keyword} alice;")
+            return None
+
+        permissions, targets, usernames = (
+            [item.strip() for item in group.split(",") if item.strip()] for group in m.groups())
+        permissions = [p.upper() for p in permissions]
+        invalid_perms = [p for p in permissions if p not in ALL_PERMISSION]
+        if invalid_perms:
+            print(f"Invalid permission(s): {', '.join(invalid_perms)}")
+            print(f"Available permissions: {', '.join(ALL_PERMISSION)}")
+            return None
+
+        # Regroupement par base : un seul chargement / enregistrement de permissions.enc par base
+        by_database = {}
+        for target in targets:
+            db_name, table_name = target.split(".", 1) if "." in target else (useDatabase, target)
             if not db_name:
                 print("No database selected and no database qualified")
-                print("Use: revoke <perm> on <db.table> from <user>;")
+                print(f"Use: {cmd_line} <perm> on <db.table> {keyword} <user>;")
                 return None
-            
-            # Révoquer la permission
-            db.permManager.revoke(
-                db_name, table_name, username, perm,
-                db.current_user["username"],
-                db.current_user["role"]
-            )
-            
-        except ValueError as e:
-            if "not in list" in str(e):
-                print("Syntax error: missing 'on' or 'from' keyword")
-            print("Usage: revoke <permission> on <table|db.table|*> from <user>;")
-            print("Example: revoke SELECT on users from alice;")
-        except Exception as e:
-            print(f"Error: {e}")
-            print("Usage: revoke <permission> on <table|db.table|*> from <user>;")
+            by_database.setdefault(db_name, []).append(table_name)
+
+        existing = db.list_database()
+        for db_name, tables in by_database.items():
+            if db_name not in existing:
+                print(f"Database '{db_name}' does not exist")
+                continue
+            entries = [(user, table, perm) for user in usernames for table in tables for perm in permissions]
+            try:
+                if cmd_line == "grant":
+                    count = db.permManager.grant_many(db_name, entries, db.current_user["username"],
+                                                      db.current_user["role"], db.list_table(db_name))
+                else:
+                    count = db.permManager.revoke_many(db_name, entries, db.current_user["username"],
+                                                       db.current_user["role"])
+            except PermissionDenied as e:
+                print(e)
+                continue
+            except Exception as e:
+                print(f"Error: {e}")
+                continue
+            what = f"{', '.join(permissions)} on {', '.join(f'{db_name}.{t}' for t in tables)}"
+            if cmd_line == "grant":
+                print(f"✓ Granted {what} to {', '.join(usernames)} ({count} new)")
+            elif count:
+                print(f"✓ Revoked {what} from {', '.join(usernames)} ({count} removed)")
+            else:
+                print(f"No {what} to revoke from {', '.join(usernames)}")
 
         return None
 
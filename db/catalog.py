@@ -0,0 +1,109 @@
+# db/catalog.py
+"""Catalogue système d'une base : <db>/catalog.enc
+
+One entry per table: schema (columns, constraints, secondary indexes), row
+count and byte size of the table file, creation and modification times, and
+the WAL position those figures were taken at. Entries are rewritten whenever a
+table file is (create, checkpoint, alter, index, rename, drop); rows logged
+since then are counted from the journal by Db.table_stats, so inserts, updates
+and deletes never touch the catalog.
+"""
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from db.locks import LockManager, atomic_write_bytes
+
+CATALOG_FILE = "catalog"
+SCHEMA_KEYS = ("caracteristique", "constraint", "indexes")
+
+
+def table_entry(content: Dict[str, Any], rows: int, size: int,
+                created: Optional[float] = None) -> Dict[str, Any]:
+    """Entrée du catalogue pour le contenu (ou l'en-tête) d'une table qui vient d'être écrit"""
+    now = round(time.time(), 3)
+    entry = {key: content.get(key, {}) for key in SCHEMA_KEYS}
+    entry.update(rows=rows, bytes=size, lsn=content.get("wal_lsn", 0),
+                 created=created or now, modified=now)
+    return entry
+
+
+class Catalog:
+    def __init__(self, db_path, crypto, locks=None):
+        self.dbPath = Path(db_path)
+        self.crypto = crypto
+        self.locks = locks or LockManager()
+        # Cache par base : (signature du fichier, contenu) ; relu si un autre processus l'a modifié
+        self._docs: Dict[str, Tuple[tuple, dict]] = {}
+
+    def _path(self, db_name: str) -> Path:
+        return self.dbPath / db_name / f"{CATALOG_FILE}.enc"
+
+    def load(self, db_name: str) -> Optional[dict]:
+        """{"owner": ..., "tables": {table: entrée}}, ou None si la base n'a pas encore de catalogue"""
+        path = self._path(db_name)
+        with self.locks.shared(path):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                self._docs.pop(db_name, None)
+                return None
+            stamp = (st.st_mtime_ns, st.st_size, st.st_ino)
+            cached = self._docs.get(db_name)
+            if cached is not None and cached[0] == stamp:
+                return cached[1]
+            doc = self.crypto.decrypt(path.read_bytes())
+            self._docs[db_name] = (stamp, doc)
+            return doc
+
+    def _save(self, db_name: str, doc: dict) -> None:
+        path = self._path(db_name)
+        atomic_write_bytes(path, self.crypto.encrypt(doc))
+        st = path.stat()
+        self._docs[db_name] = ((st.st_mtime_ns, st.st_size, st.st_ino), doc)
+
+    def update(self, db_name: str, change: Callable[[dict], None]) -> None:
+        """Lecture-modification-écriture sous verrou exclusif.
+
+        Does nothing when the database has no catalog (dropped, or created
+        before catalogs existed): it is then built from the table files the
+        first time it is read.
+        """
+        path = self._path(db_name)
+        if not path.exists():
+            return
+        with self.locks.exclusive(path):
+            current = self.load(db_name)
+            if current is None:
+                return
+            doc = {"owner": current.get("owner"), "tables": dict(current.get("tables", {}))}
+            change(doc)
+            self._save(db_name, doc)
+
+    def create(self, db_name: str, owner: Optional[str], tables: Optional[Dict[str, dict]] = None) -> None:
+        path = self._path(db_name)
+        with self.locks.exclusive(path):
+            self._save(db_name, {"owner": owner, "tables": dict(tables or {})})
+
+    def put_tables(self, db_name: str, entries: Dict[str, dict]) -> None:
+        """Remplace les entrées données en gardant la date de création des tables existantes"""
+        def change(doc):
+            for name, entry in entries.items():
+                old = doc["tables"].get(name)
+                if old is not None:
+                    entry = dict(entry, created=old.get("created", entry["created"]))
+                doc["tables"][name] = entry
+        self.update(db_name, change)
+
+    def remove_table(self, db_name: str, table_name: str) -> None:
+        self.update(db_name, lambda doc: doc["tables"].pop(table_name, None))
+
+    def rename_table(self, db_name: str, table_name: str, new_name: str) -> None:
+        def change(doc):
+            entry = doc["tables"].pop(table_name, None)
+            if entry is not None:
+                doc["tables"][new_name] = entry
+        self.update(db_name, change)
+
+    def invalidate(self, db_name: str) -> None:
+        self._docs.pop(db_name, None)
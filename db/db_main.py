@@ -1,29 +1,89 @@
 # db/db_main.py
+import copy
 import os
 import shutil
 import json
+from collections import Counter
+from contextlib import ExitStack
+from datetime import datetime
 from pathlib import Path
 from utils.config_loader import load_config
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterable, Iterator, List, Any, Optional, Tuple
 from .user_manager import UserManager
 from .permission_manager import PermissionManager
+from .page_store import PageStore, DEFAULT_PAGE_SIZE, header_copy_path, is_paged_file, convert_legacy_table
+from .wal import ROWID, WriteAheadLog, apply_record, ensure_rowids, row_index
+from .table_cache import TableCache
+from .catalog import CATALOG_FILE, Catalog, table_entry
+from .locks import LockManager, LockTimeout, atomic_write_bytes
+from .errors import AuthenticationError, ConstraintError, NotFoundError, TransactionError
+from .index import TableIndexes, index_key, normalize_constraint, unique_columns
+from .planner import compile_where, plan_rowids
+from utils.data_files import as_raw, batched
 
 config = load_config()
 
+# Fichiers .enc d'une base qui ne sont pas des tables
+RESERVED_FILES = {"permissions", CATALOG_FILE}
+# Version du format sur disque, notée dans <db_path>/FORMAT une fois les migrations faites
+STORAGE_FORMAT = 2  # 1 : tables .enc (plus de .json), 2 : tables paginées
+FORMAT_FILE = "FORMAT"
+
 class Db:
     def __init__(self, db_path: str = ".database", crypto=None):
         self.dbPath = Path(db_path)
         self.crypto = crypto
-        self.userManager = UserManager(self.dbPath, self.crypto)
-        self.permManager = PermissionManager(self.dbPath, self.crypto)
+        self.locks = LockManager(float(config.get("lock_timeout", 10)))
+        self.userManager = UserManager(self.dbPath, self.crypto, self.locks)
+        self.permManager = PermissionManager(self.dbPath, self.crypto, self.locks)
+        self.catalog = Catalog(self.dbPath, self.crypto, self.locks)
         self.current_user = {
             "username": config["default_admin"]["username"],
             "role": config["default_admin"]["role"]
         }
+        self.page_size = int(config.get("page_size", DEFAULT_PAGE_SIZE))
+        # Compression des pages par défaut ; une table peut la changer (alter_table ... COMPRESSION)
+        self.compression = config.get("compression", "none")
+        self._stores: Dict[Path, PageStore] = {}
+        self._wals: Dict[str, WriteAheadLog] = {}
+        self._index_sets: Dict[tuple, TableIndexes] = {}
+        # Transaction en cours : {"db", "lsn", "tables": {table: contenu modifié}, "base": {table: wal_lsn
+        # de départ}, "indexes": {(db, table): index de la copie de travail}, "records": [...]}
+        self._txn: Optional[Dict[str, Any]] = None
+        self.wal_checkpoint_records = int(config.get("wal_checkpoint_records", 1000))
+        # Aussi en octets : un record d'insertion porte tout un lot (load_data)
+        self.wal_checkpoint_bytes = int(config.get("wal_checkpoint_bytes", 16 * 1024 * 1024))
+        self.wal_fsync = bool(config.get("wal_fsync", True))
+        cache_conf = config.get("table_cache", {})
+        self.cache = TableCache(int(cache_conf.get("max_entries", 64)),
+                                int(cache_conf.get("max_bytes", 64 * 1024 * 1024)))
         self.dbPath.mkdir(exist_ok=True)
-        self._migrate_json_to_enc()
+        self._migrate()
+        self._recover_wal()
+
+    def _migrate(self):
+        """Migrations du format sur disque, seulement si FORMAT est absent ou plus ancien.
+
+        Without the marker every start would walk the whole data directory.
+        Delete <db_path>/FORMAT to force a new pass (e.g. after copying in
+        tables from an older version).
+        """
+        marker = self.dbPath / FORMAT_FILE
+        try:
+            current = int(marker.read_text().strip())
+        except (OSError, ValueError):
+            current = 0
+        if current >= STORAGE_FORMAT:
+            return
+        with self.locks.exclusive(marker):
+            complete = self._migrate_json_to_enc()
+            complete = self._migrate_enc_to_pages() and complete
+            # Un fichier ignoré sera retenté au prochain démarrage
+            if complete:
+                atomic_write_bytes(marker, f"{STORAGE_FORMAT}\n".encode())
 
-    def _migrate_json_to_enc(self):
+    def _migrate_json_to_enc(self) -> bool:
+        complete = True
         for json_file in self.dbPath.rglob("*.json"):
             enc_file = json_file.with_suffix(".enc")
             if not enc_file.exists():
@@ -34,10 +94,444 @@ class Db:
                     json_file.unlink()
                 except Exception as e:
                     print(f"Skip: {e}")
+                    complete = False
+        return complete
+
+    def _migrate_enc_to_pages(self) -> bool:
+        """Convertit les tables encore stockées en un seul jeton Fernet au format paginé"""
+        complete = True
+        for db_dir in self.dbPath.iterdir():
+            if not db_dir.is_dir():
+                continue
+            for enc_file in db_dir.glob("*.enc"):
+                if enc_file.stem in RESERVED_FILES or is_paged_file(enc_file):
+                    continue
+                print(f"Converting: {enc_file} → paged format")
+                try:
+                    convert_legacy_table(enc_file, self.crypto, self.page_size)
+                except AuthenticationError:
+                    raise
+                except Exception as e:
+                    print(f"Skip: {e}")
+                    complete = False
+        return complete
+
+    def _recover_wal(self):
+        """Rejoue les journaux laissés par une session interrompue"""
+        for wal_file in self.dbPath.glob("*/wal.log"):
+            try:
+                self.checkpoint(wal_file.parent.name)
+            except AuthenticationError:
+                raise
+            except Exception as e:
+                print(f"WAL recovery failed for '{wal_file.parent.name}': {e}")
 
     def _get_table_path(self, db_name: str, table_name: str) -> Path:
         return self.dbPath / db_name / f"{table_name}.enc"
 
+    def _wal(self, db_name: str) -> WriteAheadLog:
+        wal = self._wals.get(db_name)
+        if wal is None:
+            wal = WriteAheadLog(self.dbPath / db_name / "wal.log", self.crypto, self.wal_fsync, self.locks)
+            self._wals[db_name] = wal
+        wal.refresh()
+        return wal
+
+    def _get_index_path(self, db_name: str, table_name: str) -> Path:
+        return self.dbPath / db_name / f"{table_name}.idx"
+
+    def _indexes(self, db_name: str, table_name: str) -> TableIndexes:
+        """Index PRIMARY KEY / UNIQUE de la table, à jour avec son contenu"""
+        content = self.load_table(db_name, table_name)
+        # Dans une transaction, les index suivent la copie de travail, pas la table validée
+        in_txn = self._txn is not None and self._txn["db"] == db_name
+        index_sets = self._txn["indexes"] if in_txn else self._index_sets
+        indexes = index_sets.get((db_name, table_name))
+        if indexes is None or indexes.lsn != content.get("wal_lsn", 0):
+            indexes = TableIndexes(self._get_index_path(db_name, table_name), self.crypto, self._coerce_value)
+            if not indexes.load(content):
+                indexes.build(content)
+            index_sets[(db_name, table_name)] = indexes
+        return indexes
+
+    def _rebuild_indexes(self, db_name: str, table_name: str, content: dict) -> None:
+        indexes = TableIndexes(self._get_index_path(db_name, table_name), self.crypto, self._coerce_value)
+        indexes.build(content)
+        indexes.save()
+        self._index_sets[(db_name, table_name)] = indexes
+
+    def _log(self, db_name: str, table_name: str, op: str, **payload) -> int:
+        if self._txn is None:
+            return self._wal(db_name).append(table_name, op, **payload)
+        # Dans une transaction : appliqué à la copie de travail, journalisé au commit
+        txn = self._txn
+        overlay = txn["tables"].get(table_name)
+        if overlay is None:
+            content = self.load_table(db_name, table_name)
+            overlay = dict(content, data=list(content.get("data", [])))
+            txn["tables"][table_name] = overlay
+            txn["base"][table_name] = content.get("wal_lsn", 0)
+        txn["lsn"] = max(txn["lsn"], self._wal(db_name).last_lsn) + 1
+        record = dict(payload, lsn=txn["lsn"], table=table_name, op=op)
+        apply_record(overlay, record)
+        txn["records"].append(record)
+        return record["lsn"]
+
+    def _maybe_checkpoint(self, db_name: str) -> None:
+        """Checkpoint après wal_checkpoint_records enregistrements ou wal_checkpoint_bytes octets.
+
+        Until then the records stay in memory (WriteAheadLog.records) and are
+        replayed onto the cached table, whose cache accounting only catches up
+        when the checkpoint writes the file; so the byte limit is also what
+        bounds the memory a long load_data adds on top of the table itself.
+        """
+        if self._txn is not None:
+            return
+        wal = self._wal(db_name)
+        if len(wal.records) >= self.wal_checkpoint_records or wal.size() >= self.wal_checkpoint_bytes:
+            try:
+                # Sans attendre : si une table est occupée, le checkpoint sera fait plus tard
+                self.checkpoint(db_name, timeout=0)
+            except LockTimeout:
+                pass
+
+    def table_lock(self, db_name: str, table_name: str, exclusive: bool = True):
+        """Verrou inter-processus d'une table (lecture-modification-écriture atomique)"""
+        path = self._get_table_path(db_name, table_name)
+        return self.locks.exclusive(path) if exclusive else self.locks.shared(path)
+
+    def show_lock_stats(self) -> None:
+        stats = self.locks.stats()
+        print("—" * 52)
+        print(" LOCKS ".center(52, " "))
+        print("—" * 52)
+        print(f" {'Mode':<10} | {'Acquired':>8} | {'Waited':>6} | {'Total wait':>10} | {'Max':>7}")
+        print("—" * 52)
+        for mode, values in stats.items():
+            print(f" {mode:<10} | {values['acquired']:>8} | {values['contended']:>6} | "
+                  f"{values['wait'] * 1000:>8.1f}ms | {values['max_wait'] * 1000:>5.1f}ms")
+        print("—" * 52)
+
+    # ------------------------------------------------------------------
+    # Transactions
+    # ------------------------------------------------------------------
+    def in_transaction(self) -> bool:
+        return self._txn is not None
+
+    def _overlay(self, db_name: str, table_name: str) -> Optional[dict]:
+        if self._txn is None or self._txn["db"] != db_name:
+            return None
+        return self._txn["tables"].get(table_name)
+
+    def begin_transaction(self, db_name: str) -> None:
+        """Démarre une transaction : les écritures restent en mémoire jusqu'au commit.
+
+        Mutations are applied to per-table working copies (the row list is
+        copied, rows themselves are shared since updates replace them) with
+        their own index sets; rollback simply forgets both.
+        """
+        if self._txn is not None:
+            raise TransactionError("A transaction is already in progress")
+        self._txn = {"db": db_name, "lsn": self._wal(db_name).last_lsn, "tables": {}, "base": {},
+                     "indexes": {}, "records": []}
+
+    def commit_transaction(self) -> int:
+        """Écrit toutes les modifications de la transaction dans une seule trame du journal ;
+        renvoie le nombre de modifications.
+
+        The written tables are locked exclusively (sorted by name, as in
+        checkpoint) until the frame is appended. A table that another session
+        changed since the transaction first wrote to it is rebased when the
+        transaction only inserted into it: rows are checked again against the
+        current indexes and get row ids from the current next_rowid. Any other
+        conflict raises TransactionError and the transaction is rolled back.
+        """
+        txn = self._txn
+        if txn is None:
+            raise TransactionError("No transaction in progress")
+        self._txn = None
+        db_name = txn["db"]
+        written = sorted({record["table"] for record in txn["records"]})
+        with ExitStack() as held:
+            for table_name in written:
+                held.enter_context(self.table_lock(db_name, table_name))
+            for table_name in written:
+                self._rebase(db_name, table_name, txn)
+            entries = [{k: v for k, v in record.items() if k != "lsn"} for record in txn["records"]]
+            lsns = self._wal(db_name).append_batch(entries)
+        if lsns == [record["lsn"] for record in txn["records"]]:
+            # Rien d'autre n'a été écrit entre-temps : les index de la transaction sont à jour
+            for table_name in written:
+                key = (db_name, table_name)
+                if key in txn["indexes"]:
+                    self._index_sets[key] = txn["indexes"][key]
+        self._maybe_checkpoint(db_name)
+        return len(entries)
+
+    def _rebase(self, db_name: str, table_name: str, txn: dict) -> None:
+        """Reporte les insertions de la transaction sur la table validée si elle a changé depuis"""
+        if not self._get_table_path(db_name, table_name).exists():
+            raise TransactionError(f"Table '{table_name}' was dropped by another session; "
+                                   "transaction rolled back")
+        content = self.load_table(db_name, table_name)
+        if content.get("wal_lsn", 0) == txn["base"][table_name]:
+            return
+        records = [record for record in txn["records"] if record["table"] == table_name]
+        if any(record["op"] != "insert" for record in records):
+            raise TransactionError(f"Table '{table_name}' was modified by another session; "
+                                   "transaction rolled back")
+        constraints = content.get("constraint", {})
+        indexes = self._indexes(db_name, table_name)
+        pending: Dict[str, set] = {}
+        next_rowid = content["next_rowid"]
+        for record in records:
+            for row in record["rows"]:
+                try:
+                    self._validate_record(constraints, indexes, row, pending)
+                except ConstraintError as e:
+                    raise TransactionError(f"{e} (row committed by another session in '{table_name}'); "
+                                           "transaction rolled back") from None
+                row[ROWID] = next_rowid
+                next_rowid += 1
+
+    def rollback_transaction(self) -> None:
+        if self._txn is None:
+            raise TransactionError("No transaction in progress")
+        self._txn = None
+
+    def begin(self, db_name: str) -> bool:
+        try:
+            self.begin_transaction(db_name)
+        except TransactionError as e:
+            print(e)
+            return False
+        print("Transaction started")
+        return True
+
+    def commit(self) -> bool:
+        try:
+            changes = self.commit_transaction()
+        except TransactionError as e:
+            print(e)
+            return False
+        print(f"Transaction committed ({changes} change{'s' if changes > 1 else ''})")
+        return True
+
+    def rollback(self) -> bool:
+        try:
+            self.rollback_transaction()
+        except TransactionError as e:
+            print(e)
+            return False
+        print("Transaction rolled back")
+        return True
+
+    def log_insert(self, db_name: str, table_name: str, rows: List[dict]) -> None:
+        indexes = self._indexes(db_name, table_name)
+        next_rowid = self.load_table(db_name, table_name)["next_rowid"]
+        for i, row in enumerate(rows):
+            row[ROWID] = next_rowid + i
+        indexes.lsn = self._log(db_name, table_name, "insert", rows=rows)
+        for row in rows:
+            indexes.insert(row)
+        self._maybe_checkpoint(db_name)
+
+    def log_update(self, db_name: str, table_name: str, changes: List[tuple]) -> None:
+        """changes : [(row id, nouvelle_ligne), ...] ; ConstraintError si une nouvelle
+        ligne viole une contrainte (rien n'est alors journalisé)
+
+        A UNIQUE / PRIMARY KEY value is free when every row holding it is one
+        of the rows being replaced, so a row may keep its own key.
+        """
+        indexes = self._indexes(db_name, table_name)
+        content = self.load_table(db_name, table_name)
+        data = content["data"]
+        old_rows = [data[row_index(data, rowid)] for rowid, _ in changes]
+        constraints = content.get("constraint", {})
+        freed = {col: Counter(index_key(old.get(col)) for old in old_rows) for col in unique_columns(constraints)}
+        pending: Dict[str, set] = {}
+        for number, (_, row) in enumerate(changes, 1):
+            try:
+                self._validate_record(constraints, indexes, row, pending, freed)
+            except ConstraintError as e:
+                e.row = number
+                raise
+        for rowid, row in changes:
+            row[ROWID] = rowid
+        indexes.lsn = self._log(db_name, table_name, "update", changes=[[rowid, row] for rowid, row in changes])
+        for old, (_, new) in zip(old_rows, changes):
+            indexes.update(old, new)
+        self._maybe_checkpoint(db_name)
+
+    def log_delete(self, db_name: str, table_name: str, rowids: List[int]) -> None:
+        indexes = self._indexes(db_name, table_name)
+        data = self.load_table(db_name, table_name)["data"]
+        wanted = set(rowids)
+        old_rows = [row for row in data if row[ROWID] in wanted]
+        indexes.lsn = self._log(db_name, table_name, "delete", rowids=sorted(wanted))
+        indexes.delete(old_rows)
+        self._maybe_checkpoint(db_name)
+
+    def log_truncate(self, db_name: str, table_name: str) -> None:
+        indexes = self._indexes(db_name, table_name)
+        indexes.lsn = self._log(db_name, table_name, "truncate")
+        indexes.clear()
+        self._maybe_checkpoint(db_name)
+
+    def find_rows(self, db_name: str, table_name: str, where) -> List[dict]:
+        """Lignes qui satisfont le WHERE (AST), dans l'ordre de la table, en s'aidant des index.
+
+        Rows carry their row id under ROWID; update and delete pass those ids
+        back to log_update / log_delete.
+        """
+        content = self.load_table(db_name, table_name)
+        data = content.get("data", [])
+        if where is None:
+            return list(data)
+        matches = compile_where(where, content.get("caracteristique", {}), self._coerce_value)
+        candidates = plan_rowids(self._indexes(db_name, table_name), where, self._coerce_value)
+        if candidates is None:
+            return [row for row in data if matches(row)]
+        found = (row_index(data, rowid) for rowid in candidates)
+        return [data[i] for i in found if i is not None and matches(data[i])]
+
+    def scan(self, db_name: str, table_name: str, where=None) -> Iterator[dict]:
+        """Parcourt les lignes qui satisfont le WHERE sans construire de liste.
+
+        A table that is neither cached nor touched by the journal is read page by
+        page straight from its file, so an export keeps constant memory.
+        """
+        path = self._get_table_path(db_name, table_name)
+        if (is_paged_file(path) and (db_name, table_name) not in self.cache
+                and self._overlay(db_name, table_name) is None
+                and not self._wal(db_name).records_for(table_name)):
+            store = self._store(db_name, table_name)
+            rows = self._locked_rows(path, store.iter_rows())
+            if where is None:
+                return rows
+            matches = compile_where(where, store.schema().get("caracteristique", {}), self._coerce_value)
+            return filter(matches, rows)
+        return iter(self.find_rows(db_name, table_name, where))
+
+    def _locked_rows(self, path: Path, rows: Iterator[dict]) -> Iterator[dict]:
+        # Verrou partagé tenu pendant toute la lecture page par page
+        with self.locks.shared(path):
+            yield from rows
+
+    def _find_index(self, db_name: str, index_name: str) -> Optional[str]:
+        """Table portant l'index secondaire 'index_name' dans la base"""
+        for table_name in self.list_table(db_name):
+            if index_name in self.load_schema(db_name, table_name).get("indexes", {}):
+                return table_name
+        return None
+
+    def create_index(self, db_name: str, index_name: str, table_name: str, column: str) -> bool:
+        path = self._get_table_path(db_name, table_name)
+        if not path.exists():
+            print(f"Table '{table_name}' does not exist")
+            return False
+        if self._find_index(db_name, index_name):
+            print(f"Index '{index_name}' already exists")
+            return False
+        with self.table_lock(db_name, table_name):
+            content = self.load_table_copy(db_name, table_name)
+            if column not in content.get("caracteristique", {}):
+                print(f"Column '{column}' does not exist")
+                return False
+            content.setdefault("indexes", {})[index_name] = column
+            self.save_table(db_name, table_name, content)
+        print(f"Index '{index_name}' created on {table_name}({column})")
+        return True
+
+    def drop_index(self, db_name: str, index_name: str, table_name: Optional[str] = None) -> bool:
+        table_name = table_name or self._find_index(db_name, index_name)
+        if not table_name or not self._get_table_path(db_name, table_name).exists():
+            print(f"Index '{index_name}' does not exist")
+            return False
+        with self.table_lock(db_name, table_name):
+            content = self.load_table_copy(db_name, table_name)
+            if index_name not in content.get("indexes", {}):
+                print(f"Index '{index_name}' does not exist on '{table_name}'")
+                return False
+            del content["indexes"][index_name]
+            self.save_table(db_name, table_name, content)
+        print(f"Index '{index_name}' dropped")
+        return True
+
+    def repair_table(self, db_name: str, table_name: str) -> int:
+        """Reconvertit les cellules stockées en texte selon le type déclaré de leur colonne.
+
+        Tables written before updates kept native types hold numbers and
+        booleans as strings; this rewrites them once so queries compare typed
+        values. Returns the number of cells changed.
+        """
+        with self.table_lock(db_name, table_name):
+            content = self.load_table_copy(db_name, table_name)
+            types = {col: str(t).lower() for col, t in content.get("caracteristique", {}).items()}
+            fixed = 0
+            for row in content.get("data", []):
+                for col, declared_type in types.items():
+                    value = row.get(col)
+                    if value.__class__ is not str or declared_type in ("string", "text"):
+                        continue
+                    typed = self._coerce_value(value, declared_type)
+                    if typed != value:
+                        row[col] = typed
+                        fixed += 1
+            if fixed:
+                self.save_table(db_name, table_name, content)
+        return fixed
+
+    def checkpoint(self, db_name: str, timeout: Optional[float] = None) -> None:
+        """Reporte le journal dans les fichiers de tables puis le vide.
+
+        Locks are taken in the same order as writers (tables sorted by name,
+        then the journal) and held until the journal is reset, so no record
+        appended by another process can be dropped.
+        """
+        wal = self._wal(db_name)
+        while wal.records:
+            tables = sorted(wal.tables())
+            with ExitStack() as held:
+                for table_name in tables:
+                    held.enter_context(self.locks.exclusive(self._get_table_path(db_name, table_name), timeout))
+                held.enter_context(self.locks.exclusive(wal.path, timeout))
+                wal.refresh()
+                if not wal.records:
+                    return
+                if not wal.tables() <= set(tables):
+                    continue  # une autre table a été modifiée entre-temps
+                entries = {}
+                for table_name in tables:
+                    if not self._get_table_path(db_name, table_name).exists():
+                        continue
+                    content = self.load_table(db_name, table_name)
+                    entries[table_name] = self._write_table(db_name, table_name, content, catalog=False)
+                    indexes = self._index_sets.get((db_name, table_name))
+                    if indexes is not None and indexes.lsn == content.get("wal_lsn", 0):
+                        indexes.save()
+                    else:
+                        self._rebuild_indexes(db_name, table_name, content)
+                # Catalogue mis à jour avant de vider le journal (voir table_stats)
+                if entries:
+                    self.catalog.put_tables(db_name, entries)
+                wal.reset()
+                return
+
+    def _replay(self, db_name: str, table_name: str, content: dict) -> dict:
+        wal = self._wal(db_name)
+        for record in wal.records_for(table_name, content.get("wal_lsn", 0)):
+            apply_record(content, record)
+        return content
+
+    def _store(self, db_name: str, table_name: str) -> PageStore:
+        path = self._get_table_path(db_name, table_name)
+        store = self._stores.get(path)
+        if store is None:
+            store = PageStore(path, self.crypto, self.page_size, self.compression)
+            self._stores[path] = store
+        return store
+
     def create_DB(self, dbName: str) -> bool:
         path = self.dbPath / dbName
         if path.exists():
@@ -45,6 +539,7 @@ class Db:
             return False
         path.mkdir(parents=True)
         self.permManager.set_owner(dbName, self.current_user["username"])
+        self.catalog.create(dbName, self.current_user["username"])
         print(f"Database '{dbName}' created successfully")
         return True
 
@@ -57,6 +552,11 @@ class Db:
             print(f"Database '{databaseName}' does not exist")
             return False
         shutil.rmtree(path)
+        self._wals.pop(databaseName, None)
+        self.catalog.invalidate(databaseName)
+        self.cache.invalidate_where(lambda key: key[0] == databaseName)
+        for key in [k for k in self._index_sets if k[0] == databaseName]:
+            del self._index_sets[key]
         self.permManager.cleanup_database_permissions(databaseName)
         print(f"Database '{databaseName}' removed")
         return True
@@ -67,86 +567,294 @@ class Db:
             print(f"Table '{name}' already exists")
             return False
         path.parent.mkdir(parents=True, exist_ok=True)
-        path.write_bytes(self.crypto.encrypt(attribute))
+        with self.table_lock(dbName, name):
+            # Les anciens enregistrements d'une table du même nom ne s'appliquent pas
+            attribute["wal_lsn"] = self._wal(dbName).last_lsn
+            self._store(dbName, name).create(attribute)
+            self._rebuild_indexes(dbName, name, attribute)
+            self.catalog.put_tables(dbName, {name: table_entry(
+                attribute, len(attribute.get("data", [])), path.stat().st_size)})
         self.permManager.grant(dbName, name, self.current_user["username"], "ALL",
                                self.current_user["username"], self.current_user["role"])
         print(f"Table '{name}' created")
         return True
 
     def list_table(self, db_name: str) -> List[str]:
-        """Liste toutes les tables (.enc) dans une base"""
-        db_dir = self.dbPath / db_name
-        if not db_dir.exists():
-            return []
-        return [f.stem for f in db_dir.glob("*.enc")]
+        """Liste les tables d'une base (d'après le catalogue)"""
+        catalog = self._catalog(db_name)
+        return list(catalog["tables"]) if catalog else []
+
+    def _catalog(self, db_name: str) -> Optional[dict]:
+        """Catalogue de la base, reconstruit depuis les fichiers de tables s'il n'existe pas encore"""
+        if not (self.dbPath / db_name).is_dir():
+            return None
+        catalog = self.catalog.load(db_name)
+        if catalog is None:
+            self._rebuild_catalog(db_name)
+            catalog = self.catalog.load(db_name)
+        return catalog
+
+    def _rebuild_catalog(self, db_name: str) -> None:
+        """Bases créées avant le catalogue : une lecture des en-têtes de chaque table"""
+        entries = {}
+        for table_file in sorted((self.dbPath / db_name).glob("*.enc")):
+            table_name = table_file.stem
+            if table_name in RESERVED_FILES:
+                continue
+            with self.table_lock(db_name, table_name, exclusive=False):
+                schema = self.load_schema(db_name, table_name)
+                if is_paged_file(table_file):
+                    rows = self._store(db_name, table_name).row_count()
+                else:
+                    rows = len(self.crypto.decrypt(table_file.read_bytes()).get("data", []))
+                st = table_file.stat()
+                entries[table_name] = table_entry(schema, rows, st.st_size, created=st.st_mtime)
+                entries[table_name]["modified"] = round(st.st_mtime, 3)
+        self.catalog.create(db_name, self.permManager.get_owner(db_name), entries)
+
+    def table_stats(self, db_name: str, table_name: str) -> Optional[dict]:
+        """Entrée du catalogue complétée par le journal : nombre de lignes et date de
+        modification à jour, sans lire la table. None si la table n'existe pas."""
+        # Journal lu avant le catalogue : un checkpoint intercalé ne fait pas compter deux fois
+        wal = self._wal(db_name)
+        catalog = self._catalog(db_name)
+        entry = catalog["tables"].get(table_name) if catalog else None
+        if entry is None:
+            return None
+        stats = dict(entry)
+        overlay = self._overlay(db_name, table_name)
+        if overlay is not None:
+            stats["rows"] = len(overlay.get("data", []))
+            return stats
+        for record in wal.records_for(table_name, entry["lsn"]):
+            op = record["op"]
+            if op == "insert":
+                stats["rows"] += len(record["rows"])
+            elif op == "delete":
+                stats["rows"] -= len(record.get("rowids", record.get("positions", [])))
+            elif op == "truncate":
+                stats["rows"] = 0
+            stats["modified"] = max(stats["modified"], record.get("at", 0))
+        return stats
+
+    def get_statistics(self, db_name: str) -> dict:
+        """Totaux de la base et statistiques par table, depuis le catalogue"""
+        tables = {name: self.table_stats(db_name, name) for name in self.list_table(db_name)}
+        return {
+            "tables": len(tables),
+            "total_rows": sum(t["rows"] for t in tables.values()),
+            "total_columns": sum(len(t["caracteristique"]) for t in tables.values()),
+            "total_bytes": sum(t["bytes"] for t in tables.values()),
+            "per_table": tables,
+        }
 
     def load_table(self, db_name: str, table_name: str) -> dict:
+        overlay = self._overlay(db_name, table_name)
+        if overlay is not None:
+            return overlay
+        path = self._get_table_path(db_name, table_name)
+        if not path.exists():
+            raise FileNotFoundError()
+        with self.locks.shared(path):
+            st = path.stat()
+            stamp = (st.st_mtime_ns, st.st_size)
+            content = self.cache.get((db_name, table_name), stamp)
+            if content is None:
+                if not is_paged_file(path):
+                    content = self.crypto.decrypt(path.read_bytes())
+                else:
+                    content = self._store(db_name, table_name).load()
+                ensure_rowids(content)
+                self.cache.put((db_name, table_name), stamp, content, st.st_size)
+            # Le contenu en cache est complété avec les enregistrements du journal
+            return self._replay(db_name, table_name, content)
+
+    def load_table_copy(self, db_name: str, table_name: str) -> dict:
+        """Copie modifiable de la table (load_table renvoie le contenu partagé du cache).
+
+        Schema changes and in-place row edits must work on this copy and hand
+        it to save_table, so a failed write leaves the cached table untouched.
+        """
+        return copy.deepcopy(self.load_table(db_name, table_name))
+
+    def load_schema(self, db_name: str, table_name: str) -> dict:
+        """Schéma de la table (caracteristique/constraint) sans déchiffrer les données"""
         path = self._get_table_path(db_name, table_name)
         if not path.exists():
             raise FileNotFoundError()
-        return self.crypto.decrypt(path.read_bytes())
+        with self.locks.shared(path):
+            if not is_paged_file(path):
+                content = self.crypto.decrypt(path.read_bytes())
+                content.pop("data", None)
+                return content
+            return self._store(db_name, table_name).schema()
+
+    def count_rows(self, db_name: str, table_name: str) -> int:
+        stats = self.table_stats(db_name, table_name)
+        if stats is None:
+            raise FileNotFoundError()
+        return stats["rows"]
+
+    def _write_table(self, db_name: str, table_name: str, data: dict, catalog: bool = True) -> dict:
+        """Écrit la table ; renvoie son entrée de catalogue (enregistrée sauf catalog=False)"""
+        with self.table_lock(db_name, table_name):
+            self._store(db_name, table_name).save(data)
+            st = self._get_table_path(db_name, table_name).stat()
+            self.cache.put((db_name, table_name), (st.st_mtime_ns, st.st_size), data, st.st_size)
+            entry = table_entry(data, len(data.get("data", [])), st.st_size)
+            if catalog:
+                self.catalog.put_tables(db_name, {table_name: entry})
+        return entry
 
     def save_table(self, db_name: str, table_name: str, data: dict):
+        with self.table_lock(db_name, table_name):
+            self._write_table(db_name, table_name, data)
+            # Le schéma a pu changer (alter_table) : les index sont reconstruits
+            self._rebuild_indexes(db_name, table_name, data)
+
+    def show_cache_stats(self) -> None:
+        stats = self.cache.stats()
+        print("—" * 40)
+        print(" TABLE CACHE ".center(40, " "))
+        print("—" * 40)
+        print(f" Entries   : {stats['entries']} / {self.cache.max_entries}")
+        print(f" Size      : {stats['bytes']} / {self.cache.max_bytes} bytes")
+        print(f" Hits      : {stats['hits']}")
+        print(f" Misses    : {stats['misses']}")
+        print(f" Evictions : {stats['evictions']}")
+        print(f" Hit rate  : {stats['hit_rate']}%")
+        print("—" * 40)
+
+    def rename_table(self, db_name: str, table_name: str, new_name: str):
+        # Le journal référence les tables par leur nom
+        self.checkpoint(db_name)
         path = self._get_table_path(db_name, table_name)
-        path.write_bytes(self.crypto.encrypt(data))
+        with self.table_lock(db_name, table_name):
+            path.rename(self._get_table_path(db_name, new_name))
+            index_path = self._get_index_path(db_name, table_name)
+            if index_path.exists():
+                index_path.rename(self._get_index_path(db_name, new_name))
+            # Copie de header restée d'un crash : déjà réappliquée par le checkpoint
+            header_copy_path(path).unlink(missing_ok=True)
+            self.locks.remove(path)
+        self._stores.pop(path, None)
+        self._index_sets.pop((db_name, table_name), None)
+        self.cache.invalidate((db_name, table_name))
+        self.catalog.rename_table(db_name, table_name, new_name)
 
     def drop_table(self, dbName: str, tableName: str) -> bool:
         path = self._get_table_path(dbName, tableName)
         if not path.exists():
             print(f"Table '{tableName}' does not exist")
             return False
-        path.unlink()
+        with self.table_lock(dbName, tableName):
+            path.unlink()
+            index_path = self._get_index_path(dbName, tableName)
+            if index_path.exists():
+                index_path.unlink()
+            self.catalog.remove_table(dbName, tableName)
+            header_copy_path(path).unlink(missing_ok=True)
+            self.locks.remove(path)
+        self._stores.pop(path, None)
+        self._index_sets.pop((dbName, tableName), None)
+        self.cache.invalidate((dbName, tableName))
         self.permManager.cleanup_table_permissions(dbName, tableName)
         print(f"Table '{tableName}' removed")
         return True
 
     def analyse_data(self, db_name: str, table_name: str, data: List[str]) -> bool:
-        path = self._get_table_path(db_name, table_name)
-        if not path.exists():
-            print("Table does not exist")
-            return False
-        try:
-            content = self.crypto.decrypt(path.read_bytes())
-            caracteristiques = content.get("caracteristique", {})
-            constraints = content.get("constraint", {})
-            addedData = {}
-            for item in data:
-                if "=" not in item:
-                    print(f"Syntax error in '{item}'")
-                    return False
-                col, value = item.split("=", 1)
-                col, value = col.strip(), value.strip().strip("'\"")
-                if col not in caracteristiques:
-                    print(f"Column '{col}' does not exist")
-                    return False
-                # Coerce value based on declared column type
-                declared_type = caracteristiques.get(col, "string")
-                coerced_value = self._coerce_value(value, declared_type)
-                addedData[col] = coerced_value
-            # Validation contraintes...
-            # Check constraints against coerced values
-            if not self.check_constraints(db_name, table_name, addedData):
-                print("Constraint check failed. Insertion aborted.")
+        values = {}
+        for item in data:
+            if "=" not in item:
+                print(f"Syntax error in '{item}'")
                 return False
+            col, value = item.split("=", 1)
+            values[col.strip()] = value.strip().strip("'\"")
+        return self.insert_row(db_name, table_name, values)
 
-            content["data"].append(addedData)
-            self.save_table(db_name, table_name, content)
-            print("Data added")
-            return True
+    def insert_row(self, db_name: str, table_name: str, values: Dict[str, str]) -> bool:
+        """Insère une ligne à partir des valeurs brutes (texte) de chaque colonne"""
+        if self.insert_rows(db_name, table_name, [values]) != 1:
+            return False
+        print("Data added")
+        return True
+
+    def insert_rows(self, db_name: str, table_name: str, rows: List[Dict[str, str]],
+                    first_row: int = 1) -> int:
+        """Insère un lot de lignes (valeurs brutes) : tout ou rien.
+
+        The schema and indexes are loaded once, every row is coerced and checked
+        (UNIQUE conflicts inside the batch included) and the batch goes to the
+        journal as a single record. Returns the number of rows inserted.
+        """
+        try:
+            return self.append_rows(db_name, table_name, rows, first_row)
+        except NotFoundError as e:
+            print(e)
+        except ConstraintError as e:
+            print(e)
+            where = f" (row {e.row})" if len(rows) > 1 or first_row > 1 else ""
+            print(f"Constraint check failed{where}. Insertion aborted.")
         except Exception as e:
             print(f"Error: {e}")
-            return False
-    def describe_table(self, db_name: str, table_name: str) -> None:  # ← Change en None
+        return 0
+
+    def append_rows(self, db_name: str, table_name: str, rows: List[Dict[str, str]],
+                    first_row: int = 1) -> int:
+        """Comme insert_rows, mais lève NotFoundError / ConstraintError au lieu d'afficher"""
         path = self._get_table_path(db_name, table_name)
         if not path.exists():
-            print(f"Table '{table_name}' does not exist")
-            return
+            raise NotFoundError("Table does not exist")
+        # Contrôle d'unicité et ajout au journal sous le même verrou exclusif
+        with self.table_lock(db_name, table_name):
+            content = self.load_schema(db_name, table_name)
+            caracteristiques = content.get("caracteristique", {})
+            constraints = content.get("constraint", {})
+            indexes = self._indexes(db_name, table_name)
+            pending: Dict[str, set] = {}
+            batch = []
+            for number, values in enumerate(rows, first_row):
+                addedData = {}
+                for col, value in values.items():
+                    if col not in caracteristiques:
+                        raise NotFoundError(f"Column '{col}' does not exist")
+                    # Coerce value based on declared column type
+                    declared_type = caracteristiques.get(col, "string")
+                    addedData[col] = self._coerce_value(value, declared_type)
+                # Check constraints against coerced values
+                try:
+                    self._validate_record(constraints, indexes, addedData, pending)
+                except ConstraintError as e:
+                    e.row = number
+                    raise
+                batch.append(addedData)
+
+            if batch:
+                self.log_insert(db_name, table_name, batch)
+            return len(batch)
 
+    def load_rows(self, db_name: str, table_name: str, records: Iterable[Dict[str, Any]],
+                  batch_size: int) -> Tuple[int, bool]:
+        """Insère un flux d'enregistrements par lots de batch_size, chaque lot étant validé
+        et journalisé d'un bloc. S'arrête au premier lot refusé ; renvoie le nombre de
+        lignes chargées et si le flux a été entièrement chargé."""
+        loaded = 0
+        for batch in batched(map(as_raw, records), batch_size):
+            inserted = self.insert_rows(db_name, table_name, batch, first_row=loaded + 1)
+            if inserted != len(batch):
+                return loaded, False
+            loaded += inserted
+        return loaded, True
+
+    def describe_table(self, db_name: str, table_name: str) -> None:  # ← Change en None
         try:
-            content = self.crypto.decrypt(path.read_bytes())
+            content = self.table_stats(db_name, table_name)
+            if content is None:
+                print(f"Table '{table_name}' does not exist")
+                return
             caracteristiques = content.get("caracteristique", {})
             constraints = content.get("constraint", {})
-            data_count = len(content.get("data", []))
+            data_count = content["rows"]
 
             if not caracteristiques:
                 print("Table has no defined columns")
@@ -171,6 +879,11 @@ class Db:
             print(separator)
             print(f"Total: {len(caracteristiques)} column{'s' if len(caracteristiques) > 1 else ''}, "
                 f"{data_count} row{'s' if data_count > 1 else ''}")
+            indexes = content.get("indexes", {})
+            if indexes:
+                print("Indexes: " + ", ".join(f"{name}({col})" for name, col in indexes.items()))
+            modified = datetime.fromtimestamp(content["modified"]).strftime("%Y-%m-%d %H:%M:%S")
+            print(f"Size: {content['bytes']} bytes, last modified {modified}")
             print(separator)
 
             # self.check_constraints(db_name, table_name, {})  # Exemple d'appel
@@ -257,7 +970,8 @@ class Db:
         print(f"{'DATABASES':^{max_len + 4}}")
         print(separator)
         for db_name in sorted(allDirs):
-            is_owner = self.permManager.get_owner(db_name) == self.current_user["username"]
+            catalog = self._catalog(db_name) or {}
+            is_owner = catalog.get("owner") == self.current_user["username"]
             owner_mark = " (owner)" if is_owner else ""
             print(f" {db_name:<{max_len}}{owner_mark}")
         print(separator)
@@ -270,40 +984,60 @@ class Db:
             print(f"Table '{table_name}' does not exist")
             return False
         try:
-            content = self.crypto.decrypt(path.read_bytes())
-            constraints = content.get("constraint", {})
-            data = content.get("data", [])
-
-            for col, cons_list in constraints.items():
-                print(col, cons_list)
-                if col not in new_record:
-                    continue
-                value = new_record[col]
-
-                for cons in cons_list:
-                    if cons == "NOT NULL" and (value is None or value == ""):
-                        print(f"Constraint violation: '{col}' cannot be NULL")
-                        return False
-                    if cons.startswith("UNIQUE"):
-                        for record in data:
-                            if record.get(col) == value:
-                                print(f"Constraint violation: '{col}' must be UNIQUE")
-                                return False
-                    if cons.startswith("CHECK"):
-                        condition = cons[6:-1].strip()  # Extrait la condition entre parenthèses
-                        try:
-                            if not eval(condition, {}, {col: value}):
-                                print(f"Constraint violation: CHECK constraint failed for '{col}'")
-                                return False
-                        except Exception as e:
-                            print(f"Error evaluating CHECK constraint for '{col}': {e}")
-                            return False
-
-            return True
+            content = self.load_schema(db_name, table_name)
+            indexes = self._indexes(db_name, table_name)
+            return self._check_record(content.get("constraint", {}), indexes, new_record)
         except Exception as e:
             print(f"Error: {e}")
             return False
 
+    def _check_record(self, constraints: Dict[str, List[str]], indexes: TableIndexes,
+                      new_record: Dict[str, Any], pending: Optional[Dict[str, set]] = None) -> bool:
+        try:
+            self._validate_record(constraints, indexes, new_record, pending)
+        except ConstraintError as e:
+            print(e)
+            return False
+        return True
+
+    def _validate_record(self, constraints: Dict[str, List[str]], indexes: TableIndexes,
+                         new_record: Dict[str, Any], pending: Optional[Dict[str, set]] = None,
+                         freed: Optional[Dict[str, Counter]] = None) -> None:
+        """Contrôle d'une ligne (ConstraintError) ; 'pending' garde les clés UNIQUE déjà vues
+        dans le lot en cours, 'freed' compte par colonne les clés des lignes remplacées (update)"""
+        for col, cons_list in constraints.items():
+            # Colonne absente ou NULL : seuls NOT NULL / PRIMARY KEY s'appliquent
+            value = new_record.get(col)
+
+            for cons in cons_list:
+                name = normalize_constraint(cons)
+                if name in ("NOT NULL", "PRIMARY KEY") and (value is None or value == ""):
+                    raise ConstraintError(f"Constraint violation: '{col}' cannot be NULL")
+                if value is None:
+                    continue
+                if name in ("UNIQUE", "PRIMARY KEY"):
+                    # Recherche O(1) dans l'index de hachage de la colonne
+                    index = indexes.get(col)
+                    taken = index.count(value) if index is not None else 0
+                    if freed is not None:
+                        taken -= freed.get(col, {}).get(index_key(value), 0)
+                    if taken > 0:
+                        raise ConstraintError(f"Constraint violation: '{col}' must be UNIQUE")
+                    if pending is not None and value is not None:
+                        seen = pending.setdefault(col, set())
+                        key = index_key(value)
+                        if key in seen:
+                            raise ConstraintError(f"Constraint violation: '{col}' must be UNIQUE (duplicate in batch)")
+                        seen.add(key)
+                if cons.startswith("CHECK"):
+                    condition = cons[6:-1].strip()  # Extrait la condition entre parenthèses
+                    try:
+                        passed = eval(condition, {}, {col: value})
+                    except Exception as e:
+                        raise ConstraintError(f"Error evaluating CHECK constraint for '{col}': {e}") from None
+                    if not passed:
+                        raise ConstraintError(f"Constraint violation: CHECK constraint failed for '{col}'")
+
     def show_help(self):
         print("SGBD - Available commands")
         print("-" * 60)
@@ -318,14 +1052,22 @@ class Db:
         print("  leave_db ;                               - Leave the current database")
         print("  drop_db <name> ;                         - Drop a database (confirm required)")
         print("  list_database ;                          - List all databases")
-        print("  stats_db ;                               - Show database statistics for selected DB")
+        print("  stats_db ;                               - Rows, columns and size per table of selected DB")
+        print("  cache_stats ;                            - Show table cache hits/misses")
+        print("  lock_stats ;                             - Show lock acquisitions and wait times")
+        print("  begin ; / commit ; / rollback ;          - Group changes in a transaction")
         print()
         print("Tables / schema:")
         print("  create_table <name>(col:type[constraints],...);  - Create a table")
-        print("  add_into_table <table>(col=value,...);          - Insert a row into a table")
+        print("  add_into_table <table>(col=value,...)[,(...)];  - Insert one or more rows into a table")
         print("  list_table ;                                    - List tables in current DB")
         print("  describe_table <table> ;                        - Show columns, types, constraints, row count")
         print("  drop_table <table> ;                            - Drop a table (confirm required)")
+        print("  create_index <name> on <table>(col);            - Create a sorted index (used by where)")
+        print("  drop_index <name> [on <table>];                 - Drop an index")
+        print("  repair_table <table>|* ;                        - Re-type values stored as text")
+        print("  load_data <table> from '<file>' [format=csv|jsonl] [batch=N]; - Import a CSV/JSON Lines file")
+        print("  export_table <table> to '<file>' [format=csv|jsonl]; - Export a table to a CSV/JSON Lines file")
         print()
         print("Alter table:")
         print("  alter_table <table> ADD COLUMN col:type[constraints];     - Add a column")
@@ -333,18 +1075,21 @@ class Db:
         print("  alter_table <table> RENAME COLUMN <old> TO <new>;        - Rename a column")
         print("  alter_table <table> MODIFY COLUMN <col>:<type>[...];     - Modify a column")
         print("  alter_table <table> RENAME TO <new_name>;                - Rename the table")
+        print("  alter_table <table> COMPRESSION zlib|lzma|none|default;  - Compress the table's pages")
         print()
         print("Query operations:")
         print("  select <cols> from <table> [where <cond>];  - Read rows (supports '*' or column list)")
+        print("  select ... into outfile '<file>' [format=csv|jsonl]; - Write the result to a file")
         print("  update <table> set col=val [, ...] [where <cond>]; - Update rows")
         print("  delete from <table> [where <cond>];               - Delete rows")
         print()
         print("Users & permissions:")
         print("  create_user <username> [role=user|admin];    - Create user (password prompted)")
+        print("  create_users from '<file>' [format=csv|jsonl]; - Create users from a file (username,password,role)")
         print("  list_user ;                                   - List users")
         print("  drop_user <username> ;                        - Drop a user (confirm required)")
-        print("  grant <perm[,perm,...]> on <table|db.table|*> to <user> ;   - Grant permissions")
-        print("  revoke <perm> on <table|db.table|*> from <user> ;          - Revoke permissions")
+        print("  grant <perm[,...]> on <table|db.table|*>[,...] to <user>[,...] ;   - Grant permissions")
+        print("  revoke <perm[,...]> on <table|db.table|*>[,...] from <user>[,...] ; - Revoke permissions")
         print("  show_grants <user>  OR  show_grants <db> <user> ;          - Show grants for a user")
         print()
         print("Notes:")
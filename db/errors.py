@@ -0,0 +1,30 @@
+# db/errors.py
+"""Exceptions du moteur ; l'interface texte les affiche, l'API Python (sgbd) les propage."""
+
+
+class SGBDError(Exception):
+    pass
+
+
+class NotFoundError(SGBDError):
+    """Base, table ou colonne inexistante"""
+
+
+class ConstraintError(SGBDError):
+    """Contrainte NOT NULL / UNIQUE / PRIMARY KEY / CHECK violée"""
+
+    def __init__(self, message: str, row: int = None):
+        super().__init__(message)
+        self.row = row
+
+
+class PermissionDenied(SGBDError):
+    pass
+
+
+class AuthenticationError(SGBDError):
+    pass
+
+
+class TransactionError(SGBDError):
+    """begin dans une transaction, commit / rollback sans transaction"""
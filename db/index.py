@@ -0,0 +1,245 @@
+# db/index.py
+import json
+from bisect import bisect_left, bisect_right, insort
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from db.locks import atomic_write_bytes
+from db.wal import ROWID
+
+NUMERIC_TYPES = ("number", "float")
+_MAX_POS = float("inf")
+
+UNIQUE_CONSTRAINTS = ("UNIQUE", "PRIMARY KEY")
+
+
+def normalize_constraint(cons: str) -> str:
+    """'Primary_key', 'primary key', 'PRIMARY KEY' → 'PRIMARY KEY'"""
+    return str(cons).upper().replace("_", " ").strip()
+
+
+def unique_columns(constraints: Dict[str, List[str]]) -> List[str]:
+    """Colonnes déclarées primary_key ou unique"""
+    return [col for col, cons_list in constraints.items()
+            if any(normalize_constraint(c) in UNIQUE_CONSTRAINTS for c in cons_list)]
+
+
+def index_key(value: Any) -> str:
+    """Clé de hachage stable pour une valeur de cellule (1 et 1.0 sont égaux)"""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return json.dumps(value, ensure_ascii=False)
+
+
+class HashIndex:
+    """Index de hachage valeur → nombre d'occurrences (NULL non indexé)"""
+
+    kind = "hash"
+
+    def __init__(self, column: str, entries: Optional[Dict[str, int]] = None):
+        self.column = column
+        self.entries: Dict[str, int] = entries or {}
+
+    def add(self, value: Any) -> None:
+        if value is None:
+            return
+        key = index_key(value)
+        self.entries[key] = self.entries.get(key, 0) + 1
+
+    def remove(self, value: Any) -> None:
+        if value is None:
+            return
+        key = index_key(value)
+        count = self.entries.get(key, 0)
+        if count <= 1:
+            self.entries.pop(key, None)
+        else:
+            self.entries[key] = count - 1
+
+    def contains(self, value: Any) -> bool:
+        return value is not None and index_key(value) in self.entries
+
+    def count(self, value: Any) -> int:
+        return 0 if value is None else self.entries.get(index_key(value), 0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"kind": self.kind, "column": self.column, "entries": self.entries}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HashIndex":
+        return cls(data["column"], data.get("entries", {}))
+
+
+class SortedIndex:
+    """Index secondaire trié : liste de (clé, row id) maintenue avec bisect.
+
+    Keys follow the comparisons of the compiled WHERE (db.planner): cells still
+    stored as text in number, float and bool columns are coerced with the
+    column type (``coerce`` is Db._coerce_value). Numeric columns are keyed by
+    float so range predicates (>, <, >=, <=) can be answered by two binary
+    searches; bool columns by bool and other columns by their string form, for
+    equality lookups only. A value that cannot be keyed is left out of the
+    index, and lookups for it return None (full scan).
+    """
+
+    kind = "sorted"
+
+    def __init__(self, name: str, column: str, declared_type: str, coerce=None,
+                 entries: Optional[List[list]] = None):
+        self.name = name
+        self.column = column
+        self.declared_type = str(declared_type).lower()
+        self.numeric = self.declared_type in NUMERIC_TYPES
+        self.coerce = coerce
+        self.entries: List[tuple] = [tuple(e) for e in entries] if entries else []
+
+    def _key(self, value: Any):
+        if value is None:
+            return None
+        if value.__class__ is str and self.coerce is not None and (self.numeric or self.declared_type == "bool"):
+            value = self.coerce(value, self.declared_type)
+        if self.numeric:
+            return float(value) if value.__class__ in (int, float, bool) else None
+        if self.declared_type == "bool":
+            return value if value.__class__ is bool else None
+        return value if value.__class__ is str else str(value)
+
+    def add(self, value: Any, rowid: int) -> None:
+        key = self._key(value)
+        if key is not None:
+            insort(self.entries, (key, rowid))
+
+    def remove(self, value: Any, rowid: int) -> None:
+        key = self._key(value)
+        if key is None:
+            return
+        i = bisect_left(self.entries, (key, rowid))
+        if i < len(self.entries) and self.entries[i] == (key, rowid):
+            del self.entries[i]
+
+    def lookup(self, op: str, value: Any) -> Optional[List[int]]:
+        """Row ids candidats pour 'colonne op valeur' (littéral déjà typé), None si l'index ne sert pas"""
+        key = self._key(value)
+        if key is None or (op != "=" and not self.numeric):
+            return None
+        entries = self.entries
+        lo, hi = 0, len(entries)
+        if op == "=":
+            lo, hi = bisect_left(entries, (key,)), bisect_right(entries, (key, _MAX_POS))
+        elif op == ">":
+            lo = bisect_right(entries, (key, _MAX_POS))
+        elif op == ">=":
+            lo = bisect_left(entries, (key,))
+        elif op == "<":
+            hi = bisect_left(entries, (key,))
+        elif op == "<=":
+            hi = bisect_right(entries, (key, _MAX_POS))
+        else:
+            return None
+        return sorted(p for _, p in entries[lo:hi])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"kind": self.kind, "column": self.column, "type": self.declared_type,
+                "entries": self.entries}
+
+    @classmethod
+    def from_dict(cls, name: str, data: Dict[str, Any], coerce=None) -> "SortedIndex":
+        return cls(name, data["column"], data["type"], coerce, data.get("entries"))
+
+
+class TableIndexes:
+    """Index d'une table, persistés chiffrés dans <db>/<table>.idx
+
+    The file records the WAL LSN of the table content it was built from; an
+    index file that does not match the current content is rebuilt from the rows.
+    """
+
+    def __init__(self, path: Path, crypto, coerce=None):
+        self.path = Path(path)
+        self.crypto = crypto
+        self.coerce = coerce
+        self.lsn = 0
+        self.columns: Dict[str, HashIndex] = {}
+        self.secondary: Dict[str, SortedIndex] = {}
+
+    @staticmethod
+    def _definitions(content: Dict[str, Any]) -> Dict[str, str]:
+        """Index secondaires déclarés par create_index (nom → colonne)"""
+        return content.get("indexes", {})
+
+    def build(self, content: Dict[str, Any]) -> None:
+        types = content.get("caracteristique", {})
+        self.columns = {col: HashIndex(col) for col in unique_columns(content.get("constraint", {}))}
+        self.secondary = {
+            name: SortedIndex(name, col, types.get(col, "string"), self.coerce)
+            for name, col in self._definitions(content).items()
+        }
+        for row in content.get("data", []):
+            self.insert(row)
+        self.lsn = content.get("wal_lsn", 0)
+
+    def load(self, content: Dict[str, Any]) -> bool:
+        """Charge le fichier d'index s'il correspond au contenu de la table"""
+        if not self.path.exists():
+            return False
+        data = self.crypto.decrypt(self.path.read_bytes())
+        expected = set(unique_columns(content.get("constraint", {})))
+        types = content.get("caracteristique", {})
+        # Index écrits avant le typage des clés (pas de "type") ou colonne retypée : reconstruits
+        secondary_types = {name: (idx.get("column"), idx.get("type"))
+                           for name, idx in data.get("secondary", {}).items()}
+        expected_types = {name: (col, str(types.get(col, "string")).lower())
+                          for name, col in self._definitions(content).items()}
+        if (data.get("key") != ROWID
+                or data.get("wal_lsn") != content.get("wal_lsn", 0)
+                or set(data.get("indexes", {})) != expected
+                or secondary_types != expected_types):
+            return False
+        self.columns = {col: HashIndex.from_dict(idx) for col, idx in data["indexes"].items()}
+        self.secondary = {name: SortedIndex.from_dict(name, idx, self.coerce)
+                          for name, idx in data.get("secondary", {}).items()}
+        self.lsn = data["wal_lsn"]
+        return True
+
+    def save(self) -> None:
+        if not self.columns and not self.secondary:
+            if self.path.exists():
+                self.path.unlink()
+            return
+        data = {"key": ROWID, "wal_lsn": self.lsn,
+                "indexes": {col: idx.to_dict() for col, idx in self.columns.items()},
+                "secondary": {name: idx.to_dict() for name, idx in self.secondary.items()}}
+        atomic_write_bytes(self.path, self.crypto.encrypt(data))
+
+    def get(self, column: str) -> Optional[HashIndex]:
+        return self.columns.get(column)
+
+    def secondary_for(self, column: str) -> Optional[SortedIndex]:
+        return next((idx for idx in self.secondary.values() if idx.column == column), None)
+
+    def insert(self, row: Dict[str, Any]) -> None:
+        for col, idx in self.columns.items():
+            idx.add(row.get(col))
+        for idx in self.secondary.values():
+            idx.add(row.get(idx.column), row[ROWID])
+
+    def update(self, old: Dict[str, Any], new: Dict[str, Any]) -> None:
+        for col, idx in self.columns.items():
+            idx.remove(old.get(col))
+            idx.add(new.get(col))
+        for idx in self.secondary.values():
+            idx.remove(old.get(idx.column), old[ROWID])
+            idx.add(new.get(idx.column), new[ROWID])
+
+    def delete(self, old_rows: List[Dict[str, Any]]) -> None:
+        for row in old_rows:
+            for col, idx in self.columns.items():
+                idx.remove(row.get(col))
+            for idx in self.secondary.values():
+                idx.remove(row.get(idx.column), row[ROWID])
+
+    def clear(self) -> None:
+        for idx in self.columns.values():
+            idx.entries = {}
+        for idx in self.secondary.values():
+            idx.entries = []
@@ -0,0 +1,206 @@
+# db/locks.py
+"""Verrous inter-processus sur les fichiers d'une base (tables, journal, métadonnées).
+
+Each protected file ``X`` has a sidecar ``X.lock`` that is locked with flock:
+shared for readers, exclusive for writers. Locks are reentrant per thread, so a
+method holding a table's exclusive lock can call code that asks for the shared
+one; threads of the same process are serialised on the same key. The sidecar of
+a dropped or renamed table is deleted by its exclusive holder (remove); a lock
+obtained on a file that was deleted meanwhile is dropped and taken again on the
+current file.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows : verrou exclusif uniquement
+    fcntl = None
+    import msvcrt
+
+
+class LockTimeout(TimeoutError):
+    pass
+
+
+def fsync_directory(directory) -> None:
+    """Rend durables les créations, renommages et suppressions dans le dossier"""
+    if os.name == "nt":
+        return  # pas de fsync sur un dossier sous Windows
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write_bytes(path, data: bytes) -> None:
+    """Écrit dans un fichier temporaire puis le renomme : un lecteur voit l'ancien ou le nouveau contenu,
+    et après une coupure de courant aussi"""
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    fsync_directory(path.parent)
+
+
+def _try_lock(fd: int, exclusive: bool) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _same_file(fd: int, lock_path: Path) -> bool:
+    """Le descripteur verrouillé est-il encore le fichier présent à ce chemin ?"""
+    try:
+        st = os.stat(lock_path)
+    except FileNotFoundError:
+        return False
+    held = os.fstat(fd)
+    return (st.st_ino, st.st_dev) == (held.st_ino, held.st_dev)
+
+
+def _unlock(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+class _Held:
+    __slots__ = ("fd", "exclusive", "count")
+
+    def __init__(self, fd: int, exclusive: bool):
+        self.fd = fd
+        self.exclusive = exclusive
+        self.count = 1
+
+
+class LockManager:
+    """Verrous partagés / exclusifs par fichier, avec mesure des temps d'attente"""
+
+    def __init__(self, timeout: float = 10.0, poll_interval: float = 0.002):
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._mutex = threading.Lock()
+        self._threads: Dict[str, threading.RLock] = {}
+        self._held: Dict[str, _Held] = {}
+        self._stats = {mode: {"acquired": 0, "contended": 0, "wait": 0.0, "max_wait": 0.0}
+                       for mode in ("shared", "exclusive")}
+
+    def _thread_lock(self, key: str) -> threading.RLock:
+        with self._mutex:
+            lock = self._threads.get(key)
+            if lock is None:
+                lock = self._threads[key] = threading.RLock()
+            return lock
+
+    def _flock(self, fd: int, exclusive: bool, deadline: float) -> bool:
+        """Pose le verrou en réessayant jusqu'à l'échéance ; False si déjà libre au premier essai"""
+        if _try_lock(fd, exclusive):
+            return False
+        while True:
+            if time.monotonic() >= deadline:
+                raise LockTimeout("lock wait timed out")
+            time.sleep(self.poll_interval)
+            if _try_lock(fd, exclusive):
+                return True
+
+    def _acquire(self, lock_path: Path, exclusive: bool, deadline: float, path) -> Tuple[int, bool]:
+        """Ouvre et verrouille le fichier .lock ; recommence s'il a été supprimé pendant l'attente"""
+        contended = False
+        while True:
+            fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                contended = self._flock(fd, exclusive, deadline) or contended
+            except LockTimeout:
+                os.close(fd)
+                raise LockTimeout(f"Timed out waiting for lock on {path}") from None
+            if _same_file(fd, lock_path):
+                return fd, contended
+            _unlock(fd)
+            os.close(fd)
+            contended = True
+
+    def _record(self, exclusive: bool, contended: bool, waited: float) -> None:
+        stats = self._stats["exclusive" if exclusive else "shared"]
+        stats["acquired"] += 1
+        if contended:
+            stats["contended"] += 1
+            stats["wait"] += waited
+            stats["max_wait"] = max(stats["max_wait"], waited)
+
+    @contextmanager
+    def _lock(self, path, exclusive: bool, timeout: Optional[float]):
+        lock_path = Path(str(path) + ".lock")
+        if not lock_path.parent.is_dir():
+            # Rien à protéger (base inexistante)
+            yield
+            return
+        key = str(lock_path)
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        thread_lock = self._thread_lock(key)
+        if not thread_lock.acquire(timeout=max(timeout, 0.001)):
+            raise LockTimeout(f"Timed out waiting for lock on {path}")
+        try:
+            held = self._held.get(key)
+            if held is not None:
+                # Même thread : réentrant, promotion en exclusif si nécessaire
+                if exclusive and not held.exclusive:
+                    try:
+                        contended = self._flock(held.fd, True, deadline)
+                    except LockTimeout:
+                        raise LockTimeout(f"Timed out waiting for lock on {path}") from None
+                    held.exclusive = True
+                    self._record(True, contended, time.monotonic() - start)
+                held.count += 1
+            else:
+                fd, contended = self._acquire(lock_path, exclusive, deadline, path)
+                held = self._held[key] = _Held(fd, exclusive)
+                self._record(exclusive, contended, time.monotonic() - start)
+            try:
+                yield
+            finally:
+                held.count -= 1
+                if held.count == 0:
+                    del self._held[key]
+                    _unlock(held.fd)
+                    os.close(held.fd)
+        finally:
+            thread_lock.release()
+
+    def shared(self, path, timeout: Optional[float] = None):
+        return self._lock(path, False, timeout)
+
+    def exclusive(self, path, timeout: Optional[float] = None):
+        return self._lock(path, True, timeout)
+
+    def remove(self, path) -> None:
+        """Supprime le fichier .lock de 'path' (table supprimée ou renommée).
+
+        Call it while holding the exclusive lock on 'path': a process waiting
+        on the old file sees it is gone once it gets the lock and locks the
+        new file instead.
+        """
+        try:
+            os.unlink(str(path) + ".lock")
+        except OSError:
+            pass  # absent, ou encore ouvert (Windows) : il reste en place
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {mode: dict(values) for mode, values in self._stats.items()}
@@ -0,0 +1,356 @@
+# db/page_store.py
+import hashlib
+import json
+import os
+import struct
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from db.locks import atomic_write_bytes, fsync_directory
+from utils.compression import check_codec, compress
+
+MAGIC = b"SGBDPAGE"
+FORMAT_VERSION = 1
+DEFAULT_PAGE_SIZE = 8192
+
+# magic | version | page_size | header_slots
+_PREFIX = struct.Struct(">8sBII")
+_LEN = struct.Struct(">I")
+# Copie du header en cours d'écriture : inode du fichier de table puis les octets du header
+_INODE = struct.Struct(">Q")
+_DIRECTORY_KEYS = ("pages", "free")
+# Compression effective des pages et rapport visé pour les remplir (voir _storage)
+_STORAGE_KEYS = ("codec", "codec_factor")
+_INTERNAL_KEYS = _DIRECTORY_KEYS + _STORAGE_KEYS
+
+
+def header_copy_path(path) -> Path:
+    return Path(str(path) + ".hdr")
+
+
+def is_paged_file(path: Path) -> bool:
+    """True si le fichier utilise le format paginé (sinon ancien blob Fernet)"""
+    try:
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) == MAGIC:
+                return True
+    except FileNotFoundError:
+        return False
+    # Header déchiré par une coupure : seul un fichier paginé a une copie de header
+    return header_copy_path(path).exists()
+
+
+def _token_size(plain_len: int) -> int:
+    # Fernet : version(1) + timestamp(8) + iv(16) + AES-CBC(padding PKCS7) + hmac(32), en base64
+    raw = 57 + 16 * (plain_len // 16 + 1)
+    return 4 * ((raw + 2) // 3)
+
+
+def _dumps(obj: Any) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _digest(payload: bytes) -> str:
+    return hashlib.blake2b(payload, digest_size=8).hexdigest()
+
+
+class PageStore:
+    """Table file split into fixed-size pages, each one encrypted on its own.
+
+    Layout on disk:
+    - prefix: magic, format version, page size, number of slots used by the header
+    - header page (slots 0..header_slots-1): schema (caracteristique/constraint)
+      and the page directory [[slot, row_count, digest], ...] plus free slots
+    - data pages: one slot each, holding a JSON list of rows
+
+    Every slot is a 4-byte length, a Fernet token and zero padding, so a page can
+    be read or rewritten in place without touching the rest of the file.
+
+    The header is rewritten in place, so before that its new bytes are saved
+    to <table>.enc.hdr (atomically, fsynced) and the copy is deleted once the
+    in-place write is fsynced. A copy found when the header is read means the
+    write may have been torn by a crash: it is written back first. The copy
+    records the file's inode, so one left behind by a file since replaced
+    (create) is ignored.
+
+    With compression (the table's "compression" key, else the store default)
+    pages are compressed before encryption and filled up to codec_factor times
+    the raw capacity, so a slot holds several pages' worth of rows. The factor
+    is measured once per table and codec and then kept, so page boundaries, and
+    therefore the pages a save rewrites, stay stable.
+    """
+
+    def __init__(self, path, crypto, page_size: int = DEFAULT_PAGE_SIZE, compression: str = "none"):
+        self.path = Path(path)
+        self.crypto = crypto
+        self.page_size = page_size
+        self.compression = check_codec(compression)
+        self.header_slots = 1
+        self._header: Optional[Dict[str, Any]] = None
+        self._stamp = None
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    @property
+    def page_capacity(self) -> int:
+        """Taille maximale (octets JSON) d'une page de données"""
+        room = self.page_size - _LEN.size
+        n = room * 3 // 4
+        while n > 0 and _token_size(n) > room:
+            n -= 1
+        return n
+
+    def _offset(self, slot: int) -> int:
+        return _PREFIX.size + slot * self.page_size
+
+    def _file_stamp(self):
+        st = os.stat(self.path)
+        return st.st_mtime_ns, st.st_size
+
+    def _slot_total(self) -> int:
+        size = self.path.stat().st_size
+        return max(self.header_slots, (size - _PREFIX.size + self.page_size - 1) // self.page_size)
+
+    def _read_slot(self, f, slot: int) -> bytes:
+        f.seek(self._offset(slot))
+        (length,) = _LEN.unpack(f.read(_LEN.size))
+        return f.read(length)
+
+    def _storage(self, meta: Dict[str, Any], rows: List[dict],
+                 header: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """codec / codec_factor à écrire dans le header (vide sans compression)"""
+        codec = check_codec(meta.get("compression") or self.compression)
+        if codec == "none":
+            return {}
+        if header and header.get("codec") == codec and header.get("codec_factor"):
+            return {"codec": codec, "codec_factor": header["codec_factor"]}
+        # Mesuré sur un échantillon assez grand, sinon remesuré à la prochaine écriture
+        cap = self.page_capacity
+        sample, size = [], 0
+        for row in rows:
+            sample.append(_dumps(row))
+            size += len(sample[-1]) + 1
+            if size >= 16 * cap:
+                break
+        if size < 4 * cap:
+            return {"codec": codec}
+        raw = b"[" + b",".join(sample) + b"]"
+        ratio = len(raw) / len(compress(raw, codec))
+        return {"codec": codec, "codec_factor": round(max(1.0, ratio * 0.85), 2)}
+
+    def _paginate(self, rows: List[dict], storage: Optional[Dict[str, Any]] = None) -> List[Tuple[bytes, int]]:
+        """Regroupe les lignes en pages (payload JSON, compressé selon storage, nombre de lignes)"""
+        storage = storage or {}
+        codec = storage.get("codec", "none")
+        cap = self.page_capacity
+        target = int(cap * storage.get("codec_factor", 1.0))
+        pages: List[Tuple[bytes, int]] = []
+        buf: List[bytes] = []
+        size = 2
+        for row in rows:
+            raw = _dumps(row)
+            extra = len(raw) + (1 if buf else 0)
+            if buf and size + extra > target:
+                self._pack(buf, codec, cap, pages)
+                buf, size, extra = [], 2, len(raw)
+            buf.append(raw)
+            size += extra
+        if buf:
+            self._pack(buf, codec, cap, pages)
+        return pages
+
+    def _pack(self, rows: List[bytes], codec: str, cap: int, pages: List[Tuple[bytes, int]]) -> None:
+        """Une page, coupée en deux tant qu'elle ne tient pas dans un slot une fois compressée"""
+        payload = compress(b"[" + b",".join(rows) + b"]", codec)
+        if len(payload) <= cap:
+            pages.append((payload, len(rows)))
+        elif len(rows) == 1:
+            raise ValueError(f"Row too large for page size {self.page_size}")
+        else:
+            half = len(rows) // 2
+            self._pack(rows[:half], codec, cap, pages)
+            self._pack(rows[half:], codec, cap, pages)
+
+    # ------------------------------------------------------------------
+    # Lecture
+    # ------------------------------------------------------------------
+    def _restore_header(self) -> None:
+        """Réécrit le header depuis sa copie si une écriture a été interrompue"""
+        copy = header_copy_path(self.path)
+        try:
+            data = copy.read_bytes()
+        except FileNotFoundError:
+            return
+        if len(data) > _INODE.size + _PREFIX.size and _INODE.unpack_from(data)[0] == os.stat(self.path).st_ino:
+            with open(self.path, "r+b") as f:
+                f.write(data[_INODE.size:])
+                f.flush()
+                os.fsync(f.fileno())
+        copy.unlink(missing_ok=True)
+
+    def read_header(self) -> Dict[str, Any]:
+        self._restore_header()
+        stamp = self._file_stamp()
+        if self._header is not None and stamp == self._stamp:
+            return self._header
+        with open(self.path, "rb") as f:
+            magic, version, page_size, header_slots = _PREFIX.unpack(f.read(_PREFIX.size))
+            if magic != MAGIC:
+                raise ValueError(f"'{self.path.name}' is not a paged table file")
+            if version > FORMAT_VERSION:
+                raise ValueError(f"'{self.path.name}' uses unsupported page format v{version}")
+            self.page_size = page_size
+            self.header_slots = header_slots
+            header = json.loads(self.crypto.decrypt_bytes(self._read_slot(f, 0)))
+        self._header = header
+        self._stamp = stamp
+        return header
+
+    def schema(self) -> Dict[str, Any]:
+        """Header sans le répertoire de pages (caracteristique, constraint, ...)"""
+        header = self.read_header()
+        return {k: v for k, v in header.items() if k not in _INTERNAL_KEYS}
+
+    def row_count(self) -> int:
+        return sum(entry[1] for entry in self.read_header().get("pages", []))
+
+    def iter_rows(self) -> Iterator[dict]:
+        header = self.read_header()
+        with open(self.path, "rb") as f:
+            for slot, _, _ in header.get("pages", []):
+                yield from json.loads(self.crypto.decrypt_bytes(self._read_slot(f, slot)))
+
+    def load(self) -> Dict[str, Any]:
+        doc = self.schema()
+        doc["data"] = list(self.iter_rows())
+        return doc
+
+    # ------------------------------------------------------------------
+    # Écriture
+    # ------------------------------------------------------------------
+    def create(self, doc: Dict[str, Any]) -> None:
+        """Écrit un fichier neuf (remplace atomiquement un éventuel ancien fichier)"""
+        self.header_slots = 1
+        rows = doc.get("data", [])
+        meta = {k: v for k, v in doc.items() if k != "data" and k not in _INTERNAL_KEYS}
+        meta.update(self._storage(meta, rows))
+        pages = self._paginate(rows, meta)
+        directory, writes = [], {}
+        for i, (payload, count) in enumerate(pages, start=1):
+            directory.append([i, count, _digest(payload)])
+            writes[i] = payload
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_bytes(b"")
+        target, self.path = self.path, tmp
+        try:
+            self._write(meta, directory, [], writes, in_place=False)
+        finally:
+            self.path = target
+        os.replace(tmp, self.path)
+        fsync_directory(self.path.parent)
+        self._stamp = self._file_stamp()
+
+    def save(self, doc: Dict[str, Any]) -> None:
+        """Réécrit seulement les pages dont le contenu a changé.
+
+        Les pages modifiées sont écrites dans des slots libres (copy-on-write) et
+        le header est écrit en dernier, via sa copie .hdr : après un crash on lit
+        l'ancienne version ou la nouvelle, jamais un header déchiré. Au retour, tout
+        est sur disque (checkpoint vide le journal ensuite).
+        """
+        if not is_paged_file(self.path):
+            self.create(doc)
+            return
+        header = self.read_header()
+        rows = doc.get("data", [])
+        meta = {k: v for k, v in doc.items() if k != "data" and k not in _INTERNAL_KEYS}
+        meta.update(self._storage(meta, rows, header))
+        if any(meta.get(k) != header.get(k) for k in _STORAGE_KEYS):
+            # Compression changée ou rapport mesuré : toutes les pages changent, le fichier
+            # est réécrit (et réduit)
+            self.create(doc)
+            return
+        old = header.get("pages", [])
+        free = sorted(header.get("free", []))
+        next_slot = self._slot_total()
+        directory, writes = [], {}
+        for i, (payload, count) in enumerate(self._paginate(rows, meta)):
+            digest = _digest(payload)
+            if i < len(old) and old[i][2] == digest:
+                directory.append(old[i])
+                continue
+            if free:
+                slot = free.pop(0)
+            else:
+                slot = next_slot
+                next_slot += 1
+            writes[slot] = payload
+            directory.append([slot, count, digest])
+        kept = {entry[0] for entry in directory}
+        free.extend(entry[0] for entry in old if entry[0] not in kept)
+        self._write(meta, directory, sorted(free), writes)
+
+    def _write(self, meta: Dict[str, Any], directory: List[list], free: List[int],
+               writes: Dict[int, bytes], in_place: bool = True) -> None:
+        with open(self.path, "r+b") as f:
+            # Le header grossit avec le répertoire : on déplace les pages qui le gênent
+            while True:
+                # Les slots libres en fin de fichier sont rendus au système
+                used = [entry[0] for entry in directory]
+                last = max(used) if used else self.header_slots - 1
+                free = [s for s in free if s < last]
+                header = dict(meta, pages=directory, free=free)
+                token = self.crypto.encrypt_bytes(compress(_dumps(header), meta.get("codec", "none")))
+                needed = -(-(_LEN.size + len(token)) // self.page_size)
+                if needed <= self.header_slots:
+                    break
+                needed = max(needed, self.header_slots * 2)
+                next_slot = max(used + free + [needed - 1]) + 1
+                for entry in directory:
+                    if entry[0] < needed:
+                        if entry[0] in writes:
+                            writes[next_slot] = writes.pop(entry[0])
+                        else:
+                            # page déjà chiffrée : simple copie, sans rechiffrement
+                            writes[next_slot] = (self._read_slot(f, entry[0]),)
+                        entry[0] = next_slot
+                        next_slot += 1
+                free = [s for s in free if s >= needed]
+                self.header_slots = needed
+
+            for slot, payload in sorted(writes.items()):
+                data = payload[0] if isinstance(payload, tuple) else self.crypto.encrypt_bytes(payload)
+                f.seek(self._offset(slot))
+                f.write(_LEN.pack(len(data)) + data + b"\0" * (self.page_size - _LEN.size - len(data)))
+            if writes:
+                # Les pages doivent être sur disque avant le header qui les référence
+                f.flush()
+                os.fsync(f.fileno())
+
+            region = self.header_slots * self.page_size
+            head = (_PREFIX.pack(MAGIC, FORMAT_VERSION, self.page_size, self.header_slots)
+                    + _LEN.pack(len(token)) + token + b"\0" * (region - _LEN.size - len(token)))
+            copy = header_copy_path(self.path)
+            if in_place:
+                atomic_write_bytes(copy, _INODE.pack(os.fstat(f.fileno()).st_ino) + head)
+            f.seek(0)
+            f.write(head)
+            f.truncate(self._offset(last + 1))
+            f.flush()
+            os.fsync(f.fileno())
+        if in_place:
+            copy.unlink()
+
+        self._header = header
+        self._stamp = self._file_stamp()
+
+
+def convert_legacy_table(path: Path, crypto, page_size: int = DEFAULT_PAGE_SIZE) -> bool:
+    """Convertit un ancien fichier <table>.enc (un seul jeton Fernet) au format paginé"""
+    path = Path(path)
+    if is_paged_file(path):
+        return False
+    doc = crypto.decrypt(path.read_bytes())
+    PageStore(path, crypto, page_size).create(doc)
+    return True
@@ -1,10 +1,36 @@
 # db/permission_manager.py
 from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, NamedTuple, Optional, Tuple
+from db.errors import PermissionDenied
+from db.locks import LockManager, atomic_write_bytes
+
+NO_PERMISSIONS: FrozenSet[str] = frozenset()
+
+
+class ACL(NamedTuple):
+    """permissions.enc compilé : ensembles de permissions en majuscules par utilisateur"""
+    owner: Optional[str]
+    database: Dict[str, FrozenSet[str]]              # utilisateur -> permissions
+    tables: Dict[str, Dict[str, FrozenSet[str]]]     # utilisateur -> table -> permissions
+
+
+def compile_acl(data: dict) -> ACL:
+    return ACL(
+        data.get("owner"),
+        {user: frozenset(p.upper() for p in perms)
+         for user, perms in data.get("database_permissions", {}).items()},
+        {user: {table: frozenset(p.upper() for p in perms) for table, perms in tables.items()}
+         for user, tables in data.get("table_permissions", {}).items()},
+    )
+
 
 class PermissionManager:
-    def __init__(self, db_path: str, crypto):
+    def __init__(self, db_path: str, crypto, locks=None):
         self.dbPath = Path(db_path)
         self.crypto = crypto
+        self.locks = locks or LockManager()
+        # Cache par base : (signature du fichier, ACL) ; relu si un autre processus l'a modifié
+        self._acls: Dict[str, Tuple[Optional[tuple], ACL]] = {}
         self.dbPath.mkdir(exist_ok=True)
 
     def _get_perm_path(self, db_name: str) -> Path:
@@ -12,14 +38,35 @@ class PermissionManager:
 
     def _load(self, db_name: str) -> dict:
         path = self._get_perm_path(db_name)
-        if not path.exists():
-            return {}
-        return self.crypto.decrypt(path.read_bytes())
+        with self.locks.shared(path):
+            if not path.exists():
+                return {}
+            return self.crypto.decrypt(path.read_bytes())
 
     def _save(self, db_name: str, data: dict):
         path = self._get_perm_path(db_name)
         path.parent.mkdir(parents=True, exist_ok=True)
-        path.write_bytes(self.crypto.encrypt(data))
+        with self.locks.exclusive(path):
+            atomic_write_bytes(path, self.crypto.encrypt(data))
+            self.invalidate(db_name)
+
+    def invalidate(self, db_name: str) -> None:
+        self._acls.pop(db_name, None)
+
+    def _acl(self, db_name: str) -> ACL:
+        """ACL de la base, déchiffrée seulement quand le fichier a changé (mtime, taille, inode)"""
+        path = self._get_perm_path(db_name)
+        try:
+            st = path.stat()
+            stamp = (st.st_mtime_ns, st.st_size, st.st_ino)
+        except FileNotFoundError:
+            stamp = None
+        cached = self._acls.get(db_name)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        acl = compile_acl(self._load(db_name) if stamp is not None else {})
+        self._acls[db_name] = (stamp, acl)
+        return acl
 
     def set_owner(self, db_name: str, username: str) -> None:
         data = {
@@ -30,73 +77,126 @@ class PermissionManager:
         self._save(db_name, data)
 
     def get_owner(self, db_name: str) -> str:
-        data = self._load(db_name)
-        return data.get("owner")
+        return self._acl(db_name).owner
 
     def has_db_permission(self, db_name: str, username: str, required_perm: str) -> bool:
-        data = self._load(db_name)
-        if data.get("owner") == username:
+        acl = self._acl(db_name)
+        if acl.owner == username:
             return True
-        perms = data.get("database_permissions", {}).get(username, [])
-        perms = [p.upper() for p in perms]
+        perms = acl.database.get(username, NO_PERMISSIONS)
         return "ALL" in perms or required_perm.upper() in perms
 
     def has_table_permission(self, db_name: str, table_name: str, username: str, required_perm: str) -> bool:
-        data = self._load(db_name)
-        if data.get("owner") == username:
+        acl = self._acl(db_name)
+        if acl.owner == username:
             return True
-        user_perms = data.get("table_permissions", {}).get(username, {})
-        perms = user_perms.get(table_name, [])
-        perms = [p.upper() for p in perms]
+        perms = acl.tables.get(username, {}).get(table_name, NO_PERMISSIONS)
         return "ALL" in perms or required_perm.upper() in perms
 
-    def grant(self, db_name: str, table_name: str, username: str, permission: str,
-              caller_username: str, caller_role: str) -> bool:
-        data = self._load(db_name)
-        owner = data.get("owner")
-        if caller_role != "admin" and caller_username != owner:
-            print("Permission denied: only owner or admin can grant")
-            return False
-        permission = permission.upper()
-        table_perms = data.setdefault("table_permissions", {})
-        user_perms = table_perms.setdefault(username, {})
-        perms_list = user_perms.setdefault(table_name, [])
-        if permission not in perms_list:
+    @staticmethod
+    def _add_permission(data: dict, username: str, table_name: str, permission: str) -> bool:
+        """Ajoute la permission (True si elle est nouvelle) et l'accès à la base"""
+        perms_list = data.setdefault("table_permissions", {}).setdefault(username, {}).setdefault(table_name, [])
+        added = permission not in perms_list
+        if added:
             perms_list.append(permission)
-        db_perms = data.setdefault("database_permissions", {})
-        db_user_perms = db_perms.setdefault(username, [])
+        db_user_perms = data.setdefault("database_permissions", {}).setdefault(username, [])
         for p in ["USAGE", "READ"]:
             if p not in db_user_perms:
                 db_user_perms.append(p)
-        self._save(db_name, data)
-        print(f"Granted {permission} on {db_name}.{table_name} to {username}")
+        return added
+
+    @staticmethod
+    def _remove_permission(data: dict, username: str, table_name: str, permission: str) -> Optional[bool]:
+        """True si retirée, False si l'utilisateur n'avait pas cette permission sur la table,
+        None s'il n'avait aucune permission sur la table"""
+        table_perms = data.get("table_permissions", {})
+        if username not in table_perms or table_name not in table_perms[username]:
+            return None
+        perms = [p.upper() for p in table_perms[username][table_name]]
+        if permission not in perms:
+            return False
+        perms.remove(permission)
+        table_perms[username][table_name] = perms
+        if not perms:
+            del table_perms[username][table_name]
+        if not table_perms[username]:
+            del table_perms[username]
+        return True
+
+    def _check_caller(self, data: dict, caller_username: str, caller_role: str, message: str) -> None:
+        if caller_role != "admin" and caller_username != data.get("owner"):
+            raise PermissionDenied(message)
+
+    def grant_many(self, db_name: str, entries: Iterable[Tuple[str, str, str]],
+                   caller_username: str, caller_role: str, all_tables: Iterable[str] = ()) -> int:
+        """Accorde des (utilisateur, table, permission) en un seul chargement / enregistrement.
+
+        A table named '*' stands for every table in 'all_tables'. Raises
+        PermissionDenied unless the caller is admin or owner of the database;
+        returns the number of permissions that were not already granted.
+        """
+        all_tables = list(all_tables)
+        with self.locks.exclusive(self._get_perm_path(db_name)):
+            data = self._load(db_name)
+            self._check_caller(data, caller_username, caller_role,
+                               "Permission denied: only owner or admin can grant")
+            added = 0
+            for username, table_name, permission in entries:
+                for table in (all_tables if table_name == "*" else [table_name]):
+                    added += self._add_permission(data, username, table, permission.upper())
+            self._save(db_name, data)
+            return added
+
+    def revoke_many(self, db_name: str, entries: Iterable[Tuple[str, str, str]],
+                    caller_username: str, caller_role: str) -> int:
+        """Retire des (utilisateur, table, permission) en un seul chargement / enregistrement.
+
+        A table named '*' stands for every table the user has permissions on.
+        Returns the number of permissions actually removed.
+        """
+        with self.locks.exclusive(self._get_perm_path(db_name)):
+            data = self._load(db_name)
+            self._check_caller(data, caller_username, caller_role, "Permission denied")
+            removed = 0
+            for username, table_name, permission in entries:
+                tables = (list(data.get("table_permissions", {}).get(username, {}))
+                          if table_name == "*" else [table_name])
+                for table in tables:
+                    removed += bool(self._remove_permission(data, username, table, permission.upper()))
+            if removed:
+                self._save(db_name, data)
+            return removed
+
+    def grant(self, db_name: str, table_name: str, username: str, permission: str,
+              caller_username: str, caller_role: str) -> bool:
+        try:
+            self.grant_many(db_name, [(username, table_name, permission)], caller_username, caller_role)
+        except PermissionDenied as e:
+            print(e)
+            return False
+        print(f"Granted {permission.upper()} on {db_name}.{table_name} to {username}")
         return True
 
     def revoke(self, db_name: str, table_name: str, username: str, permission: str,
                caller_username: str, caller_role: str) -> bool:
-        data = self._load(db_name)
-        owner = data.get("owner")
-        if caller_role != "admin" and caller_username != owner:
-            print("Permission denied")
-            return False
-        permission = permission.upper()
-        table_perms = data.get("table_permissions", {})
-        if username in table_perms and table_name in table_perms[username]:
-            perms = [p.upper() for p in table_perms[username][table_name]]
-            if permission in perms:
-                perms.remove(permission)
-                table_perms[username][table_name] = perms
-                if not perms:
-                    del table_perms[username][table_name]
-                if not table_perms[username]:
-                    del table_perms[username]
+        with self.locks.exclusive(self._get_perm_path(db_name)):
+            data = self._load(db_name)
+            try:
+                self._check_caller(data, caller_username, caller_role, "Permission denied")
+            except PermissionDenied as e:
+                print(e)
+                return False
+            permission = permission.upper()
+            removed = self._remove_permission(data, username, table_name, permission)
+            if removed:
                 print(f"Revoked {permission} from {username} on {table_name}")
-            else:
+                self._save(db_name, data)
+            elif removed is False:
                 print(f"No {permission} to revoke")
-        else:
-            print("No permission found")
-        self._save(db_name, data)
-        return True
+            else:
+                print("No permission found")
+            return True
 
     def show_grants(self, db_name: str, username: str) -> None:
         data = self._load(db_name)
@@ -122,15 +222,17 @@ class PermissionManager:
         perm_path = self._get_perm_path(db_name)
         if perm_path.exists():
             perm_path.unlink()
+        self.invalidate(db_name)
 
     def cleanup_table_permissions(self, db_name: str, table_name: str):
-        data = self._load(db_name)
-        changed = False
-        for user in list(data.get("table_permissions", {})):
-            if table_name in data["table_permissions"][user]:
-                del data["table_permissions"][user][table_name]
-                changed = True
-                if not data["table_permissions"][user]:
-                    del data["table_permissions"][user]
-        if changed:
-            self._save(db_name, data)
\ No newline at end of file
+        with self.locks.exclusive(self._get_perm_path(db_name)):
+            data = self._load(db_name)
+            changed = False
+            for user in list(data.get("table_permissions", {})):
+                if table_name in data["table_permissions"][user]:
+                    del data["table_permissions"][user][table_name]
+                    changed = True
+                    if not data["table_permissions"][user]:
+                        del data["table_permissions"][user]
+            if changed:
+                self._save(db_name, data)
\ No newline at end of file
@@ -0,0 +1,182 @@
+# db/planner.py
+"""Évaluation des clauses WHERE (AST de utils.sql_parser) et choix des index."""
+import operator
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from db.index import NUMERIC_TYPES
+from utils.sql_parser import And, Between, Compare, InList, IsNull, Not, Or
+
+RANGE_OPERATORS = ("=", "<", ">", "<=", ">=")
+_OPERATORS = {
+    "=": operator.eq, "!=": operator.ne,
+    "<": operator.lt, ">": operator.gt, "<=": operator.le, ">=": operator.ge,
+}
+
+
+@lru_cache(maxsize=256)
+def like_regex(pattern: str):
+    """Traduit un motif LIKE (% et _) en regex compilée, insensible à la casse"""
+    parts = []
+    for ch in pattern:
+        if ch == "%":
+            parts.append(".*")
+        elif ch == "_":
+            parts.append(".")
+        else:
+            parts.append(re.escape(ch))
+    return re.compile("".join(parts), re.IGNORECASE | re.DOTALL)
+
+
+def _literal_value(literal, declared_type: str, coerce):
+    """Valeur typée du littéral, selon les règles de Db._coerce_value"""
+    value = coerce(literal.text, declared_type)
+    if declared_type == "number" and value.__class__ is int:
+        # _coerce_value tronque '2.5' en 2 pour une colonne number ; un filtre garde la fraction
+        try:
+            exact = float(literal.text)
+        except ValueError:
+            return value
+        if exact != value:
+            return exact
+    return value
+
+
+def _compile_compare(column: str, op: str, literal, declared_type: str, coerce) -> Callable:
+    if op == "LIKE":
+        match = like_regex(literal.text).fullmatch
+
+        def like(row):
+            v = row.get(column)
+            if v is None:
+                return False
+            return match(v if v.__class__ is str else str(v)) is not None
+        return like
+
+    compare = _OPERATORS[op]
+    value = _literal_value(literal, declared_type, coerce)
+
+    if declared_type in NUMERIC_TYPES and value.__class__ in (int, float):
+        def numeric(row):
+            v = row.get(column)
+            if v.__class__ is str:
+                # Cellule encore stockée en texte (table non réparée)
+                v = coerce(v, declared_type)
+                if v.__class__ is str:
+                    return False
+            return v is not None and compare(v, value)
+        return numeric
+
+    if declared_type == "bool" and value.__class__ is bool:
+        def boolean(row):
+            v = row.get(column)
+            if v.__class__ is str:
+                v = coerce(v, declared_type)
+            return v.__class__ is bool and compare(v, value)
+        return boolean
+
+    # Texte, dates et heures : comparaison de chaînes (ordre ISO)
+    text = literal.text
+
+    def textual(row):
+        v = row.get(column)
+        if v is None:
+            return False
+        return compare(v if v.__class__ is str else str(v), text)
+    return textual
+
+
+def compile_where(expr, types: Dict[str, str], coerce) -> Callable[[Dict[str, Any]], bool]:
+    """Compile l'AST d'un WHERE en une fonction ligne -> bool.
+
+    Literals are coerced once with the declared column type (``coerce`` is
+    Db._coerce_value) and LIKE patterns are compiled once, so filtering is a
+    plain loop of closure calls. A NULL cell only matches IS NULL.
+    """
+    declared = tuple(sorted((col, str(t).lower()) for col, t in types.items()))
+    return _compile(expr, declared, coerce)
+
+
+@lru_cache(maxsize=256)
+def _compile(expr, declared: Tuple[Tuple[str, str], ...], coerce) -> Callable:
+    types = dict(declared)
+
+    def build(node):
+        if isinstance(node, Compare):
+            return _compile_compare(node.column, node.op, node.value,
+                                    types.get(node.column, "string"), coerce)
+        if isinstance(node, And):
+            left, right = build(node.left), build(node.right)
+            return lambda row: left(row) and right(row)
+        if isinstance(node, Or):
+            left, right = build(node.left), build(node.right)
+            return lambda row: left(row) or right(row)
+        if isinstance(node, Not):
+            operand = build(node.operand)
+            return lambda row: not operand(row)
+        if isinstance(node, InList):
+            tests = tuple(build(Compare(node.column, "=", lit)) for lit in node.values)
+            negated = node.negated
+            return lambda row: any(test(row) for test in tests) != negated
+        if isinstance(node, Between):
+            low = build(Compare(node.column, ">=", node.low))
+            high = build(Compare(node.column, "<=", node.high))
+            negated = node.negated
+            return lambda row: (low(row) and high(row)) != negated
+        if isinstance(node, IsNull):
+            column, negated = node.column, node.negated
+
+            def is_null(row):
+                v = row.get(column)
+                return (v is None or v == "") != negated
+            return is_null
+        raise ValueError(f"Unsupported WHERE node: {type(node).__name__}")
+
+    return build(expr)
+
+
+def _index_value(literal, declared_type: str, coerce):
+    """Littéral tel que le compare le filtre compilé : typé pour number/float/bool, texte brut sinon"""
+    if declared_type in NUMERIC_TYPES or declared_type == "bool":
+        return _literal_value(literal, declared_type, coerce)
+    return literal.text
+
+
+def plan_rowids(indexes, expr, coerce) -> Optional[List[int]]:
+    """Row ids candidats fournis par les index secondaires, None = parcours complet.
+
+    The candidates are a superset to be re-checked with the compiled predicate; AND narrows
+    to the intersection, OR and IN need every branch to be indexed. Literals are typed
+    like in compile_where (``coerce`` is Db._coerce_value).
+    """
+    if isinstance(expr, Compare) and expr.op in RANGE_OPERATORS:
+        index = indexes.secondary_for(expr.column)
+        if index is None:
+            return None
+        return index.lookup(expr.op, _index_value(expr.value, index.declared_type, coerce))
+    if isinstance(expr, Between) and not expr.negated:
+        low = plan_rowids(indexes, Compare(expr.column, ">=", expr.low), coerce)
+        high = plan_rowids(indexes, Compare(expr.column, "<=", expr.high), coerce)
+        if low is None or high is None:
+            return None
+        return sorted(set(low) & set(high))
+    if isinstance(expr, InList) and not expr.negated:
+        found = set()
+        for literal in expr.values:
+            rowids = plan_rowids(indexes, Compare(expr.column, "=", literal), coerce)
+            if rowids is None:
+                return None
+            found.update(rowids)
+        return sorted(found)
+    if isinstance(expr, And):
+        left, right = plan_rowids(indexes, expr.left, coerce), plan_rowids(indexes, expr.right, coerce)
+        if left is None or right is None:
+            return right if left is None else left
+        return sorted(set(left) & set(right))
+    if isinstance(expr, Or):
+        left, right = plan_rowids(indexes, expr.left, coerce), plan_rowids(indexes, expr.right, coerce)
+        if left is None or right is None:
+            return None
+        return sorted(set(left) | set(right))
+    return None
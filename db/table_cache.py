@@ -0,0 +1,70 @@
+# db/table_cache.py
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class TableCache:
+    """Cache LRU des tables déchiffrées, borné en nombre d'entrées et en octets.
+
+    Each entry remembers the (mtime_ns, size) stamp of the table file it was
+    decoded from; a lookup with a different stamp (file rewritten by another
+    process or by hand) is treated as a miss and drops the stale entry. The byte
+    budget is accounted with the on-disk size of the table file.
+    """
+
+    def __init__(self, max_entries: int = 64, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, Tuple[Any, Any, int]]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable, stamp) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != stamp:
+            if entry is not None:
+                self.invalidate(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: Hashable, stamp, content: Dict[str, Any], size: int) -> None:
+        self.invalidate(key)
+        if self.max_entries <= 0 or size > self.max_bytes:
+            return
+        self._entries[key] = (stamp, content, size)
+        self.bytes += size
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, (_, _, old_size) = self._entries.popitem(last=False)
+            self.bytes -= old_size
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[2]
+
+    def invalidate_where(self, predicate) -> None:
+        for key in [k for k in self._entries if predicate(k)]:
+            self.invalidate(key)
+
+    def stats(self) -> Dict[str, int]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(100 * self.hits / total) if total else 0,
+        }
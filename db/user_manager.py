@@ -1,51 +1,113 @@
 # db/user_manager.py
 from pathlib import Path
 from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from utils.helpers import hash_password
+from db.locks import LockManager, atomic_write_bytes
 
 class UserManager:
-    def __init__(self, db_path, crypto):
+    """Annuaire des utilisateurs : users.enc, {"users": {username: {...}}}
+
+    The decrypted directory stays in memory and is read again only when the
+    file changes on disk (mtime, size, inode), so a login is a dict lookup.
+    Files written when users were a list are still read and are converted on
+    the next write.
+    """
+
+    def __init__(self, db_path, crypto, locks=None):
         self.db_path = Path(db_path)
         self.user_file = self.db_path / "users.enc"
         self.crypto = crypto
+        self.locks = locks or LockManager()
+        self._users: Optional[Dict[str, dict]] = None
+        self._stamp = None
         self.db_path.mkdir(exist_ok=True)
         self._init_root()
 
     def _init_root(self):
-        if not self.user_file.exists():
-            root = {
-                "username": "root",
-                "password": hash_password("root"),
-                "role": "admin",
-                "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            }
-            self._save({"users": [root]})
-
-    def _load(self):
-        if not self.user_file.exists():
-            return {"users": []}
-        return self.crypto.decrypt(self.user_file.read_bytes())
+        with self.locks.exclusive(self.user_file):
+            if not self.user_file.exists():
+                self._save({"root": self._new_user("root", "root", "admin")})
 
-    def _save(self, data):
-        self.user_file.write_bytes(self.crypto.encrypt(data))
-
-    def create_user(self, username, password, role="user"):
-        data = self._load()
-        if any(u["username"] == username for u in data["users"]):
-            print(f"User '{username}' already exists")
-            return
-        new_user = {
+    @staticmethod
+    def _new_user(username, password, role):
+        return {
             "username": username,
             "password": hash_password(password),
             "role": role,
             "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         }
-        data["users"].append(new_user)
-        self._save(data)
+
+    def _file_stamp(self):
+        try:
+            st = self.user_file.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _load(self) -> Dict[str, dict]:
+        """Utilisateurs par nom ; le dict renvoyé est partagé, ne pas le modifier"""
+        with self.locks.shared(self.user_file):
+            stamp = self._file_stamp()
+            if self._users is not None and stamp == self._stamp:
+                return self._users
+            users = {}
+            if stamp is not None:
+                users = self.crypto.decrypt(self.user_file.read_bytes()).get("users", {})
+                if isinstance(users, list):
+                    users = {u["username"]: u for u in users}
+            self._users, self._stamp = users, stamp
+            return users
+
+    def _save(self, users: Dict[str, dict]):
+        with self.locks.exclusive(self.user_file):
+            atomic_write_bytes(self.user_file, self.crypto.encrypt({"users": users}))
+            self._users, self._stamp = users, self._file_stamp()
+
+    def create_user(self, username, password, role="user") -> bool:
+        with self.locks.exclusive(self.user_file):
+            users = dict(self._load())
+            if username in users:
+                print(f"User '{username}' already exists")
+                return False
+            users[username] = self._new_user(username, password, role)
+            self._save(users)
+            return True
+
+    def create_users(self, entries: Iterable[Dict[str, Any]]) -> Tuple[List[str], List[str]]:
+        """Crée plusieurs utilisateurs (username, password, role optionnel) en une seule écriture.
+
+        Nothing is written if an entry is invalid (ValueError naming the
+        entry). Returns the created usernames and those skipped because they
+        already exist.
+        """
+        checked = []
+        for number, entry in enumerate(entries, 1):
+            username = str(entry.get("username") or "").strip()
+            password = str(entry.get("password") or "")
+            role = str(entry.get("role") or "user").strip().lower()
+            if not username:
+                raise ValueError(f"Entry {number}: username required")
+            if len(password) < 4:
+                raise ValueError(f"Entry {number}: password must be at least 4 characters")
+            if role not in ("user", "admin"):
+                raise ValueError(f"Entry {number}: invalid role '{role}' (user or admin)")
+            checked.append((username, password, role))
+        with self.locks.exclusive(self.user_file):
+            users = dict(self._load())
+            created, skipped = [], []
+            for username, password, role in checked:
+                if username in users:
+                    skipped.append(username)
+                    continue
+                users[username] = self._new_user(username, password, role)
+                created.append(username)
+            if created:
+                self._save(users)
+        return created, skipped
 
     def list_users(self):
-        data = self._load()
-        users = data.get("users", [])
+        users = list(self._load().values())
         if not users:
             print("No users found")
             return
@@ -60,20 +122,18 @@ class UserManager:
             print(f"{u['username']:<{max_len}} | {u['role']:<6} | {u['created_at']}")
         print(sep)
 
-    def drop_user(self, username):
-        data = self._load()
-        original_count = len(data["users"])
-        data["users"] = [u for u in data["users"] if u["username"] != username]
-        if len(data["users"]) == original_count:
-            print(f"User '{username}' not found")
-            return
-        self._save(data)
+    def drop_user(self, username) -> bool:
+        with self.locks.exclusive(self.user_file):
+            users = self._load()
+            if username not in users:
+                print(f"User '{username}' not found")
+                return False
+            self._save({name: u for name, u in users.items() if name != username})
+            return True
 
     def switch_to(self, username, password):
-        data = self._load()
-        hashed = hash_password(password)
-        for u in data["users"]:
-            if u["username"] == username and u["password"] == hashed:
-                return {"username": username, "role": u["role"]}
+        u = self._load().get(username)
+        if u is not None and u["password"] == hash_password(password):
+            return {"username": username, "role": u["role"]}
         print("Invalid username or password")
-        return None
\ No newline at end of file
+        return None
@@ -0,0 +1,186 @@
+# db/wal.py
+import json
+import os
+import struct
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+from db.locks import LockManager, atomic_write_bytes
+
+_LEN = struct.Struct(">I")
+
+# Identifiant interne et stable de chaque ligne (croissant dans l'ordre de la table)
+ROWID = "__rowid__"
+
+
+def _dumps(obj: Any) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def ensure_rowids(doc: Dict[str, Any]) -> None:
+    """Numérote les lignes d'une table écrite avant les row ids (1..n, déterministe)"""
+    data = doc.setdefault("data", [])
+    if data and ROWID not in data[0]:
+        for i, row in enumerate(data, 1):
+            row[ROWID] = i
+    if "next_rowid" not in doc:
+        doc["next_rowid"] = data[-1][ROWID] + 1 if data else 1
+
+
+def row_index(data: List[Dict[str, Any]], rowid: int) -> Optional[int]:
+    """Position de la ligne 'rowid' : les row ids sont croissants, recherche dichotomique"""
+    i = bisect_left(data, rowid, key=lambda row: row[ROWID])
+    if i < len(data) and data[i][ROWID] == rowid:
+        return i
+    return None
+
+
+def apply_record(doc: Dict[str, Any], record: Dict[str, Any]) -> None:
+    """Rejoue un enregistrement du journal sur le contenu d'une table"""
+    op = record["op"]
+    data = doc.setdefault("data", [])
+    if op == "insert":
+        data.extend(record["rows"])
+        if record["rows"] and ROWID in record["rows"][-1]:
+            doc["next_rowid"] = max(doc.get("next_rowid", 1), record["rows"][-1][ROWID] + 1)
+    elif op == "update" and "changes" in record:
+        for rowid, row in record["changes"]:
+            i = row_index(data, rowid)
+            if i is not None:
+                data[i] = row
+    elif op == "update":
+        # Ancien format : positions
+        for pos, row in record["rows"]:
+            data[pos] = row
+    elif op == "delete" and "rowids" in record:
+        # Une seule passe, quel que soit le nombre de lignes supprimées
+        rowids = set(record["rowids"])
+        doc["data"] = [row for row in data if row[ROWID] not in rowids]
+    elif op == "delete":
+        positions = set(record["positions"])
+        doc["data"] = [row for i, row in enumerate(data) if i not in positions]
+    elif op == "truncate":
+        doc["data"] = []
+    else:
+        raise ValueError(f"Unknown WAL operation '{op}'")
+    doc["wal_lsn"] = record["lsn"]
+
+
+class WriteAheadLog:
+    """Journal append-only d'une base : <db>/wal.log
+
+    Each frame is a 4-byte length followed by a Fernet token, so records are
+    encrypted one by one and an insert only appends a few hundred bytes. The
+    first frame stores the LSN the log starts from; every record carries its own
+    LSN and tables remember the last LSN folded into them (header key
+    "wal_lsn"), which makes replay idempotent after a crash during checkpoint.
+    Records also carry the time they were appended ("at"), used by the
+    catalog as the table's last modification.
+    """
+
+    def __init__(self, path, crypto, fsync: bool = True, locks=None):
+        self.path = Path(path)
+        self.crypto = crypto
+        self.fsync = fsync
+        self.locks = locks or LockManager()
+        self.base_lsn = 0
+        self.records: List[Dict[str, Any]] = []
+        self._offset = 0
+        self._inode = None
+
+    @property
+    def last_lsn(self) -> int:
+        return self.records[-1]["lsn"] if self.records else self.base_lsn
+
+    def size(self) -> int:
+        return self._offset
+
+    def _frame(self, obj: Dict[str, Any]) -> bytes:
+        token = self.crypto.encrypt_bytes(_dumps(obj))
+        return _LEN.pack(len(token)) + token
+
+    def refresh(self) -> None:
+        """Lit les enregistrements ajoutés depuis la dernière lecture (autre processus inclus)"""
+        if not self.path.exists():
+            self.base_lsn, self.records, self._offset = self.last_lsn, [], 0
+            return
+        st = self.path.stat()
+        size = st.st_size
+        if st.st_ino != self._inode or size < self._offset:
+            # Le journal a été vidé par un checkpoint : on relit tout
+            self.records, self._offset, self._inode = [], 0, st.st_ino
+        if size == self._offset:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            while True:
+                head = f.read(_LEN.size)
+                if len(head) < _LEN.size:
+                    break
+                (length,) = _LEN.unpack(head)
+                token = f.read(length)
+                if len(token) < length:
+                    break  # trame incomplète (écriture interrompue)
+                frame = json.loads(self.crypto.decrypt_bytes(token))
+                if "base_lsn" in frame:
+                    self.base_lsn = frame["base_lsn"]
+                elif "batch" in frame:
+                    self.records.extend(frame["batch"])
+                else:
+                    self.records.append(frame)
+                self._offset = f.tell()
+
+    def append(self, table: str, op: str, **payload) -> int:
+        with self.locks.exclusive(self.path):
+            self.refresh()
+            record = dict(payload, lsn=self.last_lsn + 1, table=table, op=op, at=round(time.time(), 3))
+            self._write(self._frame(record))
+            self.records.append(record)
+        return record["lsn"]
+
+    def append_batch(self, entries: List[Dict[str, Any]]) -> List[int]:
+        """Ajoute plusieurs enregistrements (dict avec table, op, ...) dans une seule trame.
+
+        A frame is either read whole or ignored as incomplete, so a batch is
+        replayed entirely or not at all (used by COMMIT).
+        """
+        with self.locks.exclusive(self.path):
+            self.refresh()
+            first = self.last_lsn + 1
+            now = round(time.time(), 3)
+            batch = [dict(entry, lsn=first + i, at=now) for i, entry in enumerate(entries)]
+            if batch:
+                self._write(self._frame({"batch": batch}))
+                self.records.extend(batch)
+        return [record["lsn"] for record in batch]
+
+    def _write(self, frame: bytes) -> None:
+        frames = b""
+        if self._offset == 0:
+            frames += self._frame({"base_lsn": self.base_lsn})
+        frames += frame
+        with open(self.path, "ab") as f:
+            f.truncate(self._offset)  # écrase une éventuelle trame incomplète
+            f.write(frames)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+            self._offset = f.tell()
+        self._inode = self.path.stat().st_ino
+
+    def tables(self) -> Set[str]:
+        return {r["table"] for r in self.records}
+
+    def records_for(self, table: str, after_lsn: int = 0) -> List[Dict[str, Any]]:
+        return [r for r in self.records if r["table"] == table and r["lsn"] > after_lsn]
+
+    def reset(self) -> None:
+        """Vide le journal une fois son contenu reporté dans les tables"""
+        with self.locks.exclusive(self.path):
+            self.refresh()
+            base = self._frame({"base_lsn": self.last_lsn})
+            atomic_write_bytes(self.path, base)
+            self.base_lsn, self.records, self._offset = self.last_lsn, [], len(base)
+            self._inode = self.path.stat().st_ino
@@ -1,9 +1,18 @@
+import time
+_STARTED = time.perf_counter()
 import os
+import sys
+import argparse
+import builtins
 import getpass
 from pathlib import Path
 from utils.config_loader import load_config
 from utils.crypto import CryptoManager
+from utils.key_cache import KeyCache
+from utils.helpers import split_statements
+from utils.sql_parser import parse_statement
 from db.db_main import Db
+from db.errors import AuthenticationError
 
 try:
     import readline
@@ -19,31 +28,75 @@ except ImportError:
             def write_history_file(self, filename): pass
         readline = DummyReadline()
 
-from commands.db_commands import handle_db_commands
-from commands.user_perm_commands import handle_user_perm_commands
-from commands.table_commands import handle_alter_table, handle_table_commands
-from commands.query_commands import handle_query_commands
+# Gestionnaires importés à la première commande qui les utilise
+import commands
 
+# === PROFIL DE DÉMARRAGE (--startup-profile) ===
+STARTUP_TIMES = {"imports": time.perf_counter() - _STARTED}
+
+def startup_phase(name: str, start: float) -> None:
+    STARTUP_TIMES[name] = STARTUP_TIMES.get(name, 0.0) + time.perf_counter() - start
+
+def report_startup() -> None:
+    """Durée de chaque étape du démarrage, sur stderr"""
+    key_step = "key read from cache" if crypto.key_from_cache else "key derivation (background)"
+    STARTUP_TIMES[key_step] = crypto.derive_seconds
+    STARTUP_TIMES["waiting for the key"] = crypto.wait_seconds
+    for name, seconds in STARTUP_TIMES.items():
+        print(f"[startup] {name:<30} {seconds * 1000:8.1f} ms", file=sys.stderr)
+    print(f"[startup] {'total':<30} {(time.perf_counter() - _STARTED) * 1000:8.1f} ms", file=sys.stderr)
 
 # === CONFIG ===
+_phase = time.perf_counter()
 config = load_config()
+startup_phase("config load", _phase)
 DB_PATH = config["db_path"]
 DEFAULT_PROMPT = config["default_prompt"]
 SEPARATOR = config["separator_char"]
 HISTORY_DIR_PATH = config.get("history_dir", ".history_dir")
+SERVER_CONFIG = config.get("server", {})
 
 # === CRÉATION DU DOSSIER HISTORY SI MANQUANT ===
 HISTORY_DIR = Path(HISTORY_DIR_PATH)
 HISTORY_DIR.mkdir(exist_ok=True)
 
 # === CHIFFREMENT ===
+# La clé est dérivée en arrière-plan pendant la suite du démarrage et la saisie du login
 DEFAULT_MASTER_PASSWORD = "mit_misa_password_123!!!"
-crypto = CryptoManager(DEFAULT_MASTER_PASSWORD)
+KEY_CACHE_CONFIG = config.get("key_cache", {})
+key_cache = KeyCache(DB_PATH, float(KEY_CACHE_CONFIG.get("ttl", 900))) if KEY_CACHE_CONFIG.get("enabled") else None
+crypto = CryptoManager.for_directory(DB_PATH, DEFAULT_MASTER_PASSWORD, config.get("kdf_iterations"), key_cache)
 
 # === DB ===
-db = Db(DB_PATH, crypto=crypto)
+_phase = time.perf_counter()
+try:
+    db = Db(DB_PATH, crypto=crypto)
+except AuthenticationError as e:
+    # Mot de passe maître faux ou fichier corrompu (migration, relecture du journal)
+    print(f"Error: {e}")
+    sys.exit(1)
+startup_phase("database open (migration, WAL)", _phase)
+
+# === MODE SERVEUR ===
+# Les chemins de fichiers d'une commande seraient ceux du serveur : ces commandes y sont refusées
+server_mode = False
+FILE_COMMANDS = ["load_data", "export_table", "create_users"]
+
+def reads_or_writes_file(cmd_line: str, cmd: str) -> bool:
+    """Commande qui lit ou écrit un fichier (load_data, export_table, select ... into outfile…)"""
+    if cmd_line in FILE_COMMANDS:
+        return True
+    if cmd_line != "select":
+        return False
+    try:
+        return parse_statement(cmd).outfile is not None
+    except ValueError:
+        return False
 
 # === HISTORIQUE PAR UTILISATEUR (SÉCURISÉ) ===
+# Désactivé en mode serveur : l'historique readline du serveur n'est celui d'aucun client
+history_enabled = True
+
 def get_history_file(username: str) -> Path:
     return HISTORY_DIR / f".history_{username}"
 
@@ -55,6 +108,8 @@ def clear_readline_history():
             readline.remove_history_item(0)
 
 def load_user_history(username: str):
+    if not history_enabled:
+        return
     clear_readline_history()
     hist_file = get_history_file(username)
     # Vérifie si l'objet readline n'est pas l'objet Dummy
@@ -66,6 +121,8 @@ def load_user_history(username: str):
                 print(f"Could not load history for {username}: {e}")
 
 def save_user_history(username: str):
+    if not history_enabled:
+        return
     hist_file = get_history_file(username)
     # Vérifie si l'objet readline n'est pas l'objet Dummy
     if hasattr(readline, 'write_history_file'):
@@ -126,74 +183,43 @@ def login():
     print("Authentication failed. Exiting...")
     exit(1)
 
-logged_user = login()
-current_user = logged_user["username"]
-
 useDatabase = ""
 isDbUse = False
+current_user = ""
+# Affichage des select : "text" (tableau) ou "json" (clients du mode serveur)
+output_format = "text"
 
-load_user_history(current_user)
-
-while True:
-    try:
-        # Le prompt statique est maintenant intégré dans get_prompt()
-        cmd = input(get_prompt())
-    except KeyboardInterrupt:
-        print("\n^C")
-        continue
-    except EOFError:
-        save_user_history(current_user)
-        clear_readline_history()
-        print("\nBye! Thanks for using my_diaries")
-        exit()
-
-    # --- Nettoyage de l'écran avant le parsing de commande ---
-    if cmd.strip() in ["clear", "clear;"]:
-        # Pour Windows: 'cls', pour Unix-like: 'clear'
-        os.system("clear" if os.name != "nt" else "cls")
-        continue
-
-    if cmd.strip() in ["exit", "exit;"]:
-        save_user_history(current_user)
-        clear_readline_history()
-        print("Bye! Thanks for using my_diaries")
-        exit()
-
-    # === GESTION DES COMMANDES MULTI-LIGNES ===
-    while not cmd.strip().endswith(";"):
-        try:
-            next_line = input(" ⇘ ")
-        except KeyboardInterrupt:
-            print("\n^C")
-            cmd = ""
-            break
-        except EOFError:
-            save_user_history(current_user)
-            clear_readline_history()
-            print("\nBye! Thanks for using my_diaries")
-            exit()
-        cmd += " " + next_line.strip()
+# === EXÉCUTION D'UNE COMMANDE ===
+def execute(cmd: str) -> bool:
+    """Exécute une commande déjà débarrassée de son ';'.
 
-    cmd = cmd.strip()
-    if not cmd.endswith(";"):
-        continue
-    cmd = cmd[:-1].strip()
-    if not cmd:
-        continue
+    Returns False for an unknown command or one that raised; handlers report
+    their own errors on stdout.
+    """
+    global current_user, useDatabase, isDbUse
 
     cmd_line = cmd.split(" ", 1)[0].lower() if " " in cmd else cmd.lower()
     print(cmd_line)
     result = None
 
-    # Redondance pour 'clear' et 'exit' au cas où l'utilisateur les tape sans point-virgule
-    if cmd_line.strip() == "clear":
-        os.system("clear" if os.name != "nt" else "cls")
-        continue
-    if cmd_line.strip() == "exit":
-        save_user_history(current_user)
-        clear_readline_history()
-        print("Bye! Thanks for using my_diaries")
-        exit()
+    # === TRANSACTIONS ===
+    if cmd_line in ["begin", "start_transaction"]:
+        if not isDbUse:
+            print("No database selected")
+            print("Use: use_db <database_name>;")
+            return False
+        return db.begin(useDatabase)
+    if cmd_line == "commit":
+        return db.commit()
+    if cmd_line == "rollback":
+        return db.rollback()
+    if server_mode and reads_or_writes_file(cmd_line, cmd):
+        print(f"'{cmd_line}' with a file is not available over the network (paths are on the server)")
+        return False
+    if db.in_transaction() and cmd_line not in TRANSACTION_COMMANDS:
+        print(f"'{cmd_line}' is not allowed inside a transaction")
+        print("Finish it first with commit; or rollback;")
+        return False
 
     if cmd_line == "switch_to":
         try:
@@ -201,7 +227,7 @@ while True:
             if len(parts) < 2:
                 print("Username required")
                 print("Usage: switch_to <username>;")
-                continue
+                return False
             
             username = parts[1]
             
@@ -228,45 +254,53 @@ while True:
                 print(f"✓ Switched to user '{current_user}'")
             else:
                 print("Invalid username or password")
+                return False
                 
         except Exception as e:
             print(f"Error: {e}")
             print("Usage: switch_to <username>;")
+            return False
         
-        continue
+        return True
         
     elif cmd_line == "alter_table":
         if not isDbUse:
             print("No database selected")
             print("Use: use_db <database_name>;")
-            continue
+            return False
         
-        handle_alter_table(cmd, db, useDatabase, config)
-        continue
+        commands.handle_alter_table(cmd, db, useDatabase, config)
+        return True
 
     # === COMMANDES DB ===
-    if cmd_line in ["create_db", "create_database", "use_database", "use_db", "drop_db", "list_database","list_db", "stats_db", "leave_db"]:
-        result = handle_db_commands(cmd, cmd_line, db, get_prompt(), DEFAULT_PROMPT, SEPARATOR)
+    if cmd_line in ["create_db", "create_database", "use_database", "use_db", "drop_db", "list_database","list_db", "stats_db", "leave_db", "cache_stats", "lock_stats"]:
+        result = commands.handle_db_commands(cmd, cmd_line, db, get_prompt(), DEFAULT_PROMPT, SEPARATOR,
+                                             useDatabase, isDbUse)
+        if cmd_line in ["use_database", "use_db"] and (result is None or result[2] is None):
+            return False
 
     # === COMMANDES TABLE ===
-    elif cmd_line in ["create_table", "add_into_table", "list_table", "describe_table", "drop_table"]:
+    elif cmd_line in ["create_table", "add_into_table", "list_table", "describe_table", "drop_table",
+                      "create_index", "drop_index", "repair_table", "load_data", "export_table"]:
         if not isDbUse:
             print("No database selected")
             print("Use: use_db <database_name>;")
-            continue
-        handle_table_commands(cmd, cmd_line, db, useDatabase, isDbUse, SEPARATOR, config)
+            return False
+        if commands.handle_table_commands(cmd, cmd_line, db, useDatabase, isDbUse, SEPARATOR, config) is False:
+            return False
 
     # === REQUÊTES SQL ===
     elif cmd_line in ["select", "update", "delete"]:
         if not isDbUse:
             print("No database selected")
             print("Use: use_db <database_name>;")
-            continue
-        handle_query_commands(cmd, cmd_line, db, useDatabase, isDbUse, SEPARATOR)
+            return False
+        if commands.handle_query_commands(cmd, cmd_line, db, useDatabase, isDbUse, SEPARATOR, output_format) is False:
+            return False
 
     # === GESTION UTILISATEURS & PERMISSIONS ===
-    elif cmd_line in ["create_user", "list_user", "drop_user", "grant", "revoke", "show_grants"]:
-        result = handle_user_perm_commands(cmd, cmd_line, db, useDatabase, isDbUse, DEFAULT_PROMPT)
+    elif cmd_line in ["create_user", "create_users", "list_user", "drop_user", "grant", "revoke", "show_grants"]:
+        result = commands.handle_user_perm_commands(cmd, cmd_line, db, useDatabase, isDbUse, DEFAULT_PROMPT)
 
     # === HELP ===
     elif cmd_line in ["help", "list_commands"]:
@@ -276,10 +310,256 @@ while True:
     else:
         print(f"Unknown command: '{cmd_line}'")
         print("Type 'help' for available commands")
-        continue
+        return False
 
     # === MISE À JOUR PROMPT ===
     # Le résultat de handle_db_commands contient l'état de la base de données actuelle
     if result is not None and len(result) >= 4:
         # On extrait useDatabase et isDbUse du résultat de la commande
-        _, _, useDatabase, isDbUse = result
\ No newline at end of file
+        _, _, useDatabase, isDbUse = result
+    return True
+
+# Commandes autorisées entre begin et commit/rollback (lectures et écritures de lignes)
+TRANSACTION_COMMANDS = ["select", "update", "delete", "add_into_table", "load_data", "export_table",
+                        "list_table", "describe_table", "cache_stats", "help", "list_commands"]
+
+def end_session():
+    """Fermeture : une transaction non validée est annulée"""
+    if db.in_transaction():
+        db.rollback()
+    save_user_history(current_user)
+    clear_readline_history()
+
+# === MODE INTERACTIF ===
+def run_repl(profile: bool = False):
+    global current_user
+
+    logged_user = login()
+    current_user = logged_user["username"]
+    db.current_user = logged_user
+
+    phase = time.perf_counter()
+    load_user_history(current_user)
+    startup_phase("history load", phase)
+    if profile:
+        report_startup()
+
+    while True:
+        try:
+            # Le prompt statique est maintenant intégré dans get_prompt()
+            cmd = input(get_prompt())
+        except KeyboardInterrupt:
+            print("\n^C")
+            continue
+        except EOFError:
+            end_session()
+            print("\nBye! Thanks for using my_diaries")
+            exit()
+
+        # --- Nettoyage de l'écran avant le parsing de commande ---
+        if cmd.strip() in ["clear", "clear;"]:
+            # Pour Windows: 'cls', pour Unix-like: 'clear'
+            os.system("clear" if os.name != "nt" else "cls")
+            continue
+
+        if cmd.strip() in ["exit", "exit;"]:
+            end_session()
+            print("Bye! Thanks for using my_diaries")
+            exit()
+
+        # === GESTION DES COMMANDES MULTI-LIGNES ===
+        while not cmd.strip().endswith(";"):
+            try:
+                next_line = input(" ⇘ ")
+            except KeyboardInterrupt:
+                print("\n^C")
+                cmd = ""
+                break
+            except EOFError:
+                end_session()
+                print("\nBye! Thanks for using my_diaries")
+                exit()
+            cmd += " " + next_line.strip()
+
+        cmd = cmd.strip()
+        if not cmd.endswith(";"):
+            continue
+        cmd = cmd[:-1].strip()
+        if not cmd:
+            continue
+
+        # Redondance pour 'clear' et 'exit' au cas où l'utilisateur les tape sans point-virgule
+        if cmd.lower() == "clear":
+            os.system("clear" if os.name != "nt" else "cls")
+            continue
+        if cmd.lower() == "exit":
+            end_session()
+            print("Bye! Thanks for using my_diaries")
+            exit()
+
+        execute(cmd)
+
+# === MODE BATCH ===
+def batch_password() -> str:
+    """Mot de passe du mode batch : $SGBD_PASSWORD, sinon première ligne de stdin"""
+    password = os.environ.get("SGBD_PASSWORD")
+    if password is not None:
+        return password
+    if sys.stdin.isatty():
+        return getpass.getpass("Password: ")
+    return sys.stdin.readline().rstrip("\r\n")
+
+def run_batch(script_path: str, username: str, assume_yes: bool = False,
+              transaction: bool = False, profile: bool = False) -> int:
+    """Exécute un script de commandes séparées par ';' et renvoie le code de sortie.
+
+    The whole script is split and the SQL statements are parsed before anything
+    runs (their ASTs stay cached for execution). Exit codes: 0 success, 1 at
+    least one statement failed, 2 unreadable script, syntax error or failed login.
+    With transaction=True the statements after the first use_db run in one
+    transaction, committed only if every statement succeeded.
+    """
+    global current_user
+
+    try:
+        script = Path(script_path).read_text(encoding="utf-8")
+    except OSError as e:
+        print(f"Cannot read script: {e}", file=sys.stderr)
+        return 2
+
+    statements = split_statements(script)
+    syntax_errors = 0
+    for number, statement in enumerate(statements, 1):
+        keyword = statement.split(None, 1)[0].lower()
+        if keyword in ("select", "update", "delete", "add_into_table"):
+            try:
+                parse_statement(statement)
+            except ValueError as e:
+                print(f"Statement {number}: syntax error: {e}", file=sys.stderr)
+                syntax_errors += 1
+    if syntax_errors:
+        return 2
+
+    user = db.userManager.switch_to(username, batch_password())
+    if not user:
+        print("Authentication failed", file=sys.stderr)
+        return 2
+    current_user = username
+    db.current_user = user
+    if profile:
+        report_startup()
+
+    # Les confirmations (drop, delete sans where…) sont acceptées avec --yes, refusées sinon
+    answer = "yes" if assume_yes else "no"
+    def confirm(prompt=""):
+        print(f"{prompt}{answer}")
+        return answer
+    builtins.input = confirm
+
+    failed = 0
+    executed = 0
+    start = time.perf_counter()
+    for statement in statements:
+        if statement.lower() == "exit":
+            break
+        if statement.lower() == "clear":
+            continue
+        executed += 1
+        try:
+            if not execute(statement):
+                failed += 1
+        except Exception as e:
+            print(f"Error: {e}")
+            failed += 1
+        if transaction and isDbUse and not db.in_transaction() and not failed:
+            db.begin(useDatabase)
+    if db.in_transaction():
+        if failed:
+            db.rollback()
+        elif not db.commit():
+            failed += 1
+    elapsed = time.perf_counter() - start
+
+    print(f"{executed} statement{'s' if executed > 1 else ''} executed, {failed} failed "
+          f"in {elapsed:.3f}s", file=sys.stderr)
+    return 1 if failed else 0
+
+# === MODE SERVEUR ===
+def run_in_session(session, statement: str) -> bool:
+    """Exécute une commande avec l'état (utilisateur, base, transaction) d'une connexion"""
+    global current_user, useDatabase, isDbUse, output_format
+
+    current_user = session.user["username"]
+    useDatabase, isDbUse = session.useDatabase, session.isDbUse
+    output_format = session.output
+    db.current_user, db._txn = session.user, session.txn
+    try:
+        if statement.lower() == "clear":
+            return True
+        return execute(statement)
+    finally:
+        session.user = db.current_user
+        session.useDatabase, session.isDbUse = useDatabase, isDbUse
+        session.txn, db._txn = db._txn, None
+        output_format = "text"
+
+def end_remote_session(session) -> None:
+    """Déconnexion : la transaction restée ouverte est annulée"""
+    db._txn, session.txn = session.txn, None
+    db.rollback()
+
+def run_server(host: str, port: int, profile: bool = False) -> int:
+    global history_enabled, server_mode
+    import asyncio
+    from server import Server
+
+    history_enabled = False
+    server_mode = True
+    if profile:
+        report_startup()
+    try:
+        asyncio.run(Server(db, run_in_session, end_remote_session).serve(host, port))
+    except KeyboardInterrupt:
+        print("\n[server] stopped", file=sys.stderr)
+    except OSError as e:
+        print(f"Cannot start server: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="my_diaries SGBD")
+    parser.add_argument("-f", "--file", help="run the statements of a script file and exit")
+    parser.add_argument("-u", "--user", help="user for --file (password from $SGBD_PASSWORD or stdin)")
+    parser.add_argument("-y", "--yes", action="store_true",
+                        help="answer yes to confirmations in --file mode")
+    parser.add_argument("-t", "--transaction", action="store_true",
+                        help="run the --file statements in one transaction (rolled back on error)")
+    parser.add_argument("--serve", action="store_true", help="start the TCP server instead of the REPL")
+    parser.add_argument("--host", default=SERVER_CONFIG.get("host", "127.0.0.1"),
+                        help="address for --serve")
+    parser.add_argument("--port", type=int, default=int(SERVER_CONFIG.get("port", 6543)),
+                        help="port for --serve")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="print the time spent in each startup step on stderr")
+    parser.add_argument("--forget-key", action="store_true",
+                        help="remove the cached master key (key_cache) and exit")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.forget_key:
+        removed = KeyCache(DB_PATH).forget()
+        print("Cached key removed" if removed else "No cached key", file=sys.stderr)
+        sys.exit(0)
+    try:
+        if args.file:
+            if not args.user:
+                print("--user is required with --file", file=sys.stderr)
+                sys.exit(2)
+            sys.exit(run_batch(args.file, args.user, args.yes, args.transaction, args.startup_profile))
+        if args.serve:
+            sys.exit(run_server(args.host, args.port, args.startup_profile))
+        run_repl(args.startup_profile)
+    except AuthenticationError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
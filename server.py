@@ -0,0 +1,246 @@
+# server.py
+"""Mode serveur : protocole texte ligne par ligne sur TCP (asyncio).
+
+One Db instance (its table cache, index sets and page stores) is shared by
+every connection; each connection keeps its own session (user, current
+database, open transaction). Commands run one at a time on a single worker
+thread, so decryption and encryption never block the event loop while the
+shared Db is never used by two commands at once.
+
+Protocol (UTF-8, one line per message):
+    server -> client   +OK <greeting>                  on connect
+    client -> server   login <user> <password>
+    server -> client   +OK ... | -ERR <reason>
+    client -> server   statements ending with ';' (may span several lines)
+    server -> client   output lines, then +OK or -ERR <reason> per statement
+    client -> server   set format text|json            select output: table (default) or JSON
+    client -> server   set confirm yes|no              answer to confirmations (default no)
+    client -> server   quit                            closes the session
+
+Output lines that start with '+', '-', '?' or '\\' are sent with a leading
+'\\' so that status lines cannot be confused with output. In json format a
+select prints a header line {"columns": [...], "types": {...}} followed by one
+JSON array per row. Confirmations (drop, delete without where...) are answered
+with the session's confirm setting and never asked over the connection: the
+single worker thread must not wait on one client while the others queue. So a
+client can always pipeline statements (send several before reading the replies).
+"""
+import asyncio
+import builtins
+import getpass
+import io
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from utils.helpers import split_statements
+
+STATUS_PREFIXES = ("+", "-", "?", "\\")
+OUTPUT_FORMATS = ("text", "json")
+CONFIRM_MODES = ("yes", "no")
+READ_LIMIT = 16 * 1024 * 1024      # add_into_table multi-lignes sur une seule ligne
+
+_local = threading.local()
+
+
+def escape_line(line: str) -> str:
+    return "\\" + line if line.startswith(STATUS_PREFIXES) else line
+
+
+class Session:
+    """État d'une connexion, échangé avec celui de main.py autour de chaque commande"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                 loop: asyncio.AbstractEventLoop):
+        self.reader = reader
+        self.writer = writer
+        self.loop = loop
+        self.user: Optional[dict] = None
+        self.useDatabase = ""
+        self.isDbUse = False
+        self.txn = None
+        self.output = "text"
+        self.confirm = "no"
+        peer = writer.get_extra_info("peername")
+        self.peer = f"{peer[0]}:{peer[1]}" if peer else "?"
+
+    # --- appelés depuis la boucle asyncio -------------------------------
+    async def send(self, line: str) -> None:
+        self.writer.write((line + "\n").encode("utf-8"))
+        await self.writer.drain()
+
+    # --- appelés depuis le thread d'exécution ---------------------------
+    def send_threadsafe(self, line: str) -> None:
+        self.loop.call_soon_threadsafe(self._write, (line + "\n").encode("utf-8"))
+
+    def _write(self, data: bytes) -> None:
+        if not self.writer.is_closing():
+            self.writer.write(data)
+
+    def ask(self, prompt: str = "", secret: bool = False) -> str:
+        """input() / getpass() d'un gestionnaire : réponse prise dans le réglage confirm, sans
+        attendre le client (le thread d'exécution est partagé par toutes les connexions)"""
+        if secret:
+            print(f"{prompt.strip()} cannot be asked in server mode; pass password=... instead")
+            raise EOFError("no answer")
+        print(f"{prompt}{self.confirm}")
+        return self.confirm
+
+
+class SessionOutput(io.TextIOBase):
+    """stdout du thread d'exécution : chaque ligne complète est envoyée au client"""
+
+    def __init__(self, session: Session):
+        self.session = session
+        self._partial = ""
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        lines = (self._partial + text).split("\n")
+        self._partial = lines.pop()
+        for line in lines:
+            self.session.send_threadsafe(escape_line(line))
+        return len(text)
+
+    def flush(self) -> None:
+        if self._partial:
+            self.session.send_threadsafe(escape_line(self._partial))
+            self._partial = ""
+
+
+def _session_input(prompt: str = "") -> str:
+    session = getattr(_local, "session", None)
+    return session.ask(prompt) if session is not None else _original_input(prompt)
+
+
+def _session_getpass(prompt: str = "Password: ", stream=None) -> str:
+    session = getattr(_local, "session", None)
+    return session.ask(prompt, secret=True) if session is not None else _original_getpass(prompt, stream)
+
+
+_original_input = builtins.input
+_original_getpass = getpass.getpass
+
+
+class Server:
+    """Serveur asyncio ; 'run' exécute une commande pour une session (voir main.run_server)"""
+
+    def __init__(self, db, run: Callable[[Session, str], bool], end: Callable[[Session], None]):
+        self.db = db
+        self.run = run
+        self.end = end
+        # Un seul thread : le Db partagé n'est jamais utilisé par deux commandes à la fois
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sgbd-exec")
+        self.sessions = set()
+
+    def _in_session(self, session: Session, func, *args):
+        """Exécute func dans le thread de travail avec stdout / input redirigés vers la session"""
+        _local.session = session
+        out = SessionOutput(session)
+        real_stdout = sys.stdout
+        sys.stdout = out
+        try:
+            return func(*args)
+        except SystemExit:
+            print("Error: command aborted")
+            return False
+        except EOFError:
+            return False
+        except Exception as e:
+            print(f"Error: {e}")
+            return False
+        finally:
+            out.flush()
+            sys.stdout = real_stdout
+            _local.session = None
+
+    async def _call(self, session: Session, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._in_session, session, func, *args)
+
+    async def _login(self, session: Session) -> bool:
+        await session.send("+OK my_diaries server ready, send: login <user> <password>")
+        for _ in range(3):
+            line = await session.reader.readline()
+            if not line:
+                return False
+            parts = line.decode("utf-8", "replace").strip().split(None, 2)
+            if len(parts) != 3 or parts[0].lower() != "login":
+                await session.send("-ERR expected: login <user> <password>")
+                continue
+            user = await self._call(session, self.db.userManager.switch_to, parts[1], parts[2])
+            if user:
+                session.user = user
+                await session.send(f"+OK logged in as {user['username']}")
+                return True
+            await session.send("-ERR invalid credentials")
+        return False
+
+    def _setting(self, session: Session, words) -> str:
+        """set format text|json / set confirm yes|no"""
+        if len(words) == 3 and words[1].lower() == "format" and words[2].lower() in OUTPUT_FORMATS:
+            session.output = words[2].lower()
+        elif len(words) == 3 and words[1].lower() == "confirm" and words[2].lower() in CONFIRM_MODES:
+            session.confirm = words[2].lower()
+        else:
+            return "-ERR usage: set format text|json | set confirm yes|no"
+        return f"+OK {words[1].lower()} {words[2].lower()}"
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        session = Session(reader, writer, asyncio.get_running_loop())
+        self.sessions.add(session)
+        print(f"[server] {session.peer} connected", file=sys.stderr)
+        try:
+            if not await self._login(session):
+                return
+            buffer = ""
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                text = line.decode("utf-8", "replace").strip()
+                if not buffer and text.rstrip(";").strip().lower() in ("quit", "exit"):
+                    await session.send("+OK bye")
+                    break
+                if not buffer and text.lower().startswith("set "):
+                    await session.send(self._setting(session, text.rstrip(";").split()))
+                    continue
+                buffer = f"{buffer} {text}".strip() if buffer else text
+                if not buffer.endswith(";"):
+                    continue
+                statements, buffer = split_statements(buffer), ""
+                for statement in statements:
+                    ok = await self._call(session, self.run, session, statement)
+                    await session.send("+OK" if ok else "-ERR command failed")
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except ValueError:
+            # Ligne plus longue que READ_LIMIT
+            await session.send("-ERR line too long")
+        finally:
+            if session.txn is not None:
+                await self._call(session, self.end, session)
+            self.sessions.discard(session)
+            print(f"[server] {session.peer} disconnected", file=sys.stderr)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def serve(self, host: str, port: int) -> None:
+        builtins.input = _session_input
+        getpass.getpass = _session_getpass
+        server = await asyncio.start_server(self.handle, host, port, limit=READ_LIMIT)
+        addresses = ", ".join(f"{s.getsockname()[0]}:{s.getsockname()[1]}" for s in server.sockets)
+        print(f"[server] listening on {addresses}", file=sys.stderr)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            builtins.input = _original_input
+            getpass.getpass = _original_getpass
+            self.executor.shutdown(wait=True)
@@ -0,0 +1,44 @@
+# sgbd/__init__.py
+"""API Python de la base, sans REPL ni affichage (sgbd.client pour le mode serveur).
+
+    import sgbd
+
+    with sgbd.open(".database", master_password, database="shop") as session:
+        session.executemany("add_into_table items (id=?, price=?)", [(1, 9.5), (2, 12.0)])
+        for id_, price in session.execute("select id, price from items where price > ?", [10]):
+            ...
+"""
+from typing import Optional
+
+from db.errors import (AuthenticationError, ConstraintError, NotFoundError, PermissionDenied,
+                       SGBDError, TransactionError)
+from utils.sql_parser import SQLSyntaxError
+
+from .session import ResultSet, Session
+
+__all__ = ["open", "Session", "ResultSet", "SGBDError", "AuthenticationError", "ConstraintError",
+           "NotFoundError", "PermissionDenied", "SQLSyntaxError", "TransactionError"]
+
+
+def open(path: str, password: str, database: Optional[str] = None,
+         user: Optional[str] = None, user_password: Optional[str] = None) -> Session:
+    """Ouvre le répertoire de données 'path' chiffré avec 'password' (mot de passe maître).
+
+    Without 'user' the session runs as the default admin, like any code that
+    holds the master password; with 'user' the credentials are checked and
+    AuthenticationError is raised if they are wrong.
+    """
+    import contextlib
+    import io
+
+    from db.db_main import Db
+    from utils.crypto import CryptoManager
+
+    db = Db(path, CryptoManager.for_directory(path, password))
+    if user is not None:
+        with contextlib.redirect_stdout(io.StringIO()):
+            account = db.userManager.switch_to(user, user_password or "")
+        if not account:
+            raise AuthenticationError(f"Invalid username or password for '{user}'")
+        db.current_user = account
+    return Session(db, database)
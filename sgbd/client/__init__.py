@@ -0,0 +1,17 @@
+# sgbd/client/__init__.py
+"""Client Python du mode serveur (python main.py --serve).
+
+    from sgbd.client import connect, ConnectionPool
+
+    with connect("127.0.0.1", 6543, "root", "root", database="shop") as conn:
+        result = conn.execute("select * from items where price > 10;")
+        for row in result.rows: ...
+
+    pool = ConnectionPool("127.0.0.1", 6543, "root", "root", database="shop", size=8)
+    with pool.connection() as conn:
+        conn.execute(...)
+"""
+from .connection import Connection, ClientError, QueryError, Result, connect
+from .pool import ConnectionPool, PoolTimeout
+
+__all__ = ["Connection", "ConnectionPool", "ClientError", "PoolTimeout", "QueryError", "Result", "connect"]
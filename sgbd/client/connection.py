@@ -0,0 +1,263 @@
+# sgbd/client/connection.py
+"""Connexion au serveur : authentification, envoi des requêtes, lecture des réponses typées."""
+import json
+import socket
+from datetime import date, datetime, time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_PORT = 6543
+PIPELINE_WINDOW = 64
+
+
+class ClientError(Exception):
+    """Connexion impossible, authentification refusée ou réponse inattendue"""
+
+
+class QueryError(ClientError):
+    """Le serveur a répondu -ERR ; 'messages' contient la sortie de la commande"""
+
+    def __init__(self, statement: str, messages: List[str]):
+        self.statement = statement
+        self.messages = messages
+        detail = next((m for m in reversed(messages) if m.strip()), "command failed")
+        super().__init__(f"{detail} ({statement})")
+
+
+def _iso(parse: Callable[[str], Any]) -> Callable[[Any], Any]:
+    def convert(value):
+        if not isinstance(value, str):
+            return value
+        try:
+            return parse(value)
+        except ValueError:
+            return value
+    return convert
+
+
+def _year(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return value
+
+
+# Les dates / heures voyagent en texte ISO ; les autres types sont déjà typés par le JSON
+CONVERTERS: Dict[str, Callable[[Any], Any]] = {
+    "date": _iso(date.fromisoformat),
+    "datetime": _iso(datetime.fromisoformat),
+    "time": _iso(time.fromisoformat),
+    "year": _year,
+}
+
+
+class Result:
+    """Réponse à une requête : lignes typées pour un select, messages pour le reste"""
+
+    __slots__ = ("statement", "ok", "columns", "types", "rows", "messages")
+
+    def __init__(self, statement: str):
+        self.statement = statement
+        self.ok = False
+        self.columns: Optional[List[str]] = None
+        self.types: Dict[str, str] = {}
+        self.rows: List[Tuple[Any, ...]] = []
+        self.messages: List[str] = []
+
+    def dicts(self) -> List[Dict[str, Any]]:
+        return [dict(zip(self.columns, row)) for row in self.rows] if self.columns else []
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __repr__(self) -> str:
+        state = "ok" if self.ok else "error"
+        return f"<Result {state} rows={len(self.rows)} statement={self.statement!r}>"
+
+
+class Connection:
+    """Une session sur le serveur, utilisable par un seul thread à la fois"""
+
+    def __init__(self, host: str, port: int, user: str, password: str,
+                 database: Optional[str] = None, timeout: Optional[float] = 30.0,
+                 confirm: str = "no"):
+        self.host, self.port, self.user = host, port, user
+        self.database = None
+        self.in_transaction = False
+        try:
+            self._sock = socket.create_connection((host, port), timeout=timeout)
+        except OSError as e:
+            raise ClientError(f"Cannot connect to {host}:{port}: {e}") from None
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._file = self._sock.makefile("rwb")
+        self.closed = False
+        try:
+            self._expect_ok(self._readline())
+            self._send(f"login {user} {password}")
+            self._expect_ok(self._readline(skip_output=True))
+            # Sortie JSON et aucune question : les requêtes peuvent être envoyées en rafale
+            self._send("set format json")
+            self._send(f"set confirm {confirm}")
+            self._expect_ok(self._readline())
+            self._expect_ok(self._readline())
+            if database:
+                self.use(database)
+        except BaseException:
+            self.close()
+            raise
+
+    # --- bas niveau -----------------------------------------------------
+    def _send(self, line: str) -> None:
+        self._file.write((line + "\n").encode("utf-8"))
+        self._file.flush()
+
+    def _readline(self, skip_output: bool = False) -> str:
+        while True:
+            raw = self._file.readline()
+            if not raw:
+                self.closed = True
+                raise ClientError("Connection closed by server")
+            line = raw.decode("utf-8").rstrip("\r\n")
+            if skip_output and not line.startswith(("+", "-")):
+                continue
+            return line
+
+    @staticmethod
+    def _expect_ok(line: str) -> str:
+        if not line.startswith("+OK"):
+            raise ClientError(line[5:] if line.startswith("-ERR ") else f"Unexpected reply: {line}")
+        return line
+
+    def _read_result(self, statement: str) -> Result:
+        result = Result(statement)
+        converters: List[Optional[Callable]] = []
+        while True:
+            line = self._readline()
+            if line.startswith("+OK"):
+                result.ok = True
+                return result
+            if line.startswith("-ERR"):
+                return result
+            if line.startswith("\\"):
+                line = line[1:]
+            elif result.columns is not None and line.startswith("["):
+                values = json.loads(line)
+                result.rows.append(tuple(
+                    convert(value) if convert else value for convert, value in zip(converters, values)))
+                continue
+            elif line.startswith('{"columns"'):
+                header = json.loads(line)
+                result.columns = header["columns"]
+                result.types = {col: (t or "").lower() for col, t in header["types"].items()}
+                converters = [CONVERTERS.get(result.types[col]) for col in result.columns]
+                continue
+            result.messages.append(line)
+
+    def _track(self, result: Result) -> None:
+        """Suit la base courante et la transaction ouverte (le pool en a besoin)"""
+        words = result.statement.rstrip(";").split()
+        keyword = words[0].lower()
+        if keyword in ("commit", "rollback"):
+            self.in_transaction = False
+        elif not result.ok:
+            return
+        elif keyword in ("begin", "start_transaction"):
+            self.in_transaction = True
+        elif keyword in ("use_db", "use_database") and len(words) > 1:
+            self.database = words[1]
+        elif keyword in ("leave_db", "leave_database"):
+            self.database = None
+
+    @staticmethod
+    def _statement(sql: str) -> str:
+        sql = sql.strip()
+        if "\n" in sql:
+            sql = " ".join(part.strip() for part in sql.splitlines())
+        return sql if sql.endswith(";") else sql + ";"
+
+    # --- API ------------------------------------------------------------
+    def execute(self, sql: str, check: bool = True) -> Result:
+        """Exécute une requête ; QueryError si le serveur la refuse (check=False : Result.ok)"""
+        return self.pipeline([sql], check=check)[0]
+
+    def pipeline(self, statements: Iterable[str], check: bool = False,
+                 window: int = PIPELINE_WINDOW) -> List[Result]:
+        """Envoie les requêtes sans attendre les réponses, puis lit celles-ci dans l'ordre.
+
+        At most 'window' statements are in flight, so neither side can block on
+        a full socket buffer while the other is still writing.
+        """
+        if self.closed:
+            raise ClientError("Connection is closed")
+        statements = [self._statement(sql) for sql in statements]
+        results = []
+        try:
+            for start in range(0, len(statements), window):
+                chunk = statements[start:start + window]
+                self._file.write("".join(sql + "\n" for sql in chunk).encode("utf-8"))
+                self._file.flush()
+                results.extend(self._read_result(sql) for sql in chunk)
+            for result in results:
+                self._track(result)
+        except (OSError, ValueError) as e:
+            self.close()
+            raise ClientError(f"Connection lost: {e}") from None
+        if check:
+            for result in results:
+                if not result.ok:
+                    raise QueryError(result.statement, result.messages)
+        return results
+
+    def use(self, database: str) -> None:
+        self.execute(f"use_db {database}")
+
+    def begin(self) -> None:
+        self.execute("begin")
+
+    def commit(self) -> None:
+        self.execute("commit")
+
+    def rollback(self) -> None:
+        self.execute("rollback")
+
+    def ping(self) -> bool:
+        """Vérifie que la session répond encore (utilisé par le pool)"""
+        if self.closed:
+            return False
+        try:
+            self._send("set format json")
+            return self._readline().startswith("+OK")
+        except (ClientError, OSError, ValueError):
+            self.close()
+            return False
+
+    def close(self) -> None:
+        if self._sock is None:
+            return
+        try:
+            if not self.closed:
+                self._send("quit")
+        except OSError:
+            pass
+        self.closed = True
+        for closing in (self._file, self._sock):
+            try:
+                closing.close()
+            except OSError:
+                pass
+        self._sock = None
+
+    def __enter__(self) -> "Connection":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def connect(host: str = "127.0.0.1", port: int = DEFAULT_PORT, user: str = "root", password: str = "",
+            database: Optional[str] = None, timeout: Optional[float] = 30.0,
+            confirm: str = "no") -> Connection:
+    """Ouvre une session ; confirm répond aux questions (drop, delete sans where…)"""
+    return Connection(host, port, user, password, database, timeout, confirm)
@@ -0,0 +1,164 @@
+# sgbd/client/pool.py
+"""Pool de connexions partagé entre threads, avec éviction des connexions inactives."""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+from .connection import ClientError, Connection, DEFAULT_PORT, QueryError, Result
+
+
+class PoolTimeout(ClientError):
+    """Aucune connexion libérée avant l'échéance"""
+
+
+class ConnectionPool:
+    """Au plus 'size' sessions ouvertes, réutilisées d'un emprunt à l'autre.
+
+    Idle connections older than 'idle_timeout' seconds are closed when the pool
+    is next used; one idle for more than 'ping_after' seconds is pinged before
+    being handed out and replaced if the server no longer answers (restarted
+    server, dropped socket). A connection returned with an open transaction, on
+    another database, or after a network error is closed instead of being reused.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT, user: str = "root",
+                 password: str = "", database: Optional[str] = None, size: int = 4,
+                 idle_timeout: float = 60.0, timeout: Optional[float] = 30.0, confirm: str = "no",
+                 ping_after: float = 1.0):
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self.host, self.port, self.user, self.password = host, port, user, password
+        self.database = database
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.ping_after = ping_after
+        self.timeout = timeout
+        self.confirm = confirm
+        self._cond = threading.Condition()
+        self._idle: List[Tuple[Connection, float]] = []   # (connexion, rendue à)
+        self._open = 0
+        self._closed = False
+        self.stats = {"created": 0, "reused": 0, "evicted": 0, "waits": 0, "pings": 0, "dead": 0}
+
+    def _new(self) -> Connection:
+        conn = Connection(self.host, self.port, self.user, self.password,
+                          self.database, self.timeout, self.confirm)
+        self.stats["created"] += 1
+        return conn
+
+    def _evict_idle(self) -> List[Connection]:
+        """Retire les connexions inactives depuis trop longtemps (appelé sous le verrou)"""
+        limit = time.monotonic() - self.idle_timeout
+        stale = [conn for conn, since in self._idle if since < limit]
+        if stale:
+            self._idle = [(conn, since) for conn, since in self._idle if since >= limit]
+            self._open -= len(stale)
+            self.stats["evicted"] += len(stale)
+            self._cond.notify(len(stale))
+        return stale
+
+    def acquire(self, timeout: Optional[float] = None) -> Connection:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            conn, since = self._take(timeout, deadline)
+            if conn is None:
+                break
+            if time.monotonic() - since <= self.ping_after:
+                return conn
+            # Inactive depuis un moment : vérifiée avant d'être prêtée
+            self.stats["pings"] += 1
+            if conn.ping():
+                return conn
+            self.stats["dead"] += 1
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+        try:
+            conn = self._new()
+        except BaseException:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    def _take(self, timeout: Optional[float], deadline: Optional[float]) -> Tuple[Optional[Connection], float]:
+        """Une connexion inactive et l'instant où elle a été rendue, ou (None, 0)
+        après avoir réservé une place pour en ouvrir une nouvelle"""
+        with self._cond:
+            if self._closed:
+                raise ClientError("Pool is closed")
+            stale = self._evict_idle()
+            while True:
+                if self._idle:
+                    # La plus récemment rendue : les autres peuvent vieillir et être évincées
+                    conn, since = self._idle.pop()
+                    self.stats["reused"] += 1
+                    break
+                if self._open < self.size:
+                    self._open += 1
+                    conn, since = None, 0.0
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise PoolTimeout(f"No connection available after {timeout}s")
+                self.stats["waits"] += 1
+                self._cond.wait(remaining)
+                if self._closed:
+                    raise ClientError("Pool is closed")
+        for old in stale:
+            old.close()
+        return conn, since
+
+    def release(self, conn: Connection, broken: bool = False) -> None:
+        if not broken and not conn.closed and conn.database != self.database:
+            broken = True   # use_db changé par l'appelant : la session n'est plus celle du pool
+        with self._cond:
+            if broken or conn.closed or self._closed:
+                self._open -= 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+        if broken or self._closed:
+            conn.close()
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None) -> Iterator[Connection]:
+        """Emprunte une connexion, rendue au pool en sortie du bloc"""
+        conn = self.acquire(timeout)
+        broken = False
+        try:
+            yield conn
+        except QueryError:
+            # Requête refusée : la session reste utilisable
+            raise
+        except BaseException:
+            broken = True
+            raise
+        finally:
+            # Transaction laissée ouverte : la déconnexion la fait annuler par le serveur
+            self.release(conn, broken or conn.in_transaction)
+
+    def execute(self, sql: str, check: bool = True) -> Result:
+        with self.connection() as conn:
+            return conn.execute(sql, check)
+
+    def pipeline(self, statements, check: bool = False) -> List[Result]:
+        with self.connection() as conn:
+            return conn.pipeline(statements, check)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            conn.close()
+
+    def __enter__(self) -> "ConnectionPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,303 @@
+# sgbd/session.py
+"""API Python en processus : requêtes exécutées directement sur Db, sans affichage.
+
+Statements go through the same parser, planner and journal as the REPL, but
+results come back as ResultSet objects and failures raise the exceptions of
+db.errors instead of being printed.
+"""
+import contextlib
+import io
+from datetime import date, datetime, time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from db.errors import NotFoundError, PermissionDenied, SGBDError, TransactionError
+from db.wal import ROWID
+from utils.data_files import guess_format, write_records
+from utils.sql_parser import Delete, Insert, Literal, Select, Update, parse_statement
+
+PLACEHOLDER = "?"
+
+
+class ResultSet:
+    """Résultat d'une requête : colonnes et lignes (tuples typés) d'un select,
+    nombre de lignes touchées pour les autres requêtes"""
+
+    __slots__ = ("columns", "rows", "rowcount")
+
+    def __init__(self, columns: Optional[List[str]] = None, rows: Optional[List[tuple]] = None,
+                 rowcount: int = 0):
+        self.columns = columns
+        self.rows = rows if rows is not None else []
+        self.rowcount = rowcount
+
+    def fetchone(self) -> Optional[tuple]:
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self) -> List[tuple]:
+        return self.rows
+
+    def dicts(self) -> List[Dict[str, Any]]:
+        return [dict(zip(self.columns, row)) for row in self.rows] if self.columns else []
+
+    def __iter__(self) -> Iterator[tuple]:
+        return iter(self.rows)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __repr__(self) -> str:
+        return f"<ResultSet columns={self.columns} rows={len(self.rows)} rowcount={self.rowcount}>"
+
+
+def _param_text(value: Any) -> Literal:
+    """Valeur Python -> littéral du parser (texte brut, comme saisi dans une requête)"""
+    if isinstance(value, bool):
+        return Literal("true" if value else "false", False)
+    if isinstance(value, (int, float)):
+        return Literal(repr(value), False)
+    if isinstance(value, (date, datetime, time)):
+        return Literal(value.isoformat(), True)
+    if isinstance(value, str):
+        return Literal(value, True)
+    raise TypeError(f"Unsupported parameter type: {type(value).__name__}")
+
+
+def bind(node, params: Iterator[Any], null_ok: bool = False):
+    """Remplace chaque '?' de l'AST par le paramètre suivant (dans l'ordre du texte).
+
+    None becomes NULL (a None literal) where null_ok is set: inserted values
+    and update assignments. In a WHERE clause it is refused, use IS NULL.
+    """
+    if isinstance(node, Literal):
+        if node.quoted or node.text != PLACEHOLDER:
+            return node
+        value = next(params, PLACEHOLDER)
+        if value is PLACEHOLDER:
+            raise ValueError("Not enough parameters")
+        if value is None:
+            if not null_ok:
+                raise ValueError("None cannot be compared, use IS NULL / IS NOT NULL")
+            return None
+        return _param_text(value)
+    if isinstance(node, tuple):
+        items = [bind(item, params, null_ok) for item in node]
+        return node._make(items) if hasattr(node, "_fields") else tuple(items)
+    return node
+
+
+def bind_statement(stmt, params: Sequence[Any]):
+    it = iter(params)
+    if isinstance(stmt, Insert):
+        stmt = Insert(stmt.table, bind(stmt.rows, it, null_ok=True))
+    elif isinstance(stmt, Update):
+        stmt = Update(stmt.table, bind(stmt.assignments, it, null_ok=True), bind(stmt.where, it))
+    else:
+        stmt = bind(stmt, it)
+    if next(it, PLACEHOLDER) is not PLACEHOLDER:
+        raise ValueError("Too many parameters")
+    return stmt
+
+
+class Session:
+    """Connexion en processus à une base ; une transaction à la fois.
+
+    Not thread-safe: use one Session per thread (each has its own Db).
+    """
+
+    def __init__(self, db, database: Optional[str] = None):
+        self.db = db
+        self.database: Optional[str] = None
+        if database:
+            self.use(database)
+
+    @property
+    def user(self) -> str:
+        return self.db.current_user["username"]
+
+    # --- contexte -------------------------------------------------------
+    def use(self, database: str) -> None:
+        self._outside_transaction("use")
+        if database not in self.db.list_database():
+            raise NotFoundError(f"Database '{database}' does not exist")
+        if not self.db.permManager.has_db_permission(database, self.user, "USAGE"):
+            raise PermissionDenied(f"Permission denied to use database '{database}'")
+        self.database = database
+
+    def _outside_transaction(self, operation: str) -> None:
+        """Même règle que le REPL (main.TRANSACTION_COMMANDS) : le schéma ne change
+        pas dans une transaction, dont rollback n'annulerait que les lignes"""
+        if self.db.in_transaction():
+            raise TransactionError(f"'{operation}' is not allowed inside a transaction; commit or rollback first")
+
+    def _require_database(self) -> str:
+        if not self.database:
+            raise SGBDError("No database selected (Session.use or sgbd.open(..., database=...))")
+        return self.database
+
+    def _require_table(self, table: str, permission: str) -> None:
+        database = self._require_database()
+        if not self.db._get_table_path(database, table).exists():
+            raise NotFoundError(f"Table '{table}' does not exist")
+        perms = self.db.permManager
+        allowed = perms.has_table_permission(database, table, self.user, permission)
+        if not allowed and permission == "INSERT":
+            # Même règle que add_into_table / load_data
+            allowed = (self.db.current_user.get("role") == "admin"
+                       or perms.has_db_permission(database, self.user, permission))
+        if not allowed:
+            raise PermissionDenied(f"Permission denied: {permission} on '{table}'")
+
+    # --- requêtes -------------------------------------------------------
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> ResultSet:
+        """select / update / delete / add_into_table, avec des '?' remplacés par params"""
+        stmt = self._parse(sql)
+        return self._run(bind_statement(stmt, params) if params else stmt)
+
+    def executemany(self, sql: str, seq_of_params: Iterable[Sequence[Any]]) -> ResultSet:
+        """Même requête pour chaque jeu de paramètres ; la requête n'est analysée qu'une fois.
+
+        An add_into_table becomes a single all-or-nothing batch insert; other
+        statements run once per parameter set and their row counts add up.
+        """
+        stmt = self._parse(sql)
+        if isinstance(stmt, Insert):
+            rows = []
+            for params in seq_of_params:
+                rows.extend(bind_statement(stmt, params).rows)
+            return self._insert(Insert(stmt.table, tuple(rows)))
+        total = 0
+        for params in seq_of_params:
+            total += self._run(bind_statement(stmt, params)).rowcount
+        return ResultSet(rowcount=total)
+
+    @staticmethod
+    def _parse(sql: str):
+        sql = sql.strip()
+        keyword = sql.split(None, 1)[0].lower() if sql else ""
+        if keyword not in ("select", "update", "delete", "add_into_table"):
+            raise SGBDError(f"Unsupported statement '{keyword}' (select, update, delete, add_into_table)")
+        return parse_statement(sql)
+
+    def _run(self, stmt) -> ResultSet:
+        if isinstance(stmt, Select):
+            return self._select(stmt)
+        if isinstance(stmt, Update):
+            return self._update(stmt)
+        if isinstance(stmt, Delete):
+            return self._delete(stmt)
+        return self._insert(stmt)
+
+    def _select(self, stmt: Select) -> ResultSet:
+        self._require_table(stmt.table, "SELECT")
+        db, database = self.db, self.database
+        types = db.load_schema(database, stmt.table).get("caracteristique", {})
+        columns = list(types) if stmt.columns is None else list(stmt.columns)
+        unknown = [c for c in columns if c not in types]
+        if unknown:
+            raise NotFoundError(f"Unknown columns: {', '.join(unknown)}")
+        if stmt.outfile is not None:
+            fmt = (stmt.out_format or guess_format(stmt.outfile)).lower()
+            count = write_records(stmt.outfile, fmt, columns, db.scan(database, stmt.table, stmt.where))
+            return ResultSet(columns, [], count)
+        rows = [tuple(row.get(c) for c in columns) for row in db.find_rows(database, stmt.table, stmt.where)]
+        return ResultSet(columns, rows, len(rows))
+
+    def _update(self, stmt: Update) -> ResultSet:
+        self._require_table(stmt.table, "UPDATE")
+        db, database = self.db, self.database
+        types = db.load_schema(database, stmt.table).get("caracteristique", {})
+        unknown = [col for col, _ in stmt.assignments if col not in types]
+        if unknown:
+            raise NotFoundError(f"Unknown columns: {', '.join(unknown)}")
+        assignments = {col: None if literal is None else db._coerce_value(literal.text, types[col])
+                       for col, literal in stmt.assignments}
+        with db.table_lock(database, stmt.table):
+            changes = []
+            for old in db.find_rows(database, stmt.table, stmt.where):
+                row = dict(old)
+                row.update(assignments)
+                changes.append((old[ROWID], row))
+            if changes:
+                db.log_update(database, stmt.table, changes)
+        return ResultSet(rowcount=len(changes))
+
+    def _delete(self, stmt: Delete) -> ResultSet:
+        self._require_table(stmt.table, "DELETE")
+        db, database = self.db, self.database
+        with db.table_lock(database, stmt.table):
+            if stmt.where is None:
+                count = db.count_rows(database, stmt.table)
+                db.log_truncate(database, stmt.table)
+                return ResultSet(rowcount=count)
+            rowids = [row[ROWID] for row in db.find_rows(database, stmt.table, stmt.where)]
+            if rowids:
+                db.log_delete(database, stmt.table, rowids)
+        return ResultSet(rowcount=len(rowids))
+
+    def _insert(self, stmt: Insert) -> ResultSet:
+        self._require_table(stmt.table, "INSERT")
+        rows = [{col: literal.text for col, literal in values if literal is not None}
+                for values in stmt.rows]
+        return ResultSet(rowcount=self.db.append_rows(self.database, stmt.table, rows))
+
+    # --- transactions ---------------------------------------------------
+    def begin(self) -> None:
+        self.db.begin_transaction(self._require_database())
+
+    def commit(self) -> int:
+        return self.db.commit_transaction()
+
+    def rollback(self) -> None:
+        self.db.rollback_transaction()
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """with session.transaction(): ... validé en sortie, annulé sur exception"""
+        self.begin()
+        try:
+            yield self
+        except BaseException:
+            self.rollback()
+            raise
+        self.commit()
+
+    # --- schéma ---------------------------------------------------------
+    def _quiet(self, action, *args) -> None:
+        """Opérations de schéma de Db (qui affichent) : la sortie devient le message d'erreur"""
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            ok = action(*args)
+        if not ok:
+            lines = [line for line in out.getvalue().splitlines() if line.strip()]
+            raise SGBDError(lines[-1] if lines else f"{action.__name__} failed")
+
+    def create_database(self, name: str) -> None:
+        self._outside_transaction("create_database")
+        self._quiet(self.db.create_DB, name)
+
+    def create_table(self, name: str, columns: Dict[str, str],
+                     constraints: Optional[Dict[str, List[str]]] = None) -> None:
+        """columns : {colonne: type}, constraints : {colonne: ["Primary key", ...]}"""
+        self._outside_transaction("create_table")
+        database = self._require_database()
+        attr = {col: "Number" if t.lower() == "number" else t.capitalize() for col, t in columns.items()}
+        constraints = constraints or {}
+        constr = {col: list(constraints.get(col) or ["no constraint"]) for col in columns}
+        self._quiet(self.db.create_Table, database,
+                    name, {"caracteristique": attr, "constraint": constr, "data": []})
+
+    def tables(self) -> List[str]:
+        return self.db.list_table(self._require_database())
+
+    def close(self) -> None:
+        """Annule la transaction en cours et replie le journal dans les tables"""
+        if self.db.in_transaction():
+            self.db.rollback_transaction()
+        if self.database:
+            self.db.checkpoint(self.database)
+
+    def __enter__(self) -> "Session":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,50 @@
+# utils/compression.py
+"""Compression des données avant chiffrement (zlib / lzma de la bibliothèque standard).
+
+A compressed payload starts with a NUL byte and a codec id, which no JSON
+document can start with, so readers detect it on their own and payloads
+written before compression existed are returned unchanged. When compression
+would not make a payload smaller it is kept raw.
+"""
+import zlib
+
+CODECS = ("none", "zlib", "lzma")
+_MARK = b"\x00"
+_IDS = {"zlib": b"z", "lzma": b"x"}
+_NAMES = {v: k for k, v in _IDS.items()}
+# Flux LZMA2 brut : pas d'en-tête xz (~60 octets) sur chaque page
+_LZMA_FILTERS = [{"id": 0x21, "preset": 6}]  # lzma.FILTER_LZMA2
+
+
+def check_codec(codec: str) -> str:
+    codec = (codec or "none").lower()
+    if codec not in CODECS:
+        raise ValueError(f"Unknown compression '{codec}' (expected {', '.join(CODECS)})")
+    return codec
+
+
+def compress(raw: bytes, codec: str) -> bytes:
+    if codec == "none":
+        return raw
+    if codec == "zlib":
+        packed = zlib.compress(raw, 6)
+    elif codec == "lzma":
+        import lzma
+        packed = lzma.compress(raw, format=lzma.FORMAT_RAW, filters=_LZMA_FILTERS)
+    else:
+        raise ValueError(f"Unknown compression '{codec}' (expected {', '.join(CODECS)})")
+    if len(packed) + 2 >= len(raw):
+        return raw
+    return _MARK + _IDS[codec] + packed
+
+
+def decompress(payload: bytes) -> bytes:
+    if payload[:1] != _MARK:
+        return payload
+    codec = _NAMES.get(payload[1:2])
+    if codec == "zlib":
+        return zlib.decompress(payload[2:])
+    if codec == "lzma":
+        import lzma
+        return lzma.decompress(payload[2:], format=lzma.FORMAT_RAW, filters=_LZMA_FILTERS)
+    raise ValueError(f"Unknown compression id {payload[1:2]!r}")
@@ -1,28 +1,139 @@
 # utils/crypto.py
-from cryptography.fernet import Fernet, InvalidToken
 import hashlib
 import base64
 import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+from db.errors import AuthenticationError
+from utils.compression import compress, decompress
+
+# Paramètres de dérivation d'un dossier de données, notés dans <db_path>/KEYINFO
+KDF_FILE = "KEYINFO"
+DEFAULT_ITERATIONS = 200000
+DEFAULT_SALT = b'my_sgbd_secure_salt_2025'
+
+
+def kdf_params(db_path, iterations: Optional[int] = None) -> Tuple[int, bytes]:
+    """(itérations, sel) du dossier de données, fixés à sa création.
+
+    A directory that already holds data but no KEYINFO was encrypted with the
+    historical parameters (200 000 iterations, fixed salt), which are then
+    recorded. A new directory gets 'iterations' (default 200 000) and a random
+    salt. Changing kdf_iterations later does not affect an existing directory,
+    whose files could no longer be read with another key.
+    """
+    db_path = Path(db_path)
+    path = db_path / KDF_FILE
+    try:
+        info = json.loads(path.read_text(encoding="utf-8"))
+        return int(info["iterations"]), base64.b64decode(info["salt"])
+    except FileNotFoundError:
+        pass
+    if db_path.is_dir() and any(db_path.iterdir()):
+        iterations, salt = DEFAULT_ITERATIONS, DEFAULT_SALT
+    else:
+        iterations, salt = int(iterations or DEFAULT_ITERATIONS), os.urandom(16)
+    db_path.mkdir(parents=True, exist_ok=True)
+    info = {"kdf": "pbkdf2_sha256", "iterations": iterations, "salt": base64.b64encode(salt).decode()}
+    tmp = path.with_name(f"{KDF_FILE}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(info), encoding="utf-8")
+    try:
+        os.link(tmp, path)  # création atomique, seulement si absent
+    except FileExistsError:
+        return kdf_params(db_path)  # écrit entre-temps par un autre processus
+    finally:
+        tmp.unlink()
+    return iterations, salt
+
 
 class CryptoManager:
-    def __init__(self, password: str):
-        self.key = self._derive_key(password)
-        self.fernet = Fernet(self.key)
+    """Chiffrement Fernet, clé dérivée du mot de passe maître (PBKDF2-SHA256).
+
+    The derivation takes about 0.1s at 200 000 iterations; it starts in a
+    background thread when the manager is created (hashlib releases the GIL),
+    so it overlaps the rest of startup and the login prompt. The first
+    encrypt/decrypt waits for it. The cryptography package is only imported
+    by that thread. With a key_cache (utils.key_cache.KeyCache) a key derived
+    by an earlier process is reused instead.
+    """
+
+    def __init__(self, password: str, iterations: int = DEFAULT_ITERATIONS, salt: bytes = DEFAULT_SALT,
+                 key_cache=None):
+        self._password = password
+        self.iterations = iterations
+        self.salt = salt
+        self.key_cache = key_cache
+        self.key_from_cache = False
+        self._uncached: Optional[str] = None
+        self._fernet = None
+        self._invalid_token = None
+        self._lock = threading.Lock()
+        self.derive_seconds = 0.0   # durée de la dérivation
+        self.wait_seconds = 0.0     # temps passé à l'attendre
+        threading.Thread(target=self._prepare, name="sgbd-kdf", daemon=True).start()
+
+    @classmethod
+    def for_directory(cls, db_path, password: str, iterations: Optional[int] = None,
+                      key_cache=None) -> "CryptoManager":
+        """Manager avec les paramètres de dérivation notés dans <db_path>/KEYINFO"""
+        iterations, salt = kdf_params(db_path, iterations)
+        return cls(password, iterations, salt, key_cache)
 
     def _derive_key(self, password: str) -> bytes:
-        salt = b'my_sgbd_secure_salt_2025'
         # CORRIGÉ : pbkdf2_hmac (pas pリティ2_hmac !)
-        kdf = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, 200000)
+        kdf = hashlib.pbkdf2_hmac('sha256', password.encode(), self.salt, self.iterations)
         return base64.urlsafe_b64encode(kdf)
 
-    def encrypt(self, data: dict) -> bytes:
+    def _prepare(self) -> None:
+        with self._lock:
+            if self._fernet is not None:
+                return
+            start = time.perf_counter()
+            from cryptography.fernet import Fernet, InvalidToken
+            secret = f"{self.iterations}:{self.salt.hex()}:{self._password}"
+            key = self.key_cache.get(secret) if self.key_cache else None
+            self.key_from_cache = key is not None
+            if key is None:
+                key = self._derive_key(self._password)
+                if self.key_cache:
+                    # Mis en cache après un premier déchiffrement réussi : jamais une clé fausse
+                    self._uncached = secret
+            self.key = key
+            self._invalid_token = InvalidToken
+            self._fernet = Fernet(self.key)
+            self._password = None
+            self.derive_seconds = time.perf_counter() - start
+
+    @property
+    def fernet(self):
+        if self._fernet is None:
+            start = time.perf_counter()
+            self._prepare()
+            self.wait_seconds += time.perf_counter() - start
+        return self._fernet
+
+    def encrypt_bytes(self, raw: bytes) -> bytes:
+        return self.fernet.encrypt(raw)
+
+    def decrypt_bytes(self, encrypted: bytes) -> bytes:
+        fernet = self.fernet
+        try:
+            raw = fernet.decrypt(encrypted)
+        except self._invalid_token:
+            raise AuthenticationError("Wrong password or corrupted file") from None
+        if self._uncached is not None:
+            secret, self._uncached = self._uncached, None
+            self.key_cache.put(secret, self.key)
+        # Contenu compressé avant chiffrement (en-tête NUL + codec), sinon rendu tel quel
+        return decompress(raw)
+
+    def encrypt(self, data: dict, compression: str = "none") -> bytes:
         json_str = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
-        return self.fernet.encrypt(json_str.encode('utf-8'))
+        return self.encrypt_bytes(compress(json_str.encode('utf-8'), compression))
 
     def decrypt(self, encrypted: bytes) -> dict:
-        try:
-            decrypted = self.fernet.decrypt(encrypted).decode('utf-8')
-            return json.loads(decrypted)
-        except InvalidToken:
-            print("Error: Wrong password or corrupted file")
-            exit(1)
\ No newline at end of file
+        return json.loads(self.decrypt_bytes(encrypted).decode('utf-8'))
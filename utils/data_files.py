@@ -0,0 +1,89 @@
+# utils/data_files.py
+"""Lecture et écriture en flux de fichiers CSV / JSON Lines (load_data, export)."""
+import csv
+import json
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List
+
+FORMATS = ("csv", "jsonl")
+_WRITE_BUFFER = 1024 * 1024
+
+
+def guess_format(path) -> str:
+    """Format déduit de l'extension (csv par défaut)"""
+    return "jsonl" if Path(path).suffix.lower() in (".jsonl", ".ndjson", ".json") else "csv"
+
+
+def read_csv(path) -> Iterator[Dict[str, str]]:
+    """Une ligne par enregistrement ; la première ligne donne les noms de colonnes.
+
+    Empty (or missing) cells are NULL, like a JSON null, so NOT NULL and
+    PRIMARY KEY checks still apply to them.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        for record in csv.DictReader(f):
+            yield {col.strip(): None if value in (None, "") else value
+                   for col, value in record.items() if col is not None}
+
+
+def read_jsonl(path) -> Iterator[Dict[str, Any]]:
+    """Un objet JSON par ligne, les lignes vides sont ignorées"""
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError(f"line {number}: expected a JSON object")
+            yield record
+
+
+def read_records(path, fmt: str) -> Iterator[Dict[str, Any]]:
+    if fmt == "csv":
+        return read_csv(path)
+    if fmt == "jsonl":
+        return read_jsonl(path)
+    raise ValueError(f"Unknown format '{fmt}' (expected {' or '.join(FORMATS)})")
+
+
+def as_raw(record: Dict[str, Any]) -> Dict[str, str]:
+    """Valeurs JSON ramenées au texte attendu par Db._coerce_value (null reste NULL)"""
+    return {col: value if value is None or isinstance(value, str) else json.dumps(value)
+            for col, value in record.items()}
+
+
+def batched(records: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Découpe le flux en lots de 'size' enregistrements"""
+    it = iter(records)
+    while True:
+        batch = list(islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+def write_records(path, fmt: str, columns: List[str], rows: Iterable[Dict[str, Any]]) -> int:
+    """Écrit les lignes au fil de l'eau dans un fichier tamponné ; renvoie le nombre de lignes.
+
+    CSV gets a header row and NULL as an empty cell; JSON Lines writes one
+    object per row with only the requested columns.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}' (expected {' or '.join(FORMATS)})")
+    count = 0
+    with open(path, "x", newline="", encoding="utf-8", buffering=_WRITE_BUFFER) as f:
+        if fmt == "csv":
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            for row in rows:
+                writer.writerow(["" if row.get(col) is None else row.get(col) for col in columns])
+                count += 1
+        else:
+            dumps = json.JSONEncoder(ensure_ascii=False, default=str).encode
+            for row in rows:
+                f.write(dumps({col: row.get(col) for col in columns}))
+                f.write("\n")
+                count += 1
+    return count
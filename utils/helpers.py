@@ -43,58 +43,35 @@ def split_top_level_commas(s: str):
     if last: parts.append(last)
     return parts
 
-def parse_where_clause(where_clause, all_rows):
-    if where_clause is None:
-        return all_rows
-    where_clause = where_clause.strip()
-    if not where_clause:
-        return all_rows
-    operators = ['>=', '<=', '!=', '=', '>', '<', ' LIKE ', ' like ']
-    operator = None
-    for op in operators:
-        if op in where_clause:
-            operator = op.strip()
-            split_op = op
-            break
-    if not operator:
-        print("Unrecognized operator in WHERE. Supported: =, !=, >, <, >=, <=, LIKE")
-        return []
-    try:
-        left, right = where_clause.split(split_op, 1)
-        left = left.strip()
-        right = right.strip().strip("'").strip('"')
-        filtered = []
-        for row in all_rows:
-            value = str(row.get(left, ""))
-            if operator == '=':
-                if value == right: filtered.append(row)
-            elif operator == '!=':
-                if value != right: filtered.append(row)
-            elif operator == '>':
-                try:
-                    if float(value) > float(right): filtered.append(row)
-                except ValueError:
-                    if value > right: filtered.append(row)
-            elif operator == '<':
-                try:
-                    if float(value) < float(right): filtered.append(row)
-                except ValueError:
-                    if value < right: filtered.append(row)
-            elif operator == '>=':
-                try:
-                    if float(value) >= float(right): filtered.append(row)
-                except ValueError:
-                    if value >= right: filtered.append(row)
-            elif operator == '<=':
-                try:
-                    if float(value) <= float(right): filtered.append(row)
-                except ValueError:
-                    if value <= right: filtered.append(row)
-            elif operator.upper() == 'LIKE':
-                pattern = right.replace('%', '.*').replace('_', '.')
-                if re.search(pattern, value, re.IGNORECASE):
-                    filtered.append(row)
-        return filtered
-    except Exception as e:
-        print(f"Error parsing WHERE clause: {e}")
-        return []
+def split_statements(script: str):
+    """Découpe un script en commandes sur les ';' hors guillemets ; '--' commente la fin de ligne"""
+    statements = []
+    buf = []
+    in_single = in_double = False
+    i = 0
+    while i < len(script):
+        ch = script[i]
+        if ch == "'" and not in_double:
+            in_single = not in_single
+        elif ch == '"' and not in_single:
+            in_double = not in_double
+        elif not (in_single or in_double):
+            if ch == "-" and script.startswith("--", i):
+                end = script.find("\n", i)
+                i = len(script) if end == -1 else end
+                continue
+            if ch == ";":
+                statement = _join_lines(''.join(buf))
+                if statement: statements.append(statement)
+                buf = []
+                i += 1
+                continue
+        buf.append(ch)
+        i += 1
+    last = _join_lines(''.join(buf))
+    if last: statements.append(last)
+    return statements
+
+def _join_lines(text: str) -> str:
+    # Comme la saisie multi-ligne du REPL : lignes nettoyées, jointes par un espace
+    return " ".join(line.strip() for line in text.splitlines() if line.strip())
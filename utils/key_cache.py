@@ -0,0 +1,83 @@
+# utils/key_cache.py
+"""Cache de la clé dérivée entre processus (option "key_cache" de config.json).
+
+After the first unlock the derived key is kept in a session file readable
+only by the current user (directory 0700, file 0600) under $XDG_RUNTIME_DIR
+or the system temp directory, until it expires after 'ttl' seconds. Later
+processes opening the same data directory with the same master password
+read it instead of running PBKDF2 again. The file holds the key itself: it
+is as sensitive as the master password for as long as it lives, which is
+why it is off by default. `python main.py --forget-key` removes it.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+
+class KeyCache:
+    def __init__(self, db_path, ttl: float = 900, directory=None):
+        self.ttl = ttl
+        self.enabled = hasattr(os, "getuid")  # pas de contrôle des permissions sous Windows
+        if directory is None:
+            runtime = os.environ.get("XDG_RUNTIME_DIR")
+            user = os.getuid() if self.enabled else os.environ.get("USERNAME", "user")
+            directory = Path(runtime) / "sgbd" if runtime else Path(tempfile.gettempdir()) / f"sgbd-{user}"
+        self.directory = Path(directory)
+        name = hashlib.sha256(str(Path(db_path).resolve()).encode()).hexdigest()[:16]
+        self.path = self.directory / f"{name}.key"
+
+    @staticmethod
+    def _check(key: bytes, secret: str) -> str:
+        """Lie l'entrée au mot de passe et aux paramètres de dérivation"""
+        return hmac.new(key, secret.encode(), hashlib.sha256).hexdigest()
+
+    def _private_directory(self) -> bool:
+        """Le dossier doit appartenir à l'utilisateur et n'être accessible qu'à lui"""
+        try:
+            self.directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+            st = self.directory.stat()
+        except OSError:
+            return False
+        return st.st_uid == os.getuid() and not st.st_mode & 0o077
+
+    def get(self, secret: str) -> Optional[bytes]:
+        if not self.enabled or not self._private_directory():
+            return None
+        try:
+            entry = json.loads(self.path.read_text(encoding="utf-8"))
+            key = base64.b64decode(entry["key"])
+        except (OSError, ValueError, KeyError):
+            return None
+        if entry.get("expires", 0) < time.time():
+            self.forget()
+            return None
+        if not hmac.compare_digest(entry.get("check", ""), self._check(key, secret)):
+            return None
+        return key
+
+    def put(self, secret: str, key: bytes) -> None:
+        if not self.enabled or not self._private_directory():
+            return
+        entry = {"expires": time.time() + self.ttl, "key": base64.b64encode(key).decode(),
+                 "check": self._check(key, secret)}
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        try:
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+
+    def forget(self) -> bool:
+        try:
+            self.path.unlink()
+            return True
+        except FileNotFoundError:
+            return False
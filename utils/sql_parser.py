@@ -0,0 +1,342 @@
+# utils/sql_parser.py
+"""Lexer et parser des requêtes select / update / delete / add_into_table.
+
+Statements are turned into an immutable AST made of NamedTuples, so the same
+tree can be cached (see parse_statement) and executed many times.
+
+Grammar (keywords are case-insensitive):
+    select  := SELECT ('*' | col (',' col)*) FROM table [WHERE expr]
+               [INTO OUTFILE string [FORMAT '=' word]]
+    update  := UPDATE table SET col '=' literal (',' col '=' literal)* [WHERE expr]
+    delete  := DELETE FROM table [WHERE expr]
+    insert  := ADD_INTO_TABLE table row (',' row)*
+    row     := '(' col '=' literal (',' col '=' literal)* ')'
+    expr    := and_expr (OR and_expr)*
+    and_expr:= not_expr (AND not_expr)*
+    not_expr:= NOT not_expr | '(' expr ')' | predicate
+    predicate := col op literal | col [NOT] IN '(' literal, ... ')'
+               | col [NOT] BETWEEN literal AND literal | col [NOT] LIKE literal
+               | col IS [NOT] NULL
+"""
+import re
+from functools import lru_cache
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+
+class SQLSyntaxError(ValueError):
+    pass
+
+
+# ----------------------------------------------------------------------
+# AST
+# ----------------------------------------------------------------------
+class Literal(NamedTuple):
+    text: str       # valeur sans guillemets
+    quoted: bool    # vrai pour 'texte' / "texte"
+
+
+class Compare(NamedTuple):
+    column: str
+    op: str         # =, !=, <, >, <=, >=, LIKE
+    value: Literal
+
+
+class InList(NamedTuple):
+    column: str
+    values: Tuple[Literal, ...]
+    negated: bool
+
+
+class Between(NamedTuple):
+    column: str
+    low: Literal
+    high: Literal
+    negated: bool
+
+
+class IsNull(NamedTuple):
+    column: str
+    negated: bool
+
+
+class And(NamedTuple):
+    left: Any
+    right: Any
+
+
+class Or(NamedTuple):
+    left: Any
+    right: Any
+
+
+class Not(NamedTuple):
+    operand: Any
+
+
+class Select(NamedTuple):
+    columns: Optional[Tuple[str, ...]]   # None pour '*'
+    table: str
+    where: Any
+    outfile: Optional[str] = None        # select ... into outfile '<chemin>'
+    out_format: Optional[str] = None     # csv / jsonl, sinon d'après l'extension
+
+
+class Update(NamedTuple):
+    table: str
+    assignments: Tuple[Tuple[str, Literal], ...]
+    where: Any
+
+
+class Delete(NamedTuple):
+    table: str
+    where: Any
+
+
+class Insert(NamedTuple):
+    table: str
+    rows: Tuple[Tuple[Tuple[str, Literal], ...], ...]   # une entrée par ligne insérée
+
+
+# ----------------------------------------------------------------------
+# Lexer
+# ----------------------------------------------------------------------
+class Token(NamedTuple):
+    kind: str       # IDENT, NUMBER, STRING, WORD, OP, PUNCT, EOF
+    value: str
+    pos: int
+
+
+_DELIM = r"(?=[\s(),;=<>!*]|$)"
+_TOKEN_RE = re.compile(rf"""
+    (?P<ws>\s+)
+  | (?P<number>[-+]?(?:\d+\.\d*|\.\d+|\d+)(?:[eE][-+]?\d+)?{_DELIM})
+  | (?P<string>'(?:[^']|'')*'|"(?:[^"]|"")*")
+  | (?P<ident>[A-Za-z_]\w*{_DELIM})
+  | (?P<word>[^\s(),;=<>!'"*]+)
+  | (?P<op><=|>=|!=|<>|=|<|>)
+  | (?P<punct>[(),*;])
+""", re.VERBOSE)
+
+
+def tokenize(sql: str) -> List[Token]:
+    tokens = []
+    pos = 0
+    while pos < len(sql):
+        m = _TOKEN_RE.match(sql, pos)
+        if not m:
+            raise SQLSyntaxError(f"unexpected character {sql[pos]!r} at position {pos}")
+        kind = m.lastgroup
+        text = m.group()
+        if kind == "string":
+            quote = text[0]
+            tokens.append(Token("STRING", text[1:-1].replace(quote * 2, quote), pos))
+        elif kind == "op":
+            tokens.append(Token("OP", "!=" if text == "<>" else text, pos))
+        elif kind != "ws":
+            tokens.append(Token(kind.upper(), text, pos))
+        pos = m.end()
+    tokens.append(Token("EOF", "", pos))
+    return tokens
+
+
+# ----------------------------------------------------------------------
+# Parser
+# ----------------------------------------------------------------------
+class _Parser:
+    def __init__(self, sql: str):
+        self.tokens = tokenize(sql)
+        self.i = 0
+
+    @property
+    def current(self) -> Token:
+        return self.tokens[self.i]
+
+    def _advance(self) -> Token:
+        tok = self.tokens[self.i]
+        self.i += 1
+        return tok
+
+    def _is_keyword(self, *words: str) -> bool:
+        tok = self.current
+        return tok.kind == "IDENT" and tok.value.upper() in words
+
+    def _accept_keyword(self, word: str) -> bool:
+        if self._is_keyword(word):
+            self.i += 1
+            return True
+        return False
+
+    def _expect_keyword(self, word: str) -> None:
+        if not self._accept_keyword(word):
+            self._error(f"expected {word}")
+
+    def _accept_punct(self, char: str) -> bool:
+        if self.current.kind == "PUNCT" and self.current.value == char:
+            self.i += 1
+            return True
+        return False
+
+    def _expect_punct(self, char: str) -> None:
+        if not self._accept_punct(char):
+            self._error(f"expected '{char}'")
+
+    def _error(self, message: str):
+        tok = self.current
+        found = "end of input" if tok.kind == "EOF" else repr(tok.value)
+        raise SQLSyntaxError(f"{message}, found {found} at position {tok.pos}")
+
+    def _identifier(self) -> str:
+        if self.current.kind != "IDENT":
+            self._error("expected a name")
+        return self._advance().value
+
+    def _literal(self) -> Literal:
+        tok = self.current
+        if tok.kind == "STRING":
+            self.i += 1
+            return Literal(tok.value, True)
+        if tok.kind in ("NUMBER", "IDENT", "WORD"):
+            # Un mot nu à droite d'un opérateur est une valeur (where name = Alice, d = 2024-01-01)
+            self.i += 1
+            return Literal(tok.value, False)
+        self._error("expected a value")
+
+    def _end(self) -> None:
+        self._accept_punct(";")
+        if self.current.kind != "EOF":
+            self._error("unexpected input")
+
+    # --- statements -----------------------------------------------------
+    def statement(self):
+        if self._accept_keyword("SELECT"):
+            node = self._select()
+        elif self._accept_keyword("UPDATE"):
+            node = self._update()
+        elif self._accept_keyword("DELETE"):
+            node = self._delete()
+        elif self._accept_keyword("ADD_INTO_TABLE"):
+            node = self._insert()
+        else:
+            self._error("expected SELECT, UPDATE, DELETE or ADD_INTO_TABLE")
+        self._end()
+        return node
+
+    def _where(self):
+        return self.expression() if self._accept_keyword("WHERE") else None
+
+    def _select(self) -> Select:
+        if self._accept_punct("*"):
+            columns = None
+        else:
+            columns = [self._identifier()]
+            while self._accept_punct(","):
+                columns.append(self._identifier())
+            columns = tuple(columns)
+        self._expect_keyword("FROM")
+        table = self._identifier()
+        where = self._where()
+        outfile = out_format = None
+        if self._accept_keyword("INTO"):
+            self._expect_keyword("OUTFILE")
+            if self.current.kind != "STRING":
+                self._error("expected a quoted file name")
+            outfile = self._advance().value
+            if self._accept_keyword("FORMAT"):
+                if not (self.current.kind == "OP" and self.current.value == "="):
+                    self._error("expected '=' after FORMAT")
+                self.i += 1
+                out_format = self._identifier().lower()
+        return Select(columns, table, where, outfile, out_format)
+
+    def _assignments(self) -> Tuple[Tuple[str, Literal], ...]:
+        items = []
+        while True:
+            column = self._identifier()
+            if not (self.current.kind == "OP" and self.current.value == "="):
+                self._error(f"expected '=' after '{column}'")
+            self.i += 1
+            items.append((column, self._literal()))
+            if not self._accept_punct(","):
+                return tuple(items)
+
+    def _update(self) -> Update:
+        table = self._identifier()
+        self._expect_keyword("SET")
+        return Update(table, self._assignments(), self._where())
+
+    def _delete(self) -> Delete:
+        self._expect_keyword("FROM")
+        table = self._identifier()
+        return Delete(table, self._where())
+
+    def _insert(self) -> Insert:
+        table = self._identifier()
+        rows = []
+        while True:
+            self._expect_punct("(")
+            rows.append(self._assignments())
+            self._expect_punct(")")
+            if not self._accept_punct(","):
+                return Insert(table, tuple(rows))
+
+    # --- expressions ----------------------------------------------------
+    def expression(self):
+        node = self._and()
+        while self._accept_keyword("OR"):
+            node = Or(node, self._and())
+        return node
+
+    def _and(self):
+        node = self._not()
+        while self._accept_keyword("AND"):
+            node = And(node, self._not())
+        return node
+
+    def _not(self):
+        if self._accept_keyword("NOT"):
+            return Not(self._not())
+        if self._accept_punct("("):
+            node = self.expression()
+            self._expect_punct(")")
+            return node
+        return self._predicate()
+
+    def _predicate(self):
+        column = self._identifier()
+        if self.current.kind == "OP":
+            return Compare(column, self._advance().value, self._literal())
+        if self._accept_keyword("IS"):
+            negated = self._accept_keyword("NOT")
+            self._expect_keyword("NULL")
+            return IsNull(column, negated)
+        negated = self._accept_keyword("NOT")
+        if self._accept_keyword("IN"):
+            self._expect_punct("(")
+            values = [self._literal()]
+            while self._accept_punct(","):
+                values.append(self._literal())
+            self._expect_punct(")")
+            return InList(column, tuple(values), negated)
+        if self._accept_keyword("BETWEEN"):
+            low = self._literal()
+            self._expect_keyword("AND")
+            return Between(column, low, self._literal(), negated)
+        if self._accept_keyword("LIKE"):
+            node = Compare(column, "LIKE", self._literal())
+            return Not(node) if negated else node
+        self._error(f"expected an operator after '{column}'")
+
+
+@lru_cache(maxsize=256)
+def parse_statement(sql: str):
+    """Parse une requête complète ; le résultat (immuable) est mis en cache"""
+    return _Parser(sql).statement()
+
+
+@lru_cache(maxsize=256)
+def parse_expression(where_clause: str):
+    """Parse une condition WHERE seule"""
+    parser = _Parser(where_clause)
+    node = parser.expression()
+    parser._end()
+    return node